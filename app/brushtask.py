@@ -1,9 +1,11 @@
 import re
 import sys
 import time
-import pytz
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import pytz
+
 from apscheduler.schedulers.background import BackgroundScheduler
 
 import log
@@ -17,7 +19,7 @@ from app.utils import StringUtils
 from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import BrushDeleteType, SystemDictType
-from config import BRUSH_REMOVE_TORRENTS_INTERVAL
+from config import BRUSH_REMOVE_TORRENTS_INTERVAL, BRUSH_ATTR_FETCH_THREADS
 
 
 @singleton
@@ -28,10 +30,16 @@ class BrushTask(object):
     dbhelper = None
     _scheduler = None
     _brush_tasks = []
-    _torrents_cache = []
+    _torrents_cache = set()
     _downloader_infos = []
     _qb_client = "qbittorrent"
     _tr_client = "transmission"
+    # qBittorrent做種中、下載中的種子狀態
+    _qb_completed_states = Qbittorrent.STATUS_FILTER_STATES.get("completed")
+    _qb_downloading_states = Qbittorrent.STATUS_FILTER_STATES.get("downloading")
+    # Transmission做種中、下載中的種子狀態
+    _tr_completed_states = ["seeding", "seed_pending"]
+    _tr_downloading_states = ["downloading", "download_pending", "stopped"]
 
     def __init__(self):
         self.init_config()
@@ -188,285 +196,310 @@ class BrushTask(object):
         else:
             log.info("【Brush】%s RSS獲取資料：%s" % (site_name, len(rss_result)))
         success_count = 0
-
+        # 透過大小、包含、排除等規則，需要進一步檢查的種子
+        candidates = []
+        # 本次已處理的種子連結
+        enclosures = set()
         for res in rss_result:
             try:
                 # 種子名
                 torrent_name = res.get('title')
                 # 種子連結
                 enclosure = res.get('enclosure')
-                # 種子頁面
-                page_url = res.get('link')
-                # 副標題
-                description = res.get('description')
-                # 種子大小
-                size = res.get('size')
-                # 釋出時間
-                pubdate = res.get('pubdate')
-
-                if enclosure not in self._torrents_cache:
-                    self._torrents_cache.append(enclosure)
-                else:
+
+                if enclosure in self._torrents_cache or enclosure in enclosures:
                     log.debug("【Brush】%s 已處理過" % torrent_name)
                     continue
+                enclosures.add(enclosure)
 
                 # 檢查種子是否符合選種規則
                 if not self.__check_rss_rule(rss_rule=rss_rule,
                                              title=torrent_name,
-                                             description=description,
-                                             torrent_url=page_url,
-                                             torrent_size=size,
-                                             pubdate=pubdate,
-                                             cookie=cookie,
-                                             ua=ua):
+                                             description=res.get('description'),
+                                             torrent_size=res.get('size'),
+                                             pubdate=res.get('pubdate')):
+                    self._torrents_cache.add(enclosure)
                     continue
-                # 開始下載
-                log.debug("【Brush】%s 符合條件，開始下載..." % torrent_name)
-                if self.__download_torrent(downloadercfg=downloader_cfg,
-                                           title=torrent_name,
-                                           enclosure=enclosure,
-                                           size=size,
-                                           taskid=taskid,
-                                           transfer=True if taskinfo.get("transfer") == 'Y' else False,
-                                           sendmessage=True if taskinfo.get("sendmessage") == 'Y' else False,
-                                           forceupload=True if taskinfo.get("forceupload") == 'Y' else False,
-                                           upspeed=rss_rule.get("upspeed"),
-                                           downspeed=rss_rule.get("downspeed"),
-                                           taskname=task_name,
-                                           site_id=site_id):
-                    # 計數
-                    success_count += 1
-                    # 再判斷一次
-                    if not self.__is_allow_new_torrent(taskid=taskid,
-                                                       taskname=task_name,
-                                                       seedsize=seed_size,
-                                                       dlcount=rss_rule.get("dlcount"),
-                                                       downloadercfg=downloader_cfg):
-                        break
+                candidates.append(res)
             except Exception as err:
                 ExceptionUtils.exception_traceback(err)
                 continue
+        if not candidates:
+            log.info("【Brush】任務 %s 本次新增了 %s 個下載" % (task_name, success_count))
+            return
+        # 規則需要時，並行獲取種子詳情頁屬性，站點請求頻率由Sites限速
+        executor = None
+        attr_tasks = [None] * len(candidates)
+        if self.__is_torrent_attr_rule(rss_rule):
+            executor = ThreadPoolExecutor(max_workers=min(len(candidates), BRUSH_ATTR_FETCH_THREADS))
+            attr_tasks = [executor.submit(self.sites.check_torrent_attr,
+                                          torrent_url=res.get('link'),
+                                          cookie=cookie,
+                                          ua=ua) for res in candidates]
+        try:
+            # 按RSS中的順序處理
+            for res, attr_task in zip(candidates, attr_tasks):
+                try:
+                    # 種子名
+                    torrent_name = res.get('title')
+                    # 種子連結
+                    enclosure = res.get('enclosure')
+                    # 種子大小
+                    size = res.get('size')
+
+                    self._torrents_cache.add(enclosure)
+
+                    # 檢查種子詳情是否符合選種規則
+                    if attr_task:
+                        torrent_attr = attr_task.result()
+                        log.debug("【Brush】%s 解析詳情, %s" % (torrent_name, torrent_attr))
+                        if not self.__check_torrent_attr_rule(rss_rule=rss_rule,
+                                                              title=torrent_name,
+                                                              torrent_attr=torrent_attr):
+                            continue
+                    # 開始下載
+                    log.debug("【Brush】%s 符合條件，開始下載..." % torrent_name)
+                    if self.__download_torrent(downloadercfg=downloader_cfg,
+                                               title=torrent_name,
+                                               enclosure=enclosure,
+                                               size=size,
+                                               taskid=taskid,
+                                               transfer=True if taskinfo.get("transfer") == 'Y' else False,
+                                               sendmessage=True if taskinfo.get("sendmessage") == 'Y' else False,
+                                               forceupload=True if taskinfo.get("forceupload") == 'Y' else False,
+                                               upspeed=rss_rule.get("upspeed"),
+                                               downspeed=rss_rule.get("downspeed"),
+                                               taskname=task_name,
+                                               site_id=site_id):
+                        # 計數
+                        success_count += 1
+                        # 再判斷一次
+                        if not self.__is_allow_new_torrent(taskid=taskid,
+                                                           taskname=task_name,
+                                                           seedsize=seed_size,
+                                                           dlcount=rss_rule.get("dlcount"),
+                                                           downloadercfg=downloader_cfg):
+                            break
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    continue
+        finally:
+            # 已無法新增下載時，取消還未開始的詳情頁請求
+            if executor:
+                for attr_task in attr_tasks:
+                    attr_task.cancel()
+                executor.shutdown(wait=False)
         log.info("【Brush】任務 %s 本次新增了 %s 個下載" % (task_name, success_count))
 
     def remove_tasks_torrents(self):
         """
         根據條件檢查所有任務下載完成的種子，按條件進行刪除，並更新任務資料
-        由定時服務呼叫
+        由定時服務呼叫，使用同一下載器的任務一起檢查
         """
-
-        def __send_message(_task_name, _delete_type, _torrent_name):
-            """
-            傳送刪種訊息
-            """
-            _msg_title = "【刷流任務 {} 刪除做種】".format(_task_name)
-            _msg_text = "刪除原因：{}\n種子名稱：{}".format(_delete_type.value, _torrent_name)
-            self.message.send_brushtask_remove_message(title=_msg_title, text=_msg_text)
-
-        # 遍歷所有任務
+        downloader_tasks = {}
         for taskinfo in self._brush_tasks:
             if taskinfo.get("state") != "Y":
                 continue
+            downloader_tasks.setdefault(taskinfo.get("downloader"), []).append(taskinfo)
+        for download_id, tasks in downloader_tasks.items():
+            try:
+                self.__remove_downloader_torrents(download_id, tasks)
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+
+    def __send_remove_message(self, task_name, delete_type, torrent_name):
+        """
+        傳送刪種訊息
+        """
+        msg_title = "【刷流任務 {} 刪除做種】".format(task_name)
+        msg_text = "刪除原因：{}\n種子名稱：{}".format(delete_type.value, torrent_name)
+        self.message.send_brushtask_remove_message(title=msg_title, text=msg_text)
+
+    @staticmethod
+    def __get_qb_torrent_stat(torrent, completed):
+        """
+        計算qBittorrent種子的刪種檢查引數
+        :return: 種子ID, 種子名稱, 上傳量, 下載量, 刪種規則檢查引數
+        """
+        # 已開始時間 秒
+        dltime = int(time.time() - torrent.get("added_on"))
+        # 上傳量
+        uploaded = torrent.get("uploaded") or 0
+        # 平均上傳速度 Byte/s
+        avg_upspeed = int(uploaded / dltime)
+        # 下載量
+        downloaded = torrent.get("downloaded")
+        if completed:
+            # 已做種時間 秒
+            date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
+            date_now = int(time.mktime(datetime.now().timetuple()))
+            seeding_time = date_now - date_done if date_done else 0
+            rule_args = {
+                "seeding_time": seeding_time,
+                "ratio": torrent.get("ratio") or 0,
+                "uploaded": uploaded,
+                "avg_upspeed": avg_upspeed
+            }
+        else:
+            rule_args = {
+                "dltime": dltime,
+                "avg_upspeed": avg_upspeed
+            }
+        return torrent.get("hash"), torrent.get("name"), uploaded, downloaded, rule_args
+
+    @staticmethod
+    def __get_tr_torrent_stat(torrent, completed):
+        """
+        計算Transmission種子的刪種檢查引數
+        :return: 種子ID, 種子名稱, 上傳量, 下載量, 刪種規則檢查引數
+        """
+        # 下載量
+        downloaded = int(torrent.total_size * torrent.progress / 100)
+        # 上傳量
+        uploaded = int(downloaded * torrent.ratio)
+        if completed:
+            # 做種時間
+            date_done = torrent.date_done or torrent.date_added
+            date_now = int(time.mktime(datetime.now().timetuple()))
+            dltime = date_now - int(time.mktime(torrent.date_added.timetuple()))
+            seeding_time = date_now - int(time.mktime(date_done.timetuple()))
+            rule_args = {
+                "seeding_time": seeding_time,
+                "ratio": torrent.ratio or 0,
+                "uploaded": uploaded,
+                "avg_upspeed": int(uploaded / dltime)
+            }
+        else:
+            # 下載耗時
+            dltime = (datetime.now().astimezone() - torrent.date_added).seconds
+            rule_args = {
+                "dltime": dltime,
+                "avg_upspeed": int(uploaded / dltime)
+            }
+        return torrent.id, torrent.name, uploaded, downloaded, rule_args
+
+    def __remove_downloader_torrents(self, download_id, tasks):
+        """
+        檢查使用同一下載器的所有刷流任務：只查詢一次下載器種子列表，在記憶體中按刪種規則檢查，
+        最後統一刪除下載器種子並批次更新任務資料
+        """
+        # 任務 -> 種子ID列表
+        task_torrents = []
+        for taskinfo in tasks:
+            torrent_ids = [item.DOWNLOAD_ID for item in self.dbhelper.get_brushtask_torrents(taskinfo.get("id"))
+                           if item.DOWNLOAD_ID]
+            if torrent_ids:
+                task_torrents.append((taskinfo, torrent_ids))
+        if not task_torrents:
+            return
+        # 下載器引數
+        downloader_cfg = self.get_downloader_info(download_id)
+        if not downloader_cfg:
+            for taskinfo, _ in task_torrents:
+                log.warn("【Brush】任務 %s 下載器不存在" % taskinfo.get("name"))
+            return
+        task_names = "、".join([taskinfo.get("name") for taskinfo, _ in task_torrents])
+        # 查詢所有任務的種子，按狀態分為做種中和下載中
+        if downloader_cfg.get("type") == self._qb_client:
+            downloader = Qbittorrent(user_config=downloader_cfg)
+            torrent_ids = list(set([tid for _, ids in task_torrents for tid in ids]))
+            torrents, has_err = downloader.get_torrents(ids=torrent_ids)
+            get_torrent_stat = self.__get_qb_torrent_stat
+            # qBittorrent下載中的種子不計入任務上傳下載量
+            count_downloading = False
+            completed_torrents = [torrent for torrent in torrents if torrent.get("state") in self._qb_completed_states]
+            downloading_torrents = [torrent for torrent in torrents
+                                    if torrent.get("state") in self._qb_downloading_states]
+        else:
+            # 將查詢的torrent_ids轉為數字型
+            task_torrents = [(taskinfo, [int(x) for x in ids if str(x).isdigit()]) for taskinfo, ids in task_torrents]
+            downloader = Transmission(user_config=downloader_cfg)
+            torrent_ids = list(set([tid for _, ids in task_torrents for tid in ids]))
+            torrents, has_err = downloader.get_torrents(ids=torrent_ids)
+            get_torrent_stat = self.__get_tr_torrent_stat
+            count_downloading = True
+            completed_torrents = [torrent for torrent in torrents if torrent.status in self._tr_completed_states]
+            downloading_torrents = [torrent for torrent in torrents
+                                    if torrent.status in self._tr_downloading_states]
+        # 看看是否有錯誤, 有錯誤的話就不處理了
+        if has_err:
+            log.warn("【BRUSH】任務 %s 獲取種子狀態失敗" % task_names)
+            return
+        # 需要在下載器中刪除的種子
+        delete_ids = []
+        # 需要更新狀態的種子
+        update_torrents = []
+        # 下載器中已不存在的種子記錄
+        remove_records = []
+        # 任務上傳下載量
+        upload_counts = []
+        for taskinfo, torrent_ids in task_torrents:
             try:
-                # 總上傳量
-                total_uploaded = 0
-                # 總下載量
-                total_downloaded = 0
-                # 可以刪種的種子
-                delete_ids = []
-                # 需要更新狀態的種子
-                update_torrents = []
-                # 任務資訊
                 taskid = taskinfo.get("id")
                 task_name = taskinfo.get("name")
-                download_id = taskinfo.get("downloader")
                 remove_rule = taskinfo.get("remove_rule")
                 sendmessage = True if taskinfo.get("sendmessage") == "Y" else False
-                # 當前任務種子詳情
-                task_torrents = self.dbhelper.get_brushtask_torrents(taskid)
-                torrent_ids = [item.DOWNLOAD_ID for item in task_torrents if item.DOWNLOAD_ID]
-                if not torrent_ids:
-                    continue
-                # 下載器引數
-                downloader_cfg = self.get_downloader_info(download_id)
-                if not downloader_cfg:
-                    log.warn("【Brush】任務 %s 下載器不存在" % task_name)
-                    continue
-                # 下載器型別
-                client_type = downloader_cfg.get("type")
-                # qbittorrent
-                if client_type == self._qb_client:
-                    downloader = Qbittorrent(user_config=downloader_cfg)
-                    # 檢查完成狀態的
-                    torrents, has_err = downloader.get_torrents(ids=torrent_ids, status=["completed"])
-                    # 看看是否有錯誤, 有錯誤的話就不處理了
-                    if has_err:
-                        log.warn("【BRUSH】任務 %s 獲取種子狀態失敗" % task_name)
-                        continue
-                    remove_torrent_ids = list(
-                        set(torrent_ids).difference(set([torrent.get("hash") for torrent in torrents])))
-                    for torrent in torrents:
-                        # ID
-                        torrent_id = torrent.get("hash")
-                        # 已開始時間 秒
-                        dltime = int(time.time() - torrent.get("added_on"))
-                        # 已做種時間 秒
-                        date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
-                        date_now = int(time.mktime(datetime.now().timetuple()))
-                        seeding_time = date_now - date_done if date_done else 0
-                        # 分享率
-                        ratio = torrent.get("ratio") or 0
-                        # 上傳量
-                        uploaded = torrent.get("uploaded") or 0
-                        total_uploaded += uploaded
-                        # 平均上傳速度 Byte/s
-                        avg_upspeed = int(uploaded / dltime)
-                        # 下載量
-                        downloaded = torrent.get("downloaded")
-                        total_downloaded += downloaded
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            seeding_time=seeding_time,
-                                                                            ratio=ratio,
-                                                                            uploaded=uploaded,
-                                                                            avg_upspeed=avg_upspeed)
-                        if need_delete:
-                            log.info(
-                                "【Brush】%s 做種達到刪種條件：%s，刪除任務..." % (torrent.get('name'), delete_type.value))
-                            if sendmessage:
-                                __send_message(task_name, delete_type, torrent.get('name'))
-
-                            if torrent_id not in delete_ids:
-                                delete_ids.append(torrent_id)
-                                update_torrents.append(("%s,%s" % (uploaded, downloaded), taskid, torrent_id))
-                    # 檢查下載中狀態的
-                    torrents, has_err = downloader.get_torrents(ids=torrent_ids, status=["downloading"])
-                    # 看看是否有錯誤, 有錯誤的話就不處理了
-                    if has_err:
-                        log.warn("【BRUSH】任務 %s 獲取種子狀態失敗" % task_name)
-                        continue
-                    remove_torrent_ids = list(
-                        set(remove_torrent_ids).difference(set([torrent.get("hash") for torrent in torrents])))
-                    for torrent in torrents:
-                        # ID
-                        torrent_id = torrent.get("hash")
-                        # 下載耗時 秒
-                        dltime = int(time.time() - torrent.get("added_on"))
-                        # 上傳量 Byte
-                        uploaded = torrent.get("uploaded") or 0
-                        total_uploaded += uploaded
-                        # 平均上傳速度 Byte/s
-                        avg_upspeed = int(uploaded / dltime)
-                        # 下載量
-                        downloaded = torrent.get("downloaded")
-                        total_downloaded += downloaded
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            dltime=dltime,
-                                                                            avg_upspeed=avg_upspeed)
+                id_set = set(torrent_ids)
+                # 總上傳量
+                total_uploaded = 0
+                # 總下載量
+                total_downloaded = 0
+                # 本任務刪除的種子
+                task_delete_ids = []
+                task_update_torrents = []
+                exist_ids = set()
+                for completed, check_torrents in [(True, completed_torrents), (False, downloading_torrents)]:
+                    for torrent in check_torrents:
+                        torrent_id, torrent_name, uploaded, downloaded, rule_args = \
+                            get_torrent_stat(torrent, completed)
+                        if torrent_id not in id_set:
+                            continue
+                        exist_ids.add(torrent_id)
+                        if completed or count_downloading:
+                            total_uploaded += uploaded
+                            total_downloaded += downloaded
+                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule, **rule_args)
                         if need_delete:
-                            log.info(
-                                "【Brush】%s 達到刪種條件：%s，刪除下載任務..." % (torrent.get('name'), delete_type.value))
+                            if completed:
+                                log.info("【Brush】%s 做種達到刪種條件：%s，刪除任務..." % (torrent_name, delete_type.value))
+                            else:
+                                log.info("【Brush】%s 達到刪種條件：%s，刪除下載任務..." % (torrent_name, delete_type.value))
                             if sendmessage:
-                                __send_message(task_name, delete_type, torrent.get('name'))
+                                self.__send_remove_message(task_name, delete_type, torrent_name)
 
-                            if torrent_id not in delete_ids:
-                                delete_ids.append(torrent_id)
-                                update_torrents.append(("%s,%s" % (uploaded, downloaded), taskid, torrent_id))
-                # transmission
-                else:
-                    # 將查詢的torrent_ids轉為數字型
-                    torrent_ids = [int(x) for x in torrent_ids if str(x).isdigit()]
-                    # 檢查完成狀態
-                    downloader = Transmission(user_config=downloader_cfg)
-                    torrents, has_err = downloader.get_torrents(ids=torrent_ids, status=["seeding", "seed_pending"])
-                    # 看看是否有錯誤, 有錯誤的話就不處理了
-                    if has_err:
-                        log.warn("【BRUSH】任務 %s 獲取種子狀態失敗" % task_name)
-                        continue
-                    remove_torrent_ids = list(set(torrent_ids).difference(set([torrent.id for torrent in torrents])))
-                    for torrent in torrents:
-                        # ID
-                        torrent_id = torrent.id
-                        # 做種時間
-                        date_done = torrent.date_done or torrent.date_added
-                        date_now = int(time.mktime(datetime.now().timetuple()))
-                        dltime = date_now - int(time.mktime(torrent.date_added.timetuple()))
-                        seeding_time = date_now - int(time.mktime(date_done.timetuple()))
-                        # 下載量
-                        downloaded = int(torrent.total_size * torrent.progress / 100)
-                        total_downloaded += downloaded
-                        # 分享率
-                        ratio = torrent.ratio or 0
-                        # 上傳量
-                        uploaded = int(downloaded * torrent.ratio)
-                        total_uploaded += uploaded
-                        # 平均上傳速度
-                        avg_upspeed = int(uploaded / dltime)
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            seeding_time=seeding_time,
-                                                                            ratio=ratio,
-                                                                            uploaded=uploaded,
-                                                                            avg_upspeed=avg_upspeed)
-                        if need_delete:
-                            log.info("【Brush】%s 做種達到刪種條件：%s，刪除任務..." % (torrent.name, delete_type.value))
-                            if sendmessage:
-                                __send_message(task_name, delete_type, torrent.name)
-
-                            if torrent_id not in delete_ids:
-                                delete_ids.append(torrent_id)
-                                update_torrents.append(("%s,%s" % (uploaded, downloaded), taskid, torrent_id))
-                    # 檢查下載狀態
-                    torrents, has_err = downloader.get_torrents(ids=torrent_ids,
-                                                                status=["downloading", "download_pending", "stopped"])
-                    # 看看是否有錯誤, 有錯誤的話就不處理了
-                    if has_err:
-                        log.warn("【BRUSH】任務 %s 獲取種子狀態失敗" % task_name)
-                        continue
-                    remove_torrent_ids = list(
-                        set(remove_torrent_ids).difference(set([torrent.id for torrent in torrents])))
-                    for torrent in torrents:
-                        # ID
-                        torrent_id = torrent.id
-                        # 下載耗時
-                        dltime = (datetime.now().astimezone() - torrent.date_added).seconds
-                        # 下載量
-                        downloaded = int(torrent.total_size * torrent.progress / 100)
-                        total_downloaded += downloaded
-                        # 上傳量
-                        uploaded = int(downloaded * torrent.ratio)
-                        total_uploaded += uploaded
-                        # 平均上傳速度
-                        avg_upspeed = int(uploaded / dltime)
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            dltime=dltime,
-                                                                            avg_upspeed=avg_upspeed)
-                        if need_delete:
-                            log.info("【Brush】%s 達到刪種條件：%s，刪除下載任務..." % (torrent.name, delete_type.value))
-                            if sendmessage:
-                                __send_message(task_name, delete_type, torrent.name)
-
-                            if torrent_id not in delete_ids:
-                                delete_ids.append(torrent_id)
-                                update_torrents.append(("%s,%s" % (uploaded, downloaded), taskid, torrent_id))
-                # 手工刪除的種子，清除對應記錄
-                if remove_torrent_ids:
-                    log.info("【Brush】任務 %s 的這些下載任務在下載器中不存在，將刪除任務記錄：%s" % (
-                        task_name, remove_torrent_ids))
-                    for remove_torrent_id in remove_torrent_ids:
-                        self.dbhelper.delete_brushtask_torrent(taskid, remove_torrent_id)
-                # 更新種子狀態為已刪除
-                self.dbhelper.update_brushtask_torrent_state(update_torrents)
-                # 刪除下載器種子
-                if delete_ids:
-                    downloader.delete_torrents(delete_file=True, ids=delete_ids)
-                    log.info("【Brush】任務 %s 共刪除 %s 個刷流下載任務" % (task_name, len(delete_ids)))
-                else:
-                    log.info("【Brush】任務 %s 本次檢查未刪除下載任務" % task_name)
-                # 更新上傳下載量和刪除種子數
-                self.dbhelper.add_brushtask_upload_count(brush_id=taskid,
-                                                         upload_size=total_uploaded,
-                                                         download_size=total_downloaded,
-                                                         remove_count=len(delete_ids) + len(remove_torrent_ids))
+                            if torrent_id not in task_delete_ids:
+                                task_delete_ids.append(torrent_id)
+                                task_update_torrents.append(("%s,%s" % (uploaded, downloaded), taskid, torrent_id))
+                remove_torrent_ids = list(id_set.difference(exist_ids))
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
+                continue
+            # 手工刪除的種子，清除對應記錄
+            if remove_torrent_ids:
+                log.info("【Brush】任務 %s 的這些下載任務在下載器中不存在，將刪除任務記錄：%s" % (
+                    task_name, remove_torrent_ids))
+                remove_records.extend([(taskid, remove_torrent_id) for remove_torrent_id in remove_torrent_ids])
+            if task_delete_ids:
+                log.info("【Brush】任務 %s 共刪除 %s 個刷流下載任務" % (task_name, len(task_delete_ids)))
+            else:
+                log.info("【Brush】任務 %s 本次檢查未刪除下載任務" % task_name)
+            for torrent_id in task_delete_ids:
+                if torrent_id not in delete_ids:
+                    delete_ids.append(torrent_id)
+            update_torrents.extend(task_update_torrents)
+            upload_counts.append((taskid,
+                                  total_uploaded,
+                                  total_downloaded,
+                                  len(task_delete_ids) + len(remove_torrent_ids)))
+        # 清除不存在的種子記錄
+        self.dbhelper.delete_brushtask_torrents(remove_records)
+        # 更新種子狀態為已刪除
+        self.dbhelper.update_brushtask_torrent_state(update_torrents)
+        # 刪除下載器種子
+        if delete_ids:
+            downloader.delete_torrents(delete_file=True, ids=delete_ids)
+        # 更新上傳下載量和刪除種子數
+        self.dbhelper.add_brushtask_upload_counts(upload_counts)
 
     def __is_allow_new_torrent(self, taskid, taskname, downloadercfg, seedsize, dlcount):
         """
@@ -632,25 +665,19 @@ class BrushTask(object):
 
         return True
 
-    def __check_rss_rule(self,
-                         rss_rule,
+    @staticmethod
+    def __check_rss_rule(rss_rule,
                          title,
                          description,
-                         torrent_url,
                          torrent_size,
-                         pubdate,
-                         cookie,
-                         ua):
+                         pubdate):
         """
-        檢查種子是否符合刷流過濾條件
+        檢查種子是否符合刷流過濾條件中不需要種子詳情的部分
         :param rss_rule: 過濾條件字典
         :param title: 種子名稱
         :param description: 種子副標題
-        :param torrent_url: 種子頁面地址
         :param torrent_size: 種子大小
         :param pubdate: 釋出時間
-        :param cookie: Cookie
-        :param ua: User-Agent
         :return: 是否命中
         """
         if not rss_rule:
@@ -685,10 +712,47 @@ class BrushTask(object):
                 if re.search(r"%s" % rss_rule.get("exclude"), "%s %s" % (title, description), re.IGNORECASE):
                     return False
 
-            torrent_attr = self.sites.check_torrent_attr(torrent_url=torrent_url, cookie=cookie, ua=ua)
-            torrent_peer_count = torrent_attr.get("peer_count")
-            log.debug("【Brush】%s 解析詳情, %s" % (title, torrent_attr))
+            # 檢查釋出時間
+            if rss_rule.get("pubdate") and pubdate:
+                rule_pubdates = rss_rule.get("pubdate").split("#")
+                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
+                    localtz = pytz.timezone('Asia/Shanghai')
+                    localnowtime = datetime.now().astimezone(localtz)
+                    localpubdate = pubdate.astimezone(localtz)
+                    log.debug('【Brush】釋出時間：%s，當前時間：%s' % (localpubdate.isoformat(), localnowtime.isoformat()))
+                    if (localnowtime - localpubdate).seconds / 3600 > float(rule_pubdates[1]):
+                        log.debug("【Brush】釋出時間不符合條件。")
+                        return False
 
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+
+        return True
+
+    @staticmethod
+    def __is_torrent_attr_rule(rss_rule):
+        """
+        刷流過濾條件是否需要檢查種子詳情
+        """
+        if not rss_rule:
+            return False
+        return rss_rule.get("free") in ["FREE", "2XFREE"] \
+            or rss_rule.get("hr") \
+            or rss_rule.get("peercount")
+
+    @staticmethod
+    def __check_torrent_attr_rule(rss_rule, title, torrent_attr):
+        """
+        檢查種子詳情是否符合刷流過濾條件
+        :param rss_rule: 過濾條件字典
+        :param title: 種子名稱
+        :param torrent_attr: 種子詳情頁屬性
+        :return: 是否命中
+        """
+        if not rss_rule:
+            return True
+        try:
+            torrent_peer_count = torrent_attr.get("peer_count")
             # 檢查免費狀態
             if rss_rule.get("free") == "FREE":
                 if not torrent_attr.get("free"):
@@ -736,18 +800,6 @@ class BrushTask(object):
                             title, min_count, peer_counts[0], torrent_peer_count, peer_counts[0], max_count))
                         return False
 
-            # 檢查釋出時間
-            if rss_rule.get("pubdate") and pubdate:
-                rule_pubdates = rss_rule.get("pubdate").split("#")
-                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
-                    localtz = pytz.timezone('Asia/Shanghai')
-                    localnowtime = datetime.now().astimezone(localtz)
-                    localpubdate = pubdate.astimezone(localtz)
-                    log.debug('【Brush】釋出時間：%s，當前時間：%s' % (localpubdate.isoformat(), localnowtime.isoformat()))
-                    if (localnowtime - localpubdate).seconds / 3600 > float(rule_pubdates[1]):
-                        log.debug("【Brush】釋出時間不符合條件。")
-                        return False
-
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
@@ -1,39 +1,141 @@
 import os
+import queue
+import sqlite3
 import threading
-from sqlalchemy import create_engine
+from concurrent.futures import Future
+
+import log
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
 from app.db.models import Base
+from app.db.sqlite_engine import create_sqlite_engine, create_fts_index
 from app.utils.exception_utils import ExceptionUtils
-from config import Config
+from config import Config, DB_WRITE_BATCH_SIZE, DB_BUSY_TIMEOUT
 from app.utils import PathUtils
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'user.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=50,
-    pool_recycle=60 * 30
-)
+_DbFile = os.path.join(Config().get_config_path(), 'user.db')
+# 讀連線池，各執行緒並行讀取
+_Engine = create_sqlite_engine(_DbFile, pool_size=50)
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False,
                                        expire_on_commit=False))
+# 寫連線，只由寫入執行緒使用
+_WriterEngine = create_sqlite_engine(_DbFile, pool_size=1, writer=True)
+_WriterSession = scoped_session(sessionmaker(bind=_WriterEngine,
+                                             autoflush=True,
+                                             autocommit=False,
+                                             expire_on_commit=False))
+
+
+class DbWriter:
+    """
+    資料庫寫入執行緒：所有寫操作在該執行緒中序列執行，同時到達的寫操作合併在一個事務中提交，
+    每個寫操作使用獨立的SAVEPOINT，失敗時只回滾自身
+    """
+    _queue = queue.Queue()
+    _thread = None
+
+    @classmethod
+    def is_writer_thread(cls):
+        return threading.current_thread() is cls._thread
+
+    @classmethod
+    def submit(cls, func, *args, **kwargs):
+        """
+        提交一個寫操作，返回Future
+        """
+        with lock:
+            if not cls._thread:
+                cls._thread = threading.Thread(target=cls.__run, name="DbWriter", daemon=True)
+                cls._thread.start()
+        future = Future()
+        cls._queue.put((future, func, args, kwargs))
+        return future
+
+    @classmethod
+    def __run(cls):
+        while True:
+            tasks = [cls._queue.get()]
+            while len(tasks) < DB_WRITE_BATCH_SIZE:
+                try:
+                    tasks.append(cls._queue.get_nowait())
+                except queue.Empty:
+                    break
+            cls.__execute(tasks)
+
+    @staticmethod
+    def __execute(tasks):
+        session = _WriterSession()
+        results = []
+        for future, func, args, kwargs in tasks:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with session.begin_nested():
+                    results.append((future, func(*args, **kwargs), None))
+            except Exception as e:
+                results.append((future, None, e))
+        try:
+            session.commit()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            log.error(f"【Db】資料庫提交失敗：{str(e)}")
+            session.rollback()
+            results = [(future, None, e) for future, _, _ in results]
+        for future, ret, err in results:
+            if err:
+                future.set_exception(err)
+            else:
+                future.set_result(ret)
 
 
 class MainDb:
 
     @property
     def session(self):
+        if DbWriter.is_writer_thread():
+            return _WriterSession()
         return _Session()
 
     @staticmethod
     def init_db():
         with lock:
             Base.metadata.create_all(_Engine)
+            create_fts_index(_Engine, "TRANSFER_HISTORY", ["SOURCE_FILENAME", "TITLE"], rowid="ID")
+
+    @staticmethod
+    def backup(dest_file):
+        """
+        使用SQLite備份API複製資料庫，包含WAL中已提交但尚未合併到主檔案的資料
+        :param dest_file: 備份檔案路徑
+        """
+        src = sqlite3.connect(_DbFile)
+        dest = sqlite3.connect(dest_file)
+        try:
+            src.backup(dest)
+        finally:
+            dest.close()
+            src.close()
+
+    @staticmethod
+    def restore(src_file):
+        """
+        使用SQLite備份API將備份檔案恢復到當前資料庫，寫入時持有資料庫寫鎖，
+        不直接覆蓋資料庫檔案，避免殘留的WAL被重放到恢復後的檔案上
+        :param src_file: 備份檔案路徑
+        """
+        src = sqlite3.connect(src_file)
+        dest = sqlite3.connect(_DbFile, timeout=DB_BUSY_TIMEOUT)
+        try:
+            src.backup(dest)
+        finally:
+            dest.close()
+            src.close()
+        # 連線池中的連線重新建立
+        _Engine.dispose()
+        _WriterEngine.dispose()
 
     def init_data(self):
         """
@@ -96,10 +198,16 @@ class MainDb:
         """
         self.session.rollback()
 
+    def expire(self):
+        """
+        使當前執行緒已載入的物件過期，下次訪問時重新讀取
+        """
+        self.session.expire_all()
+
 
 class DbPersist(object):
     """
-    資料庫持久化裝飾器
+    資料庫持久化裝飾器，被裝飾的方法交由寫入執行緒執行並等待結果
     """
 
     def __init__(self, db):
@@ -107,13 +215,23 @@ class DbPersist(object):
 
     def __call__(self, f):
         def persist(*args, **kwargs):
+            if DbWriter.is_writer_thread():
+                # 寫操作中巢狀呼叫，在當前事務的SAVEPOINT中執行
+                try:
+                    with self.db.session.begin_nested():
+                        ret = f(*args, **kwargs)
+                    return True if ret is None else ret
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    return False
             try:
-                ret = f(*args, **kwargs)
-                self.db.commit()
+                ret = DbWriter.submit(f, *args, **kwargs).result()
                 return True if ret is None else ret
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
-                self.db.rollback()
                 return False
+            finally:
+                # 讀連線中已載入的物件可能已被修改
+                self.db.expire()
 
         return persist
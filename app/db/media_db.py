@@ -1,22 +1,16 @@
 import os
 import threading
 import time
-from sqlalchemy import create_engine
+from sqlalchemy import func, literal_column, or_, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
-from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC
+from app.db.sqlite_engine import create_sqlite_engine, create_fts_index, fts_rowids
+from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC, TMDBCACHE
 from app.utils.exception_utils import ExceptionUtils
-from config import Config
+from config import Config, MEDIASYNC_PAGE_SIZE
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'media.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=10,
-    pool_recycle=60 * 30
-)
+_Engine = create_sqlite_engine(os.path.join(Config().get_config_path(), 'media.db'), pool_size=10)
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False))
@@ -32,6 +26,7 @@ class MediaDb:
     def init_db():
         with lock:
             BaseMedia.metadata.create_all(_Engine)
+            create_fts_index(_Engine, "TMDB_CACHE", ["KEY"])
 
     def insert(self, server_type, iteminfo):
         if not server_type or not iteminfo:
@@ -59,11 +54,82 @@ class MediaDb:
             self.session.rollback()
         return False
 
+    def upsert_items(self, server_type, items):
+        """
+        批次寫入媒體，已存在的按ITEM_ID替換，在一個事務中提交
+        """
+        if not server_type or not items:
+            return False
+        # 同一批中重複的媒體只保留最後一個
+        items = list({item.get("id"): item for item in items}.values())
+        try:
+            self.session.query(MEDIASYNCITEMS).filter(
+                MEDIASYNCITEMS.SERVER == server_type,
+                MEDIASYNCITEMS.ITEM_ID.in_([item.get("id") for item in items])).delete(synchronize_session=False)
+            self.session.execute(MEDIASYNCITEMS.__table__.insert(), [{
+                "SERVER": server_type,
+                "LIBRARY": item.get("library"),
+                "ITEM_ID": item.get("id"),
+                "ITEM_TYPE": item.get("type"),
+                "TITLE": item.get("title"),
+                "ORGIN_TITLE": item.get("originalTitle"),
+                "YEAR": item.get("year"),
+                "TMDBID": item.get("tmdbid"),
+                "IMDBID": item.get("imdbid"),
+                "PATH": item.get("path")
+            } for item in items])
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def get_item_ids(self, server_type):
+        """
+        查詢已同步的媒體ID
+        """
+        if not server_type:
+            return []
+        return [item.ITEM_ID for item in
+                self.session.query(MEDIASYNCITEMS.ITEM_ID).filter(MEDIASYNCITEMS.SERVER == server_type)]
+
+    def delete_items(self, server_type, item_ids):
+        """
+        批次刪除媒體伺服器中已不存在的媒體
+        """
+        if not server_type or not item_ids:
+            return True
+        try:
+            item_ids = list(item_ids)
+            for i in range(0, len(item_ids), MEDIASYNC_PAGE_SIZE):
+                self.session.query(MEDIASYNCITEMS).filter(
+                    MEDIASYNCITEMS.SERVER == server_type,
+                    MEDIASYNCITEMS.ITEM_ID.in_(item_ids[i:i + MEDIASYNC_PAGE_SIZE])).delete(synchronize_session=False)
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def get_items_count(self, server_type):
+        """
+        按型別統計已同步的媒體數
+        :return: 型別 -> 數量
+        """
+        if not server_type:
+            return {}
+        return dict(self.session.query(MEDIASYNCITEMS.ITEM_TYPE, func.count(MEDIASYNCITEMS.ID)).filter(
+            MEDIASYNCITEMS.SERVER == server_type).group_by(MEDIASYNCITEMS.ITEM_TYPE).all())
+
     def empty(self, server_type=None, library=None):
         try:
             if server_type and library:
                 self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
                                                           MEDIASYNCITEMS.LIBRARY == library).delete()
+            elif server_type:
+                self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type).delete()
             else:
                 self.session.query(MEDIASYNCITEMS).delete()
             self.session.commit()
@@ -112,7 +178,105 @@ class MediaDb:
                 return True
         return False
 
+    def get_exists_items(self, server_type, titles, tmdbids=None):
+        """
+        批次查詢已同步的媒體，用於按exists的規則判斷一組媒體是否存在
+        :return: (名稱, 年份)集合，名稱集合，TMDBID集合
+        """
+        titles = [title for title in set(titles or []) if title]
+        tmdbids = [str(tmdbid) for tmdbid in set(tmdbids or []) if tmdbid]
+        if not server_type or not titles:
+            return set(), set(), set()
+        title_years, exist_titles, exist_tmdbids = set(), set(), set()
+        for server, title, year, tmdbid in self.session.query(MEDIASYNCITEMS.SERVER,
+                                                              MEDIASYNCITEMS.TITLE,
+                                                              MEDIASYNCITEMS.YEAR,
+                                                              MEDIASYNCITEMS.TMDBID).filter(
+                or_(and_(MEDIASYNCITEMS.SERVER == server_type, MEDIASYNCITEMS.TITLE.in_(titles)),
+                    MEDIASYNCITEMS.TMDBID.in_(tmdbids))):
+            if server == server_type and title in titles:
+                title_years.add((title, year))
+                exist_titles.add(title)
+            if tmdbid in tmdbids:
+                exist_tmdbids.add(tmdbid)
+        return title_years, exist_titles, exist_tmdbids
+
     def get_statistics(self, server_type):
         if not server_type:
             return None
         return self.session.query(MEDIASYNCSTATISTIC).filter(MEDIASYNCSTATISTIC.SERVER == server_type).first()
+
+    def get_tmdb_cache(self, key):
+        if not key:
+            return None
+        return self.session.query(TMDBCACHE).filter(TMDBCACHE.KEY == key).first()
+
+    def insert_tmdb_caches(self, items):
+        """
+        批次插入TMDB快取，已存在的KEY不覆蓋
+        """
+        if not items:
+            return True
+        try:
+            self.session.execute(sqlite_insert(TMDBCACHE).values(items).on_conflict_do_nothing(
+                index_elements=[TMDBCACHE.KEY]))
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def update_tmdb_cache(self, key, **kwargs):
+        if not key or not kwargs:
+            return False
+        try:
+            count = self.session.query(TMDBCACHE).filter(TMDBCACHE.KEY == key).update(kwargs)
+            self.session.commit()
+            return count > 0
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def delete_tmdb_cache(self, key=None, tmdbid=None):
+        """
+        按KEY或TMDBID刪除TMDB快取，都為空時清空
+        """
+        try:
+            query = self.session.query(TMDBCACHE)
+            if key:
+                query = query.filter(TMDBCACHE.KEY == key)
+            elif tmdbid is not None:
+                query = query.filter(TMDBCACHE.TMDBID == str(tmdbid))
+            count = query.delete()
+            self.session.commit()
+            return count
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return 0
+
+    def search_tmdb_caches(self, search, page, num, after=None, before=None):
+        """
+        分頁檢索已識別的TMDB快取，按KEY排序
+        :param after: 上一頁最後一條記錄的KEY，有值時按遊標查詢下一頁
+        :param before: 下一頁第一條記錄的KEY，有值時按遊標查詢上一頁
+        :return: 總數, 當前頁記錄
+        """
+        query = self.session.query(TMDBCACHE).filter(TMDBCACHE.TMDBID != '0')
+        if search:
+            rowids = fts_rowids("TMDB_CACHE", search)
+            if rowids is not None:
+                query = query.filter(literal_column("TMDB_CACHE.rowid").in_(rowids))
+            else:
+                query = query.filter(TMDBCACHE.KEY.like(f"%{search}%"))
+        total = query.count()
+        if after:
+            rows = query.filter(TMDBCACHE.KEY > after).order_by(TMDBCACHE.KEY).limit(num).all()
+        elif before:
+            rows = query.filter(TMDBCACHE.KEY < before).order_by(TMDBCACHE.KEY.desc()).limit(num).all()
+            rows.reverse()
+        else:
+            rows = query.order_by(TMDBCACHE.KEY).limit(num).offset((page - 1) * num).all()
+        return total, rows
@@ -488,6 +488,9 @@ class TRANSFERBLACKLIST(Base):
 
 class TRANSFERHISTORY(Base):
     __tablename__ = 'TRANSFER_HISTORY'
+    __table_args__ = (
+        Index('INDX_TRANSFER_HISTORY_DATE', 'DATE'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     MODE = Column(Text)
@@ -558,3 +561,16 @@ class MEDIASYNCSTATISTIC(BaseMedia):
     MOVIE_COUNT = Column(Text)
     TV_COUNT = Column(Text)
     UPDATE_TIME = Column(Text)
+
+
+class TMDBCACHE(BaseMedia):
+    __tablename__ = 'TMDB_CACHE'
+
+    KEY = Column(Text, primary_key=True)
+    TMDBID = Column(Text, index=True)
+    TYPE = Column(Text)
+    TITLE = Column(Text)
+    YEAR = Column(Text)
+    POSTER_PATH = Column(Text)
+    BACKDROP_PATH = Column(Text)
+    EXPIRE = Column(Integer)
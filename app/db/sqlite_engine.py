@@ -0,0 +1,97 @@
+import log
+from sqlalchemy import create_engine, event, text, column
+from sqlalchemy.pool import QueuePool
+
+from app.utils.exception_utils import ExceptionUtils
+from config import DB_CACHE_SIZE, DB_MMAP_SIZE, DB_BUSY_TIMEOUT
+
+# 已建立全文索引的表
+_fts_tables = set()
+
+
+def create_sqlite_engine(db_file, pool_size, writer=False):
+    """
+    建立SQLite引擎，連線時開啟WAL並設定同步、快取、記憶體對映等引數
+    :param db_file: 資料庫檔案路徑
+    :param pool_size: 連線池大小
+    :param writer: 是否為寫入引擎，寫入引擎由SQLAlchemy控制事務（支援SAVEPOINT），事務開始即獲取寫鎖
+    """
+    engine = create_engine(
+        f"sqlite:///{db_file}?check_same_thread=False",
+        echo=False,
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_size=pool_size,
+        pool_recycle=60 * 30,
+        connect_args={"timeout": DB_BUSY_TIMEOUT}
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _):
+        if writer:
+            # 停用pysqlite自身的事務處理，由begin事件開始事務
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    if writer:
+        @event.listens_for(engine, "begin")
+        def do_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def create_fts_index(engine, table, columns, rowid="rowid"):
+    """
+    為表建立FTS5全文索引，使用trigram分詞支援任意子串匹配，由觸發器與原表保持同步，新建立時從原表重建
+    :param engine: 資料庫引擎
+    :param table: 原表名
+    :param columns: 索引的欄位
+    :param rowid: 原表的rowid欄位
+    """
+    fts_table = f"{table}_FTS"
+    fts_columns = ", ".join(columns)
+    new_values = ", ".join([f"new.{col}" for col in columns])
+    old_values = ", ".join([f"old.{col}" for col in columns])
+    try:
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                                          (fts_table,)).first()
+            conn.exec_driver_sql(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                                 f"{fts_columns}, content='{table}', content_rowid='{rowid}', tokenize='trigram')")
+            conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts_table}_AI AFTER INSERT ON {table} BEGIN "
+                                 f"INSERT INTO {fts_table}(rowid, {fts_columns}) VALUES (new.{rowid}, {new_values}); "
+                                 f"END")
+            conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts_table}_AD AFTER DELETE ON {table} BEGIN "
+                                 f"INSERT INTO {fts_table}({fts_table}, rowid, {fts_columns}) "
+                                 f"VALUES ('delete', old.{rowid}, {old_values}); "
+                                 f"END")
+            conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts_table}_AU AFTER UPDATE OF {fts_columns} "
+                                 f"ON {table} BEGIN "
+                                 f"INSERT INTO {fts_table}({fts_table}, rowid, {fts_columns}) "
+                                 f"VALUES ('delete', old.{rowid}, {old_values}); "
+                                 f"INSERT INTO {fts_table}(rowid, {fts_columns}) VALUES (new.{rowid}, {new_values}); "
+                                 f"END")
+            if not exists:
+                conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        _fts_tables.add(table)
+    except Exception as e:
+        ExceptionUtils.exception_traceback(e)
+        log.warn(f"【Db】{table} 全文索引建立失敗，檢索時將逐行匹配：{str(e)}")
+
+
+def fts_rowids(table, search):
+    """
+    全文索引中匹配檢索詞的rowid子查詢
+    :return: 子查詢，全文索引不可用或檢索詞少於3個字元（trigram無法匹配）時返回None
+    """
+    if table not in _fts_tables or not search or len(search) < 3:
+        return None
+    return text(f"SELECT rowid FROM {table}_FTS WHERE {table}_FTS MATCH :fts_query").bindparams(
+        fts_query='"%s"' % search.replace('"', '""')).columns(column("rowid"))
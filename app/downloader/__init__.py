@@ -1 +1,2 @@
 from .downloader import Downloader
+from .torrent_mirror import TorrentMirror
@@ -9,6 +9,7 @@ from pkg_resources import parse_version as v
 import log
 import qbittorrentapi
 from app.downloader.download_client import IDownloadClient
+from app.downloader.torrent_mirror import TorrentMirror
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import DownloaderType
 from config import Config
@@ -20,6 +21,13 @@ class Qbittorrent(IDownloadClient):
     qbc = None
     ver = None
     client_type = DownloaderType.QB
+    # 狀態過濾條件對應的種子狀態，用於在種子映象中過濾
+    STATUS_FILTER_STATES = {
+        "completed": ["uploading", "stalledUP", "pausedUP", "stoppedUP", "queuedUP", "checkingUP", "forcedUP"],
+        "downloading": ["downloading", "metaDL", "forcedMetaDL", "stalledDL", "pausedDL", "stoppedDL", "queuedDL",
+                        "checkingDL", "forcedDL"],
+        "paused": ["pausedDL", "pausedUP", "stoppedDL", "stoppedUP"]
+    }
 
     def get_config(self):
         # 讀取配置檔案
@@ -78,14 +86,39 @@ class Qbittorrent(IDownloadClient):
         """
         if not self.qbc:
             return [], True
-        try:
-            torrents = self.qbc.torrents_info(torrent_hashes=ids, status_filter=status, tag=tag)
-            if self.is_ver_less_4_4():
-                torrents = self.filter_torrent_by_tag(torrents, tag=tag)
-            return torrents or [], False
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
+        if status and not isinstance(status, list):
+            status = [status]
+        # 種子映象不支援的狀態過濾，直接查詢下載器
+        if status and [s for s in status if s not in self.STATUS_FILTER_STATES]:
+            try:
+                torrents = self.qbc.torrents_info(torrent_hashes=ids, status_filter=status, tag=tag)
+                if self.is_ver_less_4_4():
+                    torrents = self.filter_torrent_by_tag(torrents, tag=tag)
+                return torrents or [], False
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                return [], True
+        torrents, has_err = TorrentMirror().get_torrents(self)
+        if has_err:
             return [], True
+        if ids and not isinstance(ids, list):
+            ids = [ids]
+        ids = set(ids) if ids else None
+        if tag and not isinstance(tag, list):
+            tag = [tag]
+        states = set([state for s in status for state in self.STATUS_FILTER_STATES.get(s)]) if status else None
+        ret_torrents = []
+        for torrent in torrents:
+            if ids and torrent.get("hash") not in ids:
+                continue
+            if states and torrent.get("state") not in states:
+                continue
+            if tag:
+                torrent_tags = [t.strip() for t in (torrent.get("tags") or "").split(",")]
+                if [t for t in tag if t and t not in torrent_tags]:
+                    continue
+            ret_torrents.append(torrent)
+        return ret_torrents, False
 
     def get_completed_torrents(self, tag=None):
         """
@@ -114,7 +147,9 @@ class Qbittorrent(IDownloadClient):
         :param tag: 標籤內容
         """
         try:
-            return self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
+            ret = self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
+            TorrentMirror().invalidate(self)
+            return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
@@ -128,6 +163,7 @@ class Qbittorrent(IDownloadClient):
             # 超級做種
             if self._force_upload:
                 self.qbc.torrents_set_force_start(enable=True, torrent_hashes=ids)
+            TorrentMirror().invalidate(self)
             log.info(f"【{self.client_type}】設定qBittorrent種子狀態成功")
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
@@ -138,6 +174,7 @@ class Qbittorrent(IDownloadClient):
         """
         try:
             self.qbc.torrents_set_force_start(enable=True, torrent_hashes=ids)
+            TorrentMirror().invalidate(self)
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
@@ -344,6 +381,7 @@ class Qbittorrent(IDownloadClient):
                                             seeding_time_limit=seeding_time_limit,
                                             use_auto_torrent_management=use_auto_torrent_management,
                                             cookie=cookie)
+            TorrentMirror().invalidate(self)
             return True if qbc_ret and str(qbc_ret).find("Ok") != -1 else False
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
@@ -353,7 +391,9 @@ class Qbittorrent(IDownloadClient):
         if not self.qbc:
             return False
         try:
-            return self.qbc.torrents_resume(torrent_hashes=ids)
+            ret = self.qbc.torrents_resume(torrent_hashes=ids)
+            TorrentMirror().invalidate(self)
+            return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
@@ -362,7 +402,9 @@ class Qbittorrent(IDownloadClient):
         if not self.qbc:
             return False
         try:
-            return self.qbc.torrents_pause(torrent_hashes=ids)
+            ret = self.qbc.torrents_pause(torrent_hashes=ids)
+            TorrentMirror().invalidate(self)
+            return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
@@ -374,6 +416,7 @@ class Qbittorrent(IDownloadClient):
             return False
         try:
             ret = self.qbc.torrents_delete(delete_files=delete_file, torrent_hashes=ids)
+            TorrentMirror().invalidate(self)
             return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
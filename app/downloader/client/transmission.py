@@ -10,6 +10,7 @@ from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import DownloaderType
 from config import Config
 from app.downloader.download_client import IDownloadClient
+from app.downloader.torrent_mirror import TorrentMirror
 
 
 class Transmission(IDownloadClient):
@@ -63,14 +64,16 @@ class Transmission(IDownloadClient):
         if not self.trc:
             return [], True
         if isinstance(ids, list):
-            ids = [int(x) for x in ids if str(x).isdigit()]
+            ids = set([int(x) for x in ids if str(x).isdigit()])
         elif str(ids).isdigit():
-            ids = int(ids)
-        try:
-            torrents = self.trc.get_torrents(ids=ids, arguments=self._trarg)
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
+            ids = {int(ids)}
+        else:
+            ids = None
+        torrents, has_err = TorrentMirror().get_torrents(self, arguments=self._trarg)
+        if has_err:
             return [], True
+        if ids is not None:
+            torrents = [torrent for torrent in torrents if torrent.id in ids]
         if status and not isinstance(status, list):
             status = [status]
         if tag and not isinstance(tag, list):
@@ -136,6 +139,7 @@ class Transmission(IDownloadClient):
         # 打標籤
         try:
             self.trc.change_torrent(labels=tags, ids=ids)
+            TorrentMirror().invalidate(self, ids=ids)
             log.info(f"【{self.client_type}】設定transmission種子標籤成功")
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
@@ -145,6 +149,7 @@ class Transmission(IDownloadClient):
             return
         try:
             self.trc.change_torrent(labels=tag, ids=int(tid))
+            TorrentMirror().invalidate(self, ids=int(tid))
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
@@ -211,6 +216,7 @@ class Transmission(IDownloadClient):
                                     seedRatioLimit=seedRatioLimit,
                                     seedIdleMode=seedIdleMode,
                                     seedIdleLimit=seedIdleLimit)
+            TorrentMirror().invalidate(self, ids=ids)
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
@@ -328,6 +334,7 @@ class Transmission(IDownloadClient):
                                        download_dir=download_dir,
                                        paused=is_paused,
                                        cookies=cookie)
+            TorrentMirror().invalidate(self)
             if ret and ret.id:
                 if upload_limit:
                     self.set_uploadspeed_limit(ret.id, int(upload_limit))
@@ -346,7 +353,9 @@ class Transmission(IDownloadClient):
         elif str(ids).isdigit():
             ids = int(ids)
         try:
-            return self.trc.start_torrent(ids=ids)
+            ret = self.trc.start_torrent(ids=ids)
+            TorrentMirror().invalidate(self, ids=ids)
+            return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
@@ -359,7 +368,9 @@ class Transmission(IDownloadClient):
         elif str(ids).isdigit():
             ids = int(ids)
         try:
-            return self.trc.stop_torrent(ids=ids)
+            ret = self.trc.stop_torrent(ids=ids)
+            TorrentMirror().invalidate(self, ids=ids)
+            return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
@@ -374,7 +385,9 @@ class Transmission(IDownloadClient):
         elif str(ids).isdigit():
             ids = int(ids)
         try:
-            return self.trc.remove_torrent(delete_data=delete_file, ids=ids)
+            ret = self.trc.remove_torrent(delete_data=delete_file, ids=ids)
+            TorrentMirror().invalidate(self, ids=ids)
+            return ret
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
@@ -0,0 +1,178 @@
+import time
+from threading import Lock
+
+import qbittorrentapi
+
+from app.utils.commons import singleton
+from app.utils.exception_utils import ExceptionUtils
+from app.utils.types import DownloaderType
+from config import DOWNLOADER_SYNC_INTERVAL
+
+lock = Lock()
+
+
+@singleton
+class TorrentMirror(object):
+    """
+    下載器種子狀態映象，每個下載器（按型別、地址和使用者區分）在記憶體中儲存一份全部種子的狀態，
+    超過同步間隔或本程序修改過種子後，讀取時先增量同步：
+    qBittorrent使用sync/maindata的rid增量資料，Transmission使用recently-active模式
+    """
+    # Transmission的recently-active只返回最近60秒內有活動的種子，超過該間隔未同步時改為全量同步
+    _tr_recent_window = 50
+    _mirrors = {}
+
+    def __init__(self):
+        self._mirrors = {}
+
+    def __get_mirror(self, client):
+        """
+        獲取下載器對應的映象
+        """
+        key = "%s|%s:%s|%s" % (client.client_type.value, client.host, client.port, client.username)
+        mirror = self._mirrors.get(key)
+        if mirror:
+            return mirror
+        with lock:
+            mirror = self._mirrors.get(key)
+            if not mirror:
+                mirror = self._mirrors[key] = {
+                    "name": "%s %s:%s" % (client.client_type.value, client.host, client.port),
+                    "lock": Lock(),
+                    # 同步使用的下載器連線，qBittorrent的rid只在同一會話內有效
+                    "api": None,
+                    "rid": 0,
+                    "raw": {},
+                    "torrents": {},
+                    "dirty": True,
+                    "full": True,
+                    "pending": set(),
+                    "synced_at": 0,
+                    "latency": 0,
+                    "full_syncs": 0,
+                    "delta_syncs": 0,
+                    "errors": 0
+                }
+        return mirror
+
+    def invalidate(self, client, ids=None):
+        """
+        本程序修改了下載器種子後呼叫，下次讀取時重新同步
+        :param client: 下載器
+        :param ids: 修改的種子ID，為空時Transmission下次全量同步
+        """
+        mirror = self.__get_mirror(client)
+        mirror["dirty"] = True
+        if ids is None:
+            mirror["full"] = True
+        else:
+            if not isinstance(ids, list):
+                ids = [ids]
+            mirror["pending"].update(ids)
+
+    def get_torrents(self, client, arguments=None):
+        """
+        獲取下載器的全部種子
+        :param client: 下載器
+        :param arguments: Transmission查詢的種子欄位
+        :return: 種子列表, 是否發生異常
+        """
+        mirror = self.__get_mirror(client)
+        with mirror["lock"]:
+            if mirror["dirty"] or time.time() - mirror["synced_at"] > DOWNLOADER_SYNC_INTERVAL:
+                start_time = time.time()
+                # 同步期間再有修改時保留標記，下次讀取再同步
+                mirror["dirty"] = False
+                try:
+                    if client.client_type == DownloaderType.QB:
+                        self.__sync_qbittorrent(mirror, client)
+                    else:
+                        self.__sync_transmission(mirror, client, arguments)
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    mirror["errors"] += 1
+                    mirror["api"] = None
+                    mirror["dirty"] = True
+                    mirror["full"] = True
+                    return [], True
+                mirror["latency"] = time.time() - start_time
+                mirror["synced_at"] = time.time()
+            return list(mirror["torrents"].values()), False
+
+    @staticmethod
+    def __sync_qbittorrent(mirror, client):
+        """
+        按rid增量同步qBittorrent種子
+        """
+        qbc = mirror["api"] or client.qbc
+        if qbc is not mirror["api"]:
+            mirror["api"] = qbc
+            mirror["rid"] = 0
+        maindata = qbc.sync_maindata(rid=mirror["rid"])
+        if maindata.get("full_update"):
+            raw = {}
+            torrents = {}
+            mirror["full_syncs"] += 1
+        else:
+            raw = mirror["raw"]
+            torrents = mirror["torrents"]
+            mirror["delta_syncs"] += 1
+        for torrent_hash, data in (maindata.get("torrents") or {}).items():
+            item = dict(raw.get(torrent_hash) or {})
+            item.update(data)
+            item["hash"] = torrent_hash
+            raw[torrent_hash] = item
+            torrents[torrent_hash] = qbittorrentapi.TorrentDictionary(data=item, client=qbc)
+        for torrent_hash in maindata.get("torrents_removed") or []:
+            raw.pop(torrent_hash, None)
+            torrents.pop(torrent_hash, None)
+        mirror["raw"] = raw
+        mirror["torrents"] = torrents
+        mirror["rid"] = maindata.get("rid") or 0
+        mirror["full"] = False
+        mirror["pending"] = set()
+
+    def __sync_transmission(self, mirror, client, arguments):
+        """
+        按recently-active增量同步Transmission種子，本程序修改過的種子單獨查詢
+        """
+        trc = mirror["api"] or client.trc
+        mirror["api"] = trc
+        pending = mirror["pending"]
+        mirror["pending"] = set()
+        if mirror["full"] \
+                or time.time() - mirror["synced_at"] > self._tr_recent_window \
+                or not hasattr(trc, "get_recently_active_torrents"):
+            mirror["full"] = False
+            mirror["torrents"] = {torrent.id: torrent for torrent in trc.get_torrents(arguments=arguments)}
+            mirror["full_syncs"] += 1
+            return
+        torrents = dict(mirror["torrents"])
+        active_torrents, removed_ids = trc.get_recently_active_torrents(arguments=arguments)
+        for torrent in active_torrents:
+            torrents[torrent.id] = torrent
+        for torrent_id in removed_ids:
+            torrents.pop(torrent_id, None)
+        pending = [int(x) for x in pending if str(x).isdigit()]
+        if pending:
+            for torrent_id in pending:
+                torrents.pop(torrent_id, None)
+            for torrent in trc.get_torrents(ids=pending, arguments=arguments):
+                torrents[torrent.id] = torrent
+        mirror["torrents"] = torrents
+        mirror["delta_syncs"] += 1
+
+    def get_stats(self):
+        """
+        返回各下載器映象的種子數、距上次同步的秒數和同步耗時
+        """
+        now = time.time()
+        return [{
+            "name": mirror.get("name"),
+            "torrents": len(mirror.get("torrents")),
+            "age": round(now - mirror.get("synced_at")) if mirror.get("synced_at") else None,
+            "latency": round(mirror.get("latency") * 1000),
+            "full_syncs": mirror.get("full_syncs"),
+            "delta_syncs": mirror.get("delta_syncs"),
+            "errors": mirror.get("errors")
+        } for mirror in list(self._mirrors.values())]
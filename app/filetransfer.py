@@ -5,12 +5,13 @@ import re
 import shutil
 import traceback
 from enum import Enum
-from threading import Lock
 from time import sleep
 
 import log
 from app.helper import DbHelper
+from app.helper import LibraryIndex
 from app.helper import ThreadHelper
+from app.helper import TransferExecutor
 from app.media import Media, MetaInfo, Category, Scraper
 from app.mediaserver import MediaServer
 from app.message import Message
@@ -21,8 +22,6 @@ from app.utils.types import MediaType, SyncType, RmtMode, RMT_MODES
 from config import RMT_SUBEXT, RMT_MEDIAEXT, RMT_FAVTYPE, RMT_MIN_FILESIZE, DEFAULT_MOVIE_FORMAT, \
     DEFAULT_TV_FORMAT, Config
 
-lock = Lock()
-
 
 class FileTransfer:
     media = None
@@ -152,33 +151,36 @@ class FileTransfer:
         :param target_file: 目標檔案路徑
         :param rmt_mode: RmtMode轉移方式
         """
-        with lock:
-            if rmt_mode == RmtMode.LINK:
-                # 更連結
-                retcode, retmsg = SystemUtils.link(file_item, target_file)
-            elif rmt_mode == RmtMode.SOFTLINK:
-                # 軟連結
-                retcode, retmsg = SystemUtils.softlink(file_item, target_file)
-            elif rmt_mode == RmtMode.MOVE:
-                # 移動
-                retcode, retmsg = SystemUtils.move(file_item, target_file)
-            elif rmt_mode == RmtMode.RCLONE:
-                # Rclone移動
-                retcode, retmsg = SystemUtils.rclone_move(file_item, target_file)
-            elif rmt_mode == RmtMode.RCLONECOPY:
-                # Rclone複製
-                retcode, retmsg = SystemUtils.rclone_copy(file_item, target_file)
-            elif rmt_mode == RmtMode.MINIO:
-                # Minio移動
-                retcode, retmsg = SystemUtils.minio_move(file_item, target_file)
-            elif rmt_mode == RmtMode.MINIOCOPY:
-                # Minio複製
-                retcode, retmsg = SystemUtils.minio_copy(file_item, target_file)
-            else:
-                # 複製
-                retcode, retmsg = SystemUtils.copy(file_item, target_file)
+        if rmt_mode == RmtMode.LINK:
+            # 更連結
+            command = SystemUtils.link
+        elif rmt_mode == RmtMode.SOFTLINK:
+            # 軟連結
+            command = SystemUtils.softlink
+        elif rmt_mode == RmtMode.MOVE:
+            # 移動
+            command = SystemUtils.move
+        elif rmt_mode == RmtMode.RCLONE:
+            # Rclone移動
+            command = SystemUtils.rclone_move
+        elif rmt_mode == RmtMode.RCLONECOPY:
+            # Rclone複製
+            command = SystemUtils.rclone_copy
+        elif rmt_mode == RmtMode.MINIO:
+            # Minio移動
+            command = SystemUtils.minio_move
+        elif rmt_mode == RmtMode.MINIOCOPY:
+            # Minio複製
+            command = SystemUtils.minio_copy
+        else:
+            # 複製
+            command = SystemUtils.copy
+        # 相同目的路徑的轉移序列執行，同一檔案系統上的並行數受限
+        retcode, retmsg = TransferExecutor().run(command, file_item, target_file)
         if retcode != 0:
             log.error("【Rmt】%s" % retmsg)
+        else:
+            LibraryIndex().add_path(target_file)
         return retcode
 
     def __transfer_subtitles(self, org_name, new_name, rmt_mode):
@@ -387,6 +389,7 @@ class FileTransfer:
         if over_flag and os.path.isfile(new_file):
             log.info("【Rmt】正在刪除已存在的檔案：%s" % new_file)
             os.remove(new_file)
+            LibraryIndex().invalidate(new_file)
         log.info("【Rmt】正在轉移檔案：%s 到 %s" % (file_name, new_file))
         retcode = self.__transfer_command(file_item=file_item,
                                           target_file=new_file,
@@ -402,6 +405,20 @@ class FileTransfer:
                                          new_name=new_file,
                                          rmt_mode=rmt_mode)
 
+    @staticmethod
+    def __run_transfer_job(func, args, rmt_mode):
+        """
+        執行一個轉移任務
+        :param func: 轉移方法
+        :param args: 轉移方法引數
+        :param rmt_mode: RmtMode轉移方式
+        """
+        retcode = func(*args)
+        # 移動模式隨機休眠（相容一些網盤掛載目錄）
+        if rmt_mode == RmtMode.MOVE:
+            sleep(round(random.uniform(0, 1), 1))
+        return retcode
+
     def transfer_media(self,
                        in_from: Enum,
                        in_path,
@@ -526,6 +543,100 @@ class FileTransfer:
         refresh_library_items = []
         # 需要下載欄位的清單
         download_subtitle_items = []
+        # 已提交轉移的任務，檔案轉移並行執行，完成後按原順序登記
+        transfer_jobs = []
+        # 本批次已安排轉移的檔案（不含字尾）及藍光目錄
+        planned_files = {}
+        planned_dirs = set()
+
+        def __finish_transfer(job):
+            """
+            等待轉移任務完成，登記歷史記錄、訊息、刮削等
+            :return: 自定義轉移失敗時返回False
+            """
+            nonlocal success_flag, error_message, failed_count, alert_count
+            try:
+                ret = job.get("future").result()
+                if ret != 0:
+                    success_flag = False
+                    error_message = job.get("error") % ret
+                    if udf_flag:
+                        return False
+                    failed_count += 1
+                    alert_count += 1
+                    if error_message not in alert_messages:
+                        alert_messages.append(error_message)
+                    return True
+                job_media = job.get("media")
+                job_file_item = job.get("file_item")
+                job_dist_path = job.get("dist_path")
+                job_dir_path = job.get("ret_dir_path")
+                job_file_path = job.get("ret_file_path")
+                # 媒體庫重新整理條目：型別-類別-標題-年份
+                refresh_item = {"type": job_media.type, "category": job_media.category, "title": job_media.title,
+                                "year": job_media.year, "target_path": job_dist_path}
+                # 登記媒體庫重新整理
+                if refresh_item not in refresh_library_items:
+                    refresh_library_items.append(refresh_item)
+                # 查詢TMDB詳情，需要全部資料
+                job_media.set_tmdb_info(self.media.get_tmdb_info(mtype=job_media.type,
+                                                                 tmdbid=job_media.tmdb_id,
+                                                                 append_to_response="all"))
+                # 下載字幕條目
+                subtitle_item = {"type": job_media.type,
+                                 "file": job_file_path,
+                                 "file_ext": os.path.splitext(job_file_item)[-1],
+                                 "name": job_media.en_name if job_media.en_name else job_media.cn_name,
+                                 "title": job_media.title,
+                                 "year": job_media.year,
+                                 "season": job_media.begin_season,
+                                 "episode": job_media.begin_episode,
+                                 "bluray": True if bluray_disk_dir else False,
+                                 "imdbid": job_media.imdb_id}
+                # 登記字幕下載
+                if subtitle_item not in download_subtitle_items:
+                    download_subtitle_items.append(subtitle_item)
+                # 轉移歷史記錄
+                self.dbhelper.insert_transfer_history(
+                    in_from=in_from,
+                    rmt_mode=rmt_mode,
+                    in_path=job.get("reg_path"),
+                    out_path=job.get("new_file") if not bluray_disk_dir else None,
+                    dest=job_dist_path,
+                    media_info=job_media)
+                # 未識別手動識別或歷史記錄重新識別的批處理模式
+                if isinstance(episode[1], bool) and episode[1]:
+                    # 未識別手動識別，更改未識別記錄為已處理
+                    self.dbhelper.update_transfer_unknown_state(job_file_item)
+                # 電影立即傳送訊息
+                if job_media.type == MediaType.MOVIE:
+                    self.message.send_transfer_movie_message(in_from,
+                                                             job_media,
+                                                             job.get("exist_filenum"),
+                                                             self._movie_category_flag)
+                # 否則登記彙總發訊息
+                else:
+                    # 按季彙總
+                    message_key = "%s-%s" % (job_media.get_title_string(), job_media.get_season_string())
+                    if not message_medias.get(message_key):
+                        message_medias[message_key] = job_media
+                    # 彙總集數、大小
+                    if not message_medias[message_key].is_in_episode(job_media.get_episode_list()):
+                        message_medias[message_key].total_episodes += job_media.total_episodes
+                        message_medias[message_key].size += job_media.size
+                # 生成nfo及poster
+                if self._scraper_flag:
+                    # 生成刮削檔案
+                    self.scraper.gen_scraper_files(media=job_media,
+                                                   scraper_nfo=self._scraper_nfo,
+                                                   scraper_pic=self._scraper_pic,
+                                                   dir_path=job_dir_path,
+                                                   file_name=os.path.basename(job_file_path))
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Rmt】檔案轉移時發生錯誤：%s - %s" % (str(e), traceback.format_exc()))
+            return True
+
         # 處理識別後的每一個檔案或單個資料夾
         for file_item, media in Medias.items():
             try:
@@ -590,12 +701,25 @@ class FileTransfer:
 
                 # 判斷檔案是否已存在，返回：目錄存在標誌、目錄名、檔案存在標誌、檔名
                 dir_exist_flag, ret_dir_path, file_exist_flag, ret_file_path = self.__is_media_exists(dist_path, media)
+                # 本批次中已安排轉移到同一位置的檔案，按已存在處理
+                if bluray_disk_dir:
+                    if ret_dir_path in planned_dirs:
+                        dir_exist_flag = True
+                    planned_job = None
+                else:
+                    planned_job = planned_files.get(
+                        os.path.splitext(ret_file_path)[0] if file_exist_flag else ret_file_path
+                    ) if ret_file_path else None
+                    if planned_job:
+                        dir_exist_flag = True
+                        file_exist_flag = True
+                        ret_file_path = planned_job.get("new_file")
                 # 新檔案字尾
                 file_ext = os.path.splitext(file_item)[-1]
                 new_file = ret_file_path
                 # 已存在的檔案數量
                 exist_filenum = 0
-                handler_flag = False
+                transfer_job = None
                 # 路徑存在
                 if dir_exist_flag:
                     # 藍光原盤
@@ -609,25 +733,21 @@ class FileTransfer:
                     if file_exist_flag:
                         exist_filenum = exist_filenum + 1
                         if rmt_mode != RmtMode.SOFTLINK:
-                            if media.size > os.path.getsize(ret_file_path) and self._filesize_cover or udf_flag:
+                            exist_size = planned_job.get("media").size if planned_job \
+                                else os.path.getsize(ret_file_path)
+                            if media.size > exist_size and self._filesize_cover or udf_flag:
                                 ret_file_path = os.path.splitext(ret_file_path)[0]
                                 new_file = "%s%s" % (ret_file_path, file_ext)
                                 log.info("【Rmt】檔案 %s 已存在，覆蓋..." % new_file)
-                                ret = self.__transfer_file(file_item=file_item,
-                                                           new_file=new_file,
-                                                           rmt_mode=rmt_mode,
-                                                           over_flag=True)
-                                if ret != 0:
-                                    success_flag = False
-                                    error_message = "檔案轉移失敗，錯誤碼 %s" % ret
-                                    if udf_flag:
-                                        return success_flag, error_message
-                                    failed_count += 1
-                                    alert_count += 1
-                                    if error_message not in alert_messages:
-                                        alert_messages.append(error_message)
-                                    continue
-                                handler_flag = True
+                                transfer_job = {
+                                    "future": TransferExecutor().submit(self.__run_transfer_job,
+                                                                        self.__transfer_file,
+                                                                        (file_item, new_file, rmt_mode, True),
+                                                                        rmt_mode,
+                                                                        after=planned_job.get(
+                                                                            "future") if planned_job else None),
+                                    "error": "檔案轉移失敗，錯誤碼 %s"
+                                }
                             else:
                                 log.warn("【Rmt】檔案 %s 已存在" % ret_file_path)
                                 failed_count += 1
@@ -654,23 +774,21 @@ class FileTransfer:
                     else:
                         # 建立電錄
                         log.debug("【Rmt】正在建立目錄：%s" % ret_dir_path)
-                        os.makedirs(ret_dir_path)
+                        os.makedirs(ret_dir_path, exist_ok=True)
+                        LibraryIndex().add_path(ret_dir_path, is_dir=True)
                 # 轉移藍光原盤
                 if bluray_disk_dir:
-                    ret = self.__transfer_bluray_dir(file_item, ret_dir_path, rmt_mode)
-                    if ret != 0:
-                        success_flag = False
-                        error_message = "藍光目錄轉移失敗，錯誤碼：%s" % ret
-                        if udf_flag:
-                            return success_flag, error_message
-                        failed_count += 1
-                        alert_count += 1
-                        if error_message not in alert_messages:
-                            alert_messages.append(error_message)
-                        continue
+                    planned_dirs.add(ret_dir_path)
+                    transfer_job = {
+                        "future": TransferExecutor().submit(self.__run_transfer_job,
+                                                            self.__transfer_bluray_dir,
+                                                            (file_item, ret_dir_path, rmt_mode),
+                                                            rmt_mode),
+                        "error": "藍光目錄轉移失敗，錯誤碼：%s"
+                    }
                 else:
                     # 開始轉移檔案
-                    if not handler_flag:
+                    if not transfer_job:
                         if not ret_file_path:
                             log.error("【Rmt】拼裝檔案路徑錯誤，無法從檔名中識別出集數：%s" % file_item)
                             success_flag = False
@@ -685,87 +803,36 @@ class FileTransfer:
                                 alert_messages.append(error_message)
                             continue
                         new_file = "%s%s" % (ret_file_path, file_ext)
-                        ret = self.__transfer_file(file_item=file_item,
-                                                   new_file=new_file,
-                                                   rmt_mode=rmt_mode,
-                                                   over_flag=False)
-                        if ret != 0:
-                            success_flag = False
-                            error_message = "檔案轉移失敗，錯誤碼 %s" % ret
-                            if udf_flag:
-                                return success_flag, error_message
-                            failed_count += 1
-                            alert_count += 1
-                            if error_message not in alert_messages:
-                                alert_messages.append(error_message)
-                            continue
-                # 媒體庫重新整理條目：型別-類別-標題-年份
-                refresh_item = {"type": media.type, "category": media.category, "title": media.title,
-                                "year": media.year, "target_path": dist_path}
-                # 登記媒體庫重新整理
-                if refresh_item not in refresh_library_items:
-                    refresh_library_items.append(refresh_item)
-                # 查詢TMDB詳情，需要全部資料
-                media.set_tmdb_info(self.media.get_tmdb_info(mtype=media.type,
-                                                             tmdbid=media.tmdb_id,
-                                                             append_to_response="all"))
-                # 下載字幕條目
-                subtitle_item = {"type": media.type,
-                                 "file": ret_file_path,
-                                 "file_ext": os.path.splitext(file_item)[-1],
-                                 "name": media.en_name if media.en_name else media.cn_name,
-                                 "title": media.title,
-                                 "year": media.year,
-                                 "season": media.begin_season,
-                                 "episode": media.begin_episode,
-                                 "bluray": True if bluray_disk_dir else False,
-                                 "imdbid": media.imdb_id}
-                # 登記字幕下載
-                if subtitle_item not in download_subtitle_items:
-                    download_subtitle_items.append(subtitle_item)
-                # 轉移歷史記錄
-                self.dbhelper.insert_transfer_history(
-                    in_from=in_from,
-                    rmt_mode=rmt_mode,
-                    in_path=reg_path,
-                    out_path=new_file if not bluray_disk_dir else None,
-                    dest=dist_path,
-                    media_info=media)
-                # 未識別手動識別或歷史記錄重新識別的批處理模式
-                if isinstance(episode[1], bool) and episode[1]:
-                    # 未識別手動識別，更改未識別記錄為已處理
-                    self.dbhelper.update_transfer_unknown_state(file_item)
-                # 電影立即傳送訊息
-                if media.type == MediaType.MOVIE:
-                    self.message.send_transfer_movie_message(in_from,
-                                                             media,
-                                                             exist_filenum,
-                                                             self._movie_category_flag)
-                # 否則登記彙總發訊息
+                        transfer_job = {
+                            "future": TransferExecutor().submit(self.__run_transfer_job,
+                                                                self.__transfer_file,
+                                                                (file_item, new_file, rmt_mode, False),
+                                                                rmt_mode),
+                            "error": "檔案轉移失敗，錯誤碼 %s"
+                        }
+                    planned_files[ret_file_path] = transfer_job
+                transfer_job.update({
+                    "media": media,
+                    "file_item": file_item,
+                    "reg_path": reg_path,
+                    "dist_path": dist_path,
+                    "ret_dir_path": ret_dir_path,
+                    "ret_file_path": ret_file_path,
+                    "new_file": new_file,
+                    "exist_filenum": exist_filenum
+                })
+                # 自定義轉移逐個處理，失敗時不再轉移後續檔案
+                if udf_flag:
+                    if not __finish_transfer(transfer_job):
+                        return success_flag, error_message
                 else:
-                    # 按季彙總
-                    message_key = "%s-%s" % (media.get_title_string(), media.get_season_string())
-                    if not message_medias.get(message_key):
-                        message_medias[message_key] = media
-                    # 彙總集數、大小
-                    if not message_medias[message_key].is_in_episode(media.get_episode_list()):
-                        message_medias[message_key].total_episodes += media.total_episodes
-                        message_medias[message_key].size += media.size
-                # 生成nfo及poster
-                if self._scraper_flag:
-                    # 生成刮削檔案
-                    self.scraper.gen_scraper_files(media=media,
-                                                   scraper_nfo=self._scraper_nfo,
-                                                   scraper_pic=self._scraper_pic,
-                                                   dir_path=ret_dir_path,
-                                                   file_name=os.path.basename(ret_file_path))
-                # 移動模式隨機休眠（相容一些網盤掛載目錄）
-                if rmt_mode == RmtMode.MOVE:
-                    sleep(round(random.uniform(0, 1), 1))
-
+                    transfer_jobs.append(transfer_job)
             except Exception as err:
                 ExceptionUtils.exception_traceback(err)
                 log.error("【Rmt】檔案轉移時發生錯誤：%s - %s" % (str(err), traceback.format_exc()))
+        # 等待所有轉移完成，按原順序登記
+        for transfer_job in transfer_jobs:
+            __finish_transfer(transfer_job)
         # 迴圈結束
         # 統計完成情況，傳送通知
         if message_medias:
@@ -823,6 +890,26 @@ class FileTransfer:
             if not ret:
                 print("【Rmt】%s 處理失敗：%s" % (path, ret_msg))
 
+    @staticmethod
+    def __path_exists(path):
+        """
+        判斷媒體庫中的路徑是否存在，優先使用媒體庫索引
+        """
+        exists = LibraryIndex().exists(path)
+        if exists is None:
+            return os.path.exists(path)
+        return exists
+
+    @staticmethod
+    def __get_media_files(path):
+        """
+        獲取媒體庫目錄下的媒體檔案，優先使用媒體庫索引
+        """
+        files = LibraryIndex().get_media_files(path, RMT_MEDIAEXT)
+        if files is None:
+            return PathUtils.get_dir_files(path, RMT_MEDIAEXT, cache=True)
+        return files
+
     def __is_media_exists(self,
                           media_dest,
                           media):
@@ -849,13 +936,13 @@ class FileTransfer:
                 for m_type in [RMT_FAVTYPE, media.category]:
                     type_path = os.path.join(media_dest, m_type, dir_name)
                     # 目錄是否存在
-                    if os.path.exists(type_path):
+                    if self.__path_exists(type_path):
                         file_path = type_path
                         break
             # 返回路徑
             ret_dir_path = file_path
             # 路徑存在標誌
-            if os.path.exists(file_path):
+            if self.__path_exists(file_path):
                 dir_exist_flag = True
             # 檔案路徑
             file_dest = os.path.join(file_path, file_name)
@@ -864,7 +951,7 @@ class FileTransfer:
             # 檔案是否存在
             for ext in RMT_MEDIAEXT:
                 ext_dest = "%s%s" % (file_dest, ext)
-                if os.path.exists(ext_dest):
+                if self.__path_exists(ext_dest):
                     file_exist_flag = True
                     ret_file_path = ext_dest
                     break
@@ -885,7 +972,7 @@ class FileTransfer:
                 # 返回目錄路徑
                 ret_dir_path = season_dir
                 # 目錄是否存在
-                if os.path.exists(season_dir):
+                if self.__path_exists(season_dir):
                     dir_exist_flag = True
                 # 處理集
                 episodes = media.get_episode_list()
@@ -897,7 +984,7 @@ class FileTransfer:
                     # 檔案存在標誌
                     for ext in RMT_MEDIAEXT:
                         ext_dest = "%s%s" % (file_path, ext)
-                        if os.path.exists(ext_dest):
+                        if self.__path_exists(ext_dest):
                             file_exist_flag = True
                             ret_file_path = ext_dest
                             break
@@ -932,6 +1019,8 @@ class FileTransfer:
                 log.info("【Rmt】目錄 %s 已存在" % new_path)
                 return False
             ret, retmsg = SystemUtils.move(org_path, new_path)
+            LibraryIndex().invalidate(org_path)
+            LibraryIndex().invalidate(new_path)
             if ret == 0:
                 return True
             else:
@@ -975,13 +1064,13 @@ class FileTransfer:
             for dest_path in self._movie_path:
                 # 判斷精選
                 fav_path = os.path.join(dest_path, RMT_FAVTYPE, dir_name)
-                fav_files = PathUtils.get_dir_files(fav_path, RMT_MEDIAEXT)
+                fav_files = self.__get_media_files(fav_path)
                 # 其它分類
                 if self._movie_category_flag:
                     dest_path = os.path.join(dest_path, meta_info.category, dir_name)
                 else:
                     dest_path = os.path.join(dest_path, dir_name)
-                files = PathUtils.get_dir_files(dest_path, RMT_MEDIAEXT)
+                files = self.__get_media_files(dest_path)
                 if len(files) > 0 or len(fav_files) > 0:
                     return [{'title': meta_info.title, 'year': meta_info.year}]
             return []
@@ -1006,9 +1095,9 @@ class FileTransfer:
                 else:
                     dest_path = os.path.join(dest_path, dir_name, season_name)
                 # 目錄不存在
-                if not os.path.exists(dest_path):
+                if not self.__path_exists(dest_path):
                     continue
-                files = PathUtils.get_dir_files(dest_path, RMT_MEDIAEXT)
+                files = self.__get_media_files(dest_path)
                 for file in files:
                     file_meta_info = MetaInfo(os.path.basename(file))
                     if not file_meta_info.get_season_list() or not file_meta_info.get_episode_list():
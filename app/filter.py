@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 from app.helper import DbHelper
 from app.media.meta.release_groups import ReleaseGroupsMatcher
@@ -14,6 +15,8 @@ class Filter:
     dbhelper = None
     _groups = []
     _rules = []
+    # 預編譯的規則組：{"groups": 規則組ID -> 規則組, "default": 預設規則組, "rules": 規則組ID -> 規則列表}
+    _compiled_groups = {}
 
     def __init__(self):
         self.init_config()
@@ -23,6 +26,109 @@ class Filter:
         self.rg_matcher = ReleaseGroupsMatcher()
         self._groups = self.dbhelper.get_config_filter_group()
         self._rules = self.dbhelper.get_config_filter_rule()
+        self._compiled_groups = self.__compile_rule_groups()
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def __compile(pattern):
+        """
+        編譯規則中的正則，忽略大小寫
+        """
+        return re.compile(r'%s' % pattern, re.IGNORECASE)
+
+    def __compile_regex(self, pattern):
+        """
+        編譯規則中的正則，出錯時返回異常，在匹配時丟擲，與逐條匹配時的行為一致
+        """
+        try:
+            return self.__compile(pattern)
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def __parse_size(sizes):
+        """
+        解析大小限制，單位GB，返回（最小值，最大值）
+        """
+        if not sizes:
+            return None
+        if sizes.find(',') != -1:
+            sizes = sizes.split(',')
+            if sizes[0].isdigit():
+                begin_size = int(sizes[0].strip())
+            else:
+                begin_size = 0
+            if sizes[1].isdigit():
+                end_size = int(sizes[1].strip())
+            else:
+                end_size = 0
+        else:
+            begin_size = 0
+            if sizes.isdigit():
+                end_size = int(sizes.strip())
+            else:
+                end_size = 0
+        return begin_size * 1024 ** 3, end_size * 1024 ** 3
+
+    @staticmethod
+    def __parse_free(free):
+        """
+        解析促銷限制，返回（上傳因子，下載因子），格式有誤時返回異常
+        """
+        if not free:
+            return None
+        try:
+            ul_factor, dl_factor = free.split()
+            return float(ul_factor), float(dl_factor)
+        except Exception as err:
+            return err
+
+    def __compile_rule_groups(self):
+        """
+        將規則組和規則預編譯為 規則組ID -> 按順序排列的規則列表
+        """
+        groups = {}
+        default_group = None
+        for group in self._groups:
+            group_info = {
+                "id": group.ID,
+                "name": group.GROUP_NAME
+            }
+            groups.setdefault(str(group.ID), group_info)
+            if not default_group and group.IS_DEFAULT == "Y":
+                default_group = group_info
+        rules = {}
+        for rule in self._rules:
+            rules.setdefault(str(rule.GROUP_ID), []).append({
+                "pri": rule.PRIORITY or 0,
+                "include": [self.__compile_regex(include.strip())
+                            for include in (rule.INCLUDE.split("\n") if rule.INCLUDE else []) if include],
+                "exclude": [self.__compile_regex(exclude.strip())
+                            for exclude in (rule.EXCLUDE.split("\n") if rule.EXCLUDE else []) if exclude],
+                "size": self.__parse_size(rule.SIZE_LIMIT),
+                "free": self.__parse_free(rule.NOTE)
+            })
+        return {
+            "groups": groups,
+            "default": default_group,
+            "rules": rules
+        }
+
+    def __get_compiled_group(self, rulegroup=None):
+        """
+        查詢預編譯的規則組及規則，rulegroup為空時使用預設規則組
+        :return: 規則組，規則列表；未配置預設規則組時返回None
+        """
+        compiled_groups = self._compiled_groups
+        if not rulegroup:
+            group_info = compiled_groups.get("default")
+            if not group_info:
+                return None, []
+        else:
+            group_info = compiled_groups.get("groups", {}).get(str(rulegroup)) or {}
+        if not group_info.get("id"):
+            return group_info, []
+        return group_info, compiled_groups.get("rules", {}).get(str(group_info.get("id"))) or []
 
     def get_rule_groups(self, groupid=None, default=False):
         """
@@ -96,13 +202,9 @@ class Filter:
             title = "%s %s" % (meta_info.org_string, meta_info.subtitle)
         else:
             title = meta_info.org_string
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, "未配置過濾規則"
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
+        rulegroup, filters = self.__get_compiled_group(rulegroup)
+        if rulegroup is None:
+            return True, 0, "未配置過濾規則"
         # 命中優先順序
         order_seq = 0
         # 當前規則組是否命中
@@ -113,64 +215,44 @@ class Filter:
             # 命中規則的序號
             order_seq = 100 - int(filter_info.get('pri'))
             # 必須包括的項
-            includes = filter_info.get('include')
-            if includes and rule_match:
-                include_flag = True
-                for include in includes:
-                    if not include:
-                        continue
-                    if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
-                        include_flag = False
-                        break
-                if not include_flag:
+            for include in filter_info.get('include'):
+                if isinstance(include, Exception):
+                    raise include
+                if not include.search(title):
                     rule_match = False
+                    break
 
             # 不能包含的項
             excludes = filter_info.get('exclude')
             if excludes and rule_match:
                 exclude_flag = False
-                exclude_count = 0
                 for exclude in excludes:
-                    if not exclude:
-                        continue
-                    exclude_count += 1
-                    if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
+                    if isinstance(exclude, Exception):
+                        raise exclude
+                    if not exclude.search(title):
                         exclude_flag = True
-                if exclude_count > 0 and not exclude_flag:
+                if not exclude_flag:
                     rule_match = False
             # 大小
             sizes = filter_info.get('size')
             if sizes and rule_match and meta_info.size:
-                if sizes.find(',') != -1:
-                    sizes = sizes.split(',')
-                    if sizes[0].isdigit():
-                        begin_size = int(sizes[0].strip())
-                    else:
-                        begin_size = 0
-                    if sizes[1].isdigit():
-                        end_size = int(sizes[1].strip())
-                    else:
-                        end_size = 0
-                else:
-                    begin_size = 0
-                    if sizes.isdigit():
-                        end_size = int(sizes.strip())
-                    else:
-                        end_size = 0
+                begin_size, end_size = sizes
                 if meta_info.type == MediaType.MOVIE:
-                    if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                    if not begin_size <= int(meta_info.size) <= end_size:
                         rule_match = False
                 else:
                     if meta_info.total_episodes \
-                            and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
+                            and not begin_size <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size:
                         rule_match = False
 
             # 促銷
             free = filter_info.get("free")
             if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
-                ul_factor, dl_factor = free.split()
-                if float(ul_factor) > meta_info.upload_volume_factor \
-                        or float(dl_factor) < meta_info.download_volume_factor:
+                if isinstance(free, Exception):
+                    raise free
+                ul_factor, dl_factor = free
+                if ul_factor > meta_info.upload_volume_factor \
+                        or dl_factor < meta_info.download_volume_factor:
                     rule_match = False
 
             if rule_match:
@@ -185,13 +267,9 @@ class Filter:
         """
         判斷規則中是否需要Free檢測
         """
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, ""
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
+        rulegroup, filters = self.__get_compiled_group(rulegroup)
+        if rulegroup is None:
+            return True, 0, ""
         for filter_info in filters:
             if filter_info.get("free"):
                 return True
@@ -242,14 +320,14 @@ class Filter:
             restype_re = TORRENT_SEARCH_PARAMS["restype"].get(filter_args.get("restype"))
             if not meta_info.get_edtion_string():
                 return False, 0, f"{meta_info.org_string} 不符合質量 {filter_args.get('restype')} 要求"
-            if restype_re and not re.search(r"%s" % restype_re, meta_info.get_edtion_string(), re.I):
+            if restype_re and not self.__compile(restype_re).search(meta_info.get_edtion_string()):
                 return False, 0, f"{meta_info.org_string} 不符合質量 {filter_args.get('restype')} 要求"
         # 過濾解析度
         if filter_args.get("pix"):
             pix_re = TORRENT_SEARCH_PARAMS["pix"].get(filter_args.get("pix"))
             if not meta_info.resource_pix:
                 return False, 0, f"{meta_info.org_string} 不符合解析度 {filter_args.get('pix')} 要求"
-            if pix_re and not re.search(r"%s" % pix_re, meta_info.resource_pix, re.I):
+            if pix_re and not self.__compile(pix_re).search(meta_info.resource_pix):
                 return False, 0, f"{meta_info.org_string} 不符合解析度 {filter_args.get('pix')} 要求"
         # 過濾製作組/字幕組
         if filter_args.get("team"):
@@ -262,7 +340,7 @@ class Filter:
                     return False, 0, f"{meta_info.org_string} 不符合製作組/字幕組 {team} 要求"
                 else:
                     meta_info.resource_team = resource_team
-            elif not re.search(r"%s" % team, meta_info.resource_team, re.I):
+            elif not self.__compile(team).search(meta_info.resource_team):
                 return False, 0, f"{meta_info.org_string} 不符合製作組/字幕組 {team} 要求"
         # 過濾促銷
         if filter_args.get("sp_state"):
@@ -274,17 +352,17 @@ class Filter:
         # 過濾包含
         if filter_args.get("include"):
             include = filter_args.get("include")
-            if not re.search(r"%s" % include, meta_info.org_string, re.I):
+            if not self.__compile(include).search(meta_info.org_string):
                 return False, 0, f"{meta_info.org_string} 不符合包含 {include} 要求"
         # 過濾排除
         if filter_args.get("exclude"):
             exclude = filter_args.get("exclude")
-            if re.search(r"%s" % exclude, meta_info.org_string, re.I):
+            if self.__compile(exclude).search(meta_info.org_string):
                 return False, 0, f"{meta_info.org_string} 不符合排除 {exclude} 要求"
         # 過濾關鍵字
         if filter_args.get("key"):
             key = filter_args.get("key")
-            if not re.search(r"%s" % key, meta_info.org_string, re.I):
+            if not self.__compile(key).search(meta_info.org_string):
                 return False, 0, f"{meta_info.org_string} 不符合 {key} 要求"
         # 過濾過濾規則
         if filter_args.get("rule"):
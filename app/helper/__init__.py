@@ -12,3 +12,6 @@ from .site_helper import SiteHelper
 from .ocr_helper import OcrHelper
 from .sub_helper import SubHelper
 from .words_helper import WordsHelper
+from .seen_helper import SeenHelper
+from .transfer_executor import TransferExecutor
+from .library_index import LibraryIndex
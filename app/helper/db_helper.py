@@ -3,10 +3,12 @@ import os.path
 import time
 import json
 from enum import Enum
-from sqlalchemy import cast, func
+from sqlalchemy import cast, func, tuple_, or_
 
 from app.db.main_db import MainDb, DbPersist
 from app.db.models import *
+from app.db.sqlite_engine import fts_rowids
+from app.helper.seen_helper import SeenHelper
 from app.utils import StringUtils
 from app.utils.types import MediaType, RmtMode
 
@@ -75,16 +77,29 @@ class DbHelper:
         """
         return self._db.query(SEARCHRESULTINFO).all()
 
+    def init_rss_torrents_index(self):
+        """
+        從RSS_TORRENTS預熱已處理種子索引
+        """
+        SeenHelper().load(lambda: (item.ENCLOSURE for item in self._db.query(RSSTORRENTS.ENCLOSURE)))
+
+    def __is_enclosure_rssd(self, enclosure):
+        """
+        根據下載連結查詢RSS是否處理過，索引不可用時才查詢資料庫
+        """
+        self.init_rss_torrents_index()
+        seen = SeenHelper().contains(enclosure)
+        if seen is not None:
+            return seen
+        return self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0
+
     def is_torrent_rssd(self, enclosure):
         """
         查詢RSS是否處理過，根據下載連結
         """
         if not enclosure:
             return True
-        if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
-            return True
-        else:
-            return False
+        return self.__is_enclosure_rssd(enclosure)
 
     def is_userrss_finished(self, torrent_name, enclosure):
         """
@@ -93,9 +108,8 @@ class DbHelper:
         if not torrent_name and not enclosure:
             return True
         if enclosure:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count()
-        else:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
+            return self.__is_enclosure_rssd(enclosure)
+        ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
         return True if ret > 0 else False
 
     @DbPersist(_db)
@@ -105,11 +119,15 @@ class DbHelper:
         """
         self._db.query(SEARCHRESULTINFO).delete()
 
-    @DbPersist(_db)
     def insert_rss_torrents(self, media_info):
         """
         將RSS的記錄插入資料庫
         """
+        if self.__insert_rss_torrents(media_info):
+            SeenHelper().add(media_info.enclosure)
+
+    @DbPersist(_db)
+    def __insert_rss_torrents(self, media_info):
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=media_info.org_string,
@@ -121,22 +139,32 @@ class DbHelper:
                 EPISODE=media_info.get_episode_string()
             ))
 
-    @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
         """
         將RSS的記錄插入資料庫
         """
+        if self.__simple_insert_rss_torrents(title, enclosure):
+            SeenHelper().add(enclosure)
+
+    @DbPersist(_db)
+    def __simple_insert_rss_torrents(self, title, enclosure):
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=title,
                 ENCLOSURE=enclosure
             ))
 
-    @DbPersist(_db)
     def simple_delete_rss_torrents(self, title, enclosure):
         """
         刪除RSS的記錄
         """
+        if self.__simple_delete_rss_torrents(title, enclosure):
+            # 同一連結可能還有其它名稱的記錄
+            if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() == 0:
+                SeenHelper().discard(enclosure)
+
+    @DbPersist(_db)
+    def __simple_delete_rss_torrents(self, title, enclosure):
         self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title,
                                            RSSTORRENTS.ENCLOSURE == enclosure).delete()
 
@@ -241,26 +269,35 @@ class DbHelper:
             )
         )
 
-    def get_transfer_history(self, search, page, rownum):
+    def get_transfer_history(self, search, page, rownum, after=None, before=None):
         """
-        查詢識別轉移記錄
+        查詢識別轉移記錄，按時間倒序
+        :param search: 檢索詞，匹配原檔名和標題
+        :param after: 上一頁最後一條記錄的(DATE, ID)，有值時按遊標查詢下一頁
+        :param before: 下一頁第一條記錄的(DATE, ID)，有值時按遊標查詢上一頁
+        :return: 總數, 當前頁記錄
         """
-        if int(page) == 1:
-            begin_pos = 0
-        else:
-            begin_pos = (int(page) - 1) * int(rownum)
-
+        query = self._db.query(TRANSFERHISTORY)
         if search:
-            search = f"%{search}%"
-            count = self._db.query(TRANSFERHISTORY).filter((TRANSFERHISTORY.SOURCE_FILENAME.like(search))
-                                                           | (TRANSFERHISTORY.TITLE.like(search))).count()
-            data = self._db.query(TRANSFERHISTORY).filter((TRANSFERHISTORY.SOURCE_FILENAME.like(search))
-                                                          | (TRANSFERHISTORY.TITLE.like(search))).order_by(
-                TRANSFERHISTORY.DATE.desc()).limit(int(rownum)).offset(begin_pos).all()
-            return count, data
-        else:
-            return self._db.query(TRANSFERHISTORY).count(), self._db.query(TRANSFERHISTORY).order_by(
-                TRANSFERHISTORY.DATE.desc()).limit(int(rownum)).offset(begin_pos).all()
+            rowids = fts_rowids("TRANSFER_HISTORY", search)
+            if rowids is not None:
+                query = query.filter(TRANSFERHISTORY.ID.in_(rowids))
+            else:
+                search = f"%{search}%"
+                query = query.filter((TRANSFERHISTORY.SOURCE_FILENAME.like(search))
+                                     | (TRANSFERHISTORY.TITLE.like(search)))
+        count = query.count()
+        if after:
+            data = query.filter(tuple_(TRANSFERHISTORY.DATE, TRANSFERHISTORY.ID) < (after[0], int(after[1]))).order_by(
+                TRANSFERHISTORY.DATE.desc(), TRANSFERHISTORY.ID.desc()).limit(int(rownum)).all()
+        elif before:
+            data = query.filter(tuple_(TRANSFERHISTORY.DATE, TRANSFERHISTORY.ID) > (before[0], int(before[1]))).order_by(
+                TRANSFERHISTORY.DATE.asc(), TRANSFERHISTORY.ID.asc()).limit(int(rownum)).all()
+            data.reverse()
+        else:
+            data = query.order_by(TRANSFERHISTORY.DATE.desc(), TRANSFERHISTORY.ID.desc()).limit(
+                int(rownum)).offset((int(page) - 1) * int(rownum)).all()
+        return count, data
 
     def get_transfer_path_by_id(self, logid):
         """
@@ -384,11 +421,15 @@ class DbHelper:
         self._db.query(TRANSFERBLACKLIST).delete()
         self._db.query(SYNCHISTORY).delete()
 
-    @DbPersist(_db)
     def truncate_rss_history(self, ):
         """
         清空RSS歷史記錄
         """
+        if self.__truncate_rss_history():
+            SeenHelper().clear()
+
+    @DbPersist(_db)
+    def __truncate_rss_history(self, ):
         self._db.query(RSSTORRENTS).delete()
 
     @DbPersist(_db)
@@ -544,6 +585,13 @@ class DbHelper:
                     return ret[0]
         return ""
 
+    def get_rss_movie_ids(self, titles, tmdbids=None):
+        """
+        批次獲取訂閱電影ID，匹配規則同get_rss_movie_id
+        :return: 名稱 -> 訂閱ID，TMDBID -> 訂閱ID
+        """
+        return self.__get_rss_ids(RSSMOVIES, titles, tmdbids)
+
     def get_rss_movie_sites(self, rssid):
         """
         獲取訂閱電影站點
@@ -717,6 +765,29 @@ class DbHelper:
                         return ret[0]
         return ""
 
+    def get_rss_tv_ids(self, titles, tmdbids=None):
+        """
+        批次獲取訂閱電視劇ID（不區分季），匹配規則同get_rss_tv_id
+        :return: 名稱 -> 訂閱ID，TMDBID -> 訂閱ID
+        """
+        return self.__get_rss_ids(RSSTVS, titles, tmdbids)
+
+    def __get_rss_ids(self, table, titles, tmdbids):
+        """
+        一次查詢名稱或TMDBID匹配的訂閱，同一名稱或TMDBID有多個訂閱時取最早的
+        """
+        titles = [title for title in set(titles or []) if title]
+        tmdbids = [str(tmdbid) for tmdbid in set(tmdbids or []) if tmdbid]
+        if not titles and not tmdbids:
+            return {}, {}
+        title_ids, tmdbid_ids = {}, {}
+        for rssid, name, tmdbid in self._db.query(table.ID, table.NAME, table.TMDBID).filter(
+                or_(table.NAME.in_(titles), table.TMDBID.in_(tmdbids))).order_by(table.ID):
+            title_ids.setdefault(name, rssid)
+            if tmdbid:
+                tmdbid_ids.setdefault(str(tmdbid), rssid)
+        return title_ids, tmdbid_ids
+
     def get_rss_tv_sites(self, rssid):
         """
         獲取訂閱電視劇站點
@@ -1026,17 +1097,23 @@ class DbHelper:
         """
         self._db.query(CONFIGUSERS).filter(CONFIGUSERS.NAME == name).delete()
 
-    def get_transfer_statistics(self, days=30):
+    def get_transfer_statistics(self, days=30, min_id=0):
         """
         查詢歷史記錄統計
+        :param days: 統計的天數
+        :param min_id: 只統計ID大於該值的記錄
+        :return: 型別、日期、數量、最大ID
         """
-        begin_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        begin_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d")
         return self._db.query(TRANSFERHISTORY.TYPE,
                               func.substr(TRANSFERHISTORY.DATE, 1, 10),
-                              func.count('*')
-                              ).filter(TRANSFERHISTORY.DATE > begin_date).group_by(
+                              func.count('*'),
+                              func.max(TRANSFERHISTORY.ID)
+                              ).filter(TRANSFERHISTORY.DATE >= begin_date,
+                                       TRANSFERHISTORY.ID > min_id).group_by(
+            TRANSFERHISTORY.TYPE,
             func.substr(TRANSFERHISTORY.DATE, 1, 10)
-        ).order_by(TRANSFERHISTORY.DATE).all()
+        ).all()
 
     @DbPersist(_db)
     def update_site_user_statistics_site_name(self, new_name, old_name):
@@ -1563,6 +1640,20 @@ class DbHelper:
         """
         更新上傳下載量和刪除種子數
         """
+        self.__add_brushtask_upload_count(brush_id, upload_size, download_size, remove_count)
+
+    @DbPersist(_db)
+    def add_brushtask_upload_counts(self, counts: list):
+        """
+        批次更新多個刷流任務的上傳下載量和刪除種子數，在一個事務中完成
+        :param counts: (任務ID, 上傳量, 下載量, 刪除種子數) 列表
+        """
+        if not counts:
+            return
+        for brush_id, upload_size, download_size, remove_count in counts:
+            self.__add_brushtask_upload_count(brush_id, upload_size, download_size, remove_count)
+
+    def __add_brushtask_upload_count(self, brush_id, upload_size, download_size, remove_count):
         if not brush_id:
             return
         delete_upsize = 0
@@ -1652,6 +1743,20 @@ class DbHelper:
         self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.TASK_ID == brush_id,
                                                  SITEBRUSHTORRENTS.DOWNLOAD_ID == download_id).delete()
 
+    @DbPersist(_db)
+    def delete_brushtask_torrents(self, ids: list):
+        """
+        批次刪除刷流種子記錄
+        :param ids: (任務ID, 下載ID) 列表
+        """
+        if not ids:
+            return
+        for brush_id, download_id in ids:
+            if not download_id or not brush_id:
+                continue
+            self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.TASK_ID == brush_id,
+                                                     SITEBRUSHTORRENTS.DOWNLOAD_ID == download_id).delete()
+
     def get_user_downloaders(self, did=None):
         """
         查詢自定義下載器
@@ -1872,6 +1977,7 @@ class DbHelper:
                 PARAMS=item.get("params")
             ))
 
+    @DbPersist(_db)
     def excute(self, sql):
         return self._db.excute(sql)
 
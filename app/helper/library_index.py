@@ -0,0 +1,255 @@
+import os
+from threading import Lock
+
+import log
+from app.utils import PathUtils
+from app.utils.commons import singleton
+from config import Config
+
+lock = Lock()
+
+
+@singleton
+class LibraryIndex:
+    """
+    媒體庫目錄索引：記錄電影、電視劇、動漫媒體庫下每個目錄中的檔案和子目錄（媒體目錄 -> 季目錄 -> 集檔案），
+    用於判斷媒體是否已存在，避免逐個路徑訪問檔案系統。定時按目錄修改時間增量重新掃描，本程式轉移的檔案即時加入。
+    索引未建立、路徑不在媒體庫中或狀態未知時查詢返回None，由呼叫方直接訪問檔案系統
+    """
+    _roots = []
+    # 目錄路徑 -> [目錄修改時間, 檔名集合, 子目錄名集合, 符號連結目錄名集合]
+    _dirs = {}
+    _ready = False
+    # 重新掃描期間發生的變更，掃描完成後重放到新索引
+    _pending = None
+
+    def __init__(self):
+        self._roots = []
+        self._dirs = {}
+        self._ready = False
+        self._pending = None
+        self._refresh_lock = Lock()
+
+    @staticmethod
+    def __get_library_paths():
+        """
+        獲取配置的媒體庫目錄
+        """
+        media = Config().get_config('media') or {}
+        paths = []
+        for key in ['movie_path', 'tv_path', 'anime_path']:
+            value = media.get(key)
+            if not value:
+                continue
+            if not isinstance(value, list):
+                value = [value]
+            for path in value:
+                if path and os.path.normpath(path) not in paths:
+                    paths.append(os.path.normpath(path))
+        return paths
+
+    @staticmethod
+    def __scan_dir(path):
+        """
+        列出一個目錄，返回索引項
+        """
+        mtime = os.stat(path).st_mtime_ns
+        files, dirs, links = set(), set(), set()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if entry.is_symlink():
+                            links.add(entry.name)
+                        else:
+                            dirs.add(entry.name)
+                    else:
+                        files.add(entry.name)
+                except OSError:
+                    files.add(entry.name)
+        return [mtime, files, dirs, links]
+
+    def refresh(self):
+        """
+        重新掃描媒體庫，修改時間未變化的目錄沿用已有的列表
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            roots = self.__get_library_paths()
+            with lock:
+                old_dirs = self._dirs
+                self._pending = []
+            dirs = {}
+            for root in roots:
+                if not os.path.isdir(root):
+                    continue
+                dir_paths = [root]
+                while dir_paths:
+                    path = dir_paths.pop()
+                    # 舊索引項可能同時被add_path修改，在鎖內複製後再使用
+                    with lock:
+                        old_item = old_dirs.get(path)
+                        if old_item:
+                            old_item = [old_item[0], set(old_item[1]), set(old_item[2]), set(old_item[3])]
+                    try:
+                        if old_item and old_item[0] is not None and os.stat(path).st_mtime_ns == old_item[0]:
+                            item = old_item
+                        else:
+                            item = self.__scan_dir(path)
+                    except OSError:
+                        continue
+                    dirs[path] = item
+                    dir_paths.extend([os.path.join(path, name) for name in item[2]])
+            with lock:
+                for oper, args in self._pending:
+                    oper(dirs, roots, *args)
+                self._pending = None
+                self._roots = roots
+                self._dirs = dirs
+                if not self._ready:
+                    log.info(f"【Rmt】媒體庫索引建立完成，共 {len(dirs)} 個目錄")
+                self._ready = True
+        finally:
+            self._refresh_lock.release()
+
+    def __in_roots(self, roots, path):
+        """
+        判斷路徑是否在媒體庫目錄中
+        """
+        for root in roots:
+            if path == root or path.startswith(os.path.join(root, "")):
+                return True
+        return False
+
+    def __locate(self, dirs, roots, path):
+        """
+        查詢路徑最近的已索引上級目錄
+        :return: 上級目錄的索引項，以及從該目錄到路徑的各級名稱；路徑不在媒體庫中時返回None, None
+        """
+        if not self.__in_roots(roots, path):
+            return None, None
+        names = []
+        parent = path
+        while True:
+            item = dirs.get(parent)
+            if item:
+                return item, list(reversed(names))
+            new_parent = os.path.dirname(parent)
+            if new_parent == parent or not self.__in_roots(roots, new_parent):
+                return None, None
+            names.append(os.path.basename(parent))
+            parent = new_parent
+
+    def exists(self, path):
+        """
+        判斷媒體庫中的檔案或目錄是否存在
+        :return: True/False，無法從索引判斷時返回None
+        """
+        if not self._ready or not path:
+            return None
+        path = os.path.normpath(path)
+        with lock:
+            item, names = self.__locate(self._dirs, self._roots, path)
+            if not item:
+                return None
+            if not names:
+                return True
+            # 最近的已索引上級目錄中不存在下一級，則路徑不存在；存在但未索引時（符號連結目錄等）狀態未知
+            name = names[0]
+            if name in item[2] or name in item[3]:
+                return None
+            if name in item[1]:
+                return True if len(names) == 1 else None
+            return False
+
+    def get_media_files(self, path, exts):
+        """
+        從索引獲取目錄下的媒體檔案列表
+        :return: 檔案路徑列表，無法從索引判斷時返回None
+        """
+        if not self._ready or not path:
+            return None
+        path = os.path.normpath(path)
+        with lock:
+            item, names = self.__locate(self._dirs, self._roots, path)
+            if not item:
+                return None
+            if names:
+                # 目錄未索引，已確定不存在時返回空列表
+                name = names[0]
+                if name in item[1] or name in item[2] or name in item[3]:
+                    return None
+                return []
+            ret_list = []
+            dir_paths = [path]
+            while dir_paths:
+                root = dir_paths.pop()
+                item = self._dirs.get(root)
+                # 子目錄未索引或含符號連結目錄時無法判斷
+                if not item or item[3]:
+                    return None
+                for name in item[1]:
+                    cur_path = os.path.join(root, name)
+                    if PathUtils.is_invalid_path(cur_path):
+                        continue
+                    if os.path.splitext(name)[-1].lower() not in exts:
+                        continue
+                    ret_list.append(cur_path)
+                dir_paths.extend([os.path.join(root, name) for name in item[2]])
+            return ret_list
+
+    def __add_path(self, dirs, roots, path, is_dir):
+        """
+        在索引中加入路徑，中間新建立的目錄一併加入
+        """
+        item, names = self.__locate(dirs, roots, path)
+        if not item or not names:
+            return
+        cur_path = path
+        for _ in names:
+            cur_path = os.path.dirname(cur_path)
+        for index, name in enumerate(names):
+            cur_path = os.path.join(cur_path, name)
+            # 修改時間置空，下次掃描時重新列出
+            item[0] = None
+            if index < len(names) - 1 or is_dir:
+                if name in item[1] or name in item[2] or name in item[3]:
+                    # 已存在但未索引的目錄，內容未知
+                    return
+                # 新建立的目錄
+                item[2].add(name)
+                item = dirs[cur_path] = [None, set(), set(), set()]
+            else:
+                item[1].add(name)
+
+    def __invalidate(self, dirs, roots, path):
+        """
+        移除路徑所在目錄及其下級目錄的索引項
+        """
+        parent = os.path.dirname(path)
+        prefix = os.path.join(parent, "")
+        for dir_path in [p for p in dirs if p == parent or p.startswith(prefix)]:
+            dirs.pop(dir_path)
+
+    def __update(self, oper, *args):
+        with lock:
+            oper(self._dirs, self._roots, *args)
+            if self._pending is not None:
+                self._pending.append((oper, args))
+
+    def add_path(self, path, is_dir=False):
+        """
+        記錄本程式新建立的檔案或空目錄
+        """
+        if not self._ready or not path:
+            return
+        self.__update(self.__add_path, os.path.normpath(path), is_dir)
+
+    def invalidate(self, path):
+        """
+        路徑已被刪除、重新命名或內容有變化，其所在目錄在下次掃描前不再使用索引判斷
+        """
+        if not self._ready or not path:
+            return
+        self.__update(self.__invalidate, os.path.normpath(path))
@@ -1,23 +1,30 @@
 import os
 import pickle
-import random
 import time
 from enum import Enum
 from threading import RLock
 
+import log
+from app.db.media_db import MediaDb
 from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
+from app.utils.types import MediaType
 from config import Config
 
 lock = RLock()
 
 CACHE_EXPIRE_TIMESTAMP_STR = "cache_expire_timestamp"
 EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 剩餘有效期低於該值時訪問才重新整理過期時間，避免每次讀取都寫庫
+EXPIRE_REFRESH_TIMESTAMP = 6 * 24 * 3600
+# 遷移舊快取時每批插入的條數
+MIGRATE_BATCH_SIZE = 100
 
 
 @singleton
 class MetaHelper(object):
     """
+    TMDB快取，儲存在media.db的TMDB_CACHE表中，按KEY讀寫，不預先載入
     {
         "id": '',
         "title": '',
@@ -25,196 +32,189 @@ class MetaHelper(object):
         "type": MediaType
     }
     """
-    _meta_data = {}
-
     _meta_path = None
     _tmdb_cache_expire = False
+    _mediadb = None
 
     def __init__(self):
+        self._mediadb = MediaDb()
         self.init_config()
+        # 未識別的快取只在本次執行期間有效
+        self.delete_unknown_meta()
 
     def init_config(self):
         laboratory = Config().get_config('laboratory')
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
         self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+        self.__migrate_meta_data(self._meta_path)
 
     def clear_meta_data(self):
         """
         清空所有TMDB快取
         """
         with lock:
-            self._meta_data = {}
-
-    def get_meta_data_path(self):
-        """
-        返回TMDB快取檔案路徑
-        """
-        return self._meta_path
+            self._mediadb.delete_tmdb_cache()
 
     def get_meta_data_by_key(self, key):
         """
         根據KEY值獲取快取值
         """
         with lock:
-            info: dict = self._meta_data.get(key)
-            if info:
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire or int(time.time()) < expire:
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self.update_meta_data({key: info})
-                elif expire and self._tmdb_cache_expire:
-                    self.delete_meta_data(key)
-            return info or {}
-
-    def dump_meta_data(self, search, page, num):
+            item = self._mediadb.get_tmdb_cache(key)
+            if not item:
+                return {}
+            info = self.__item_to_info(item)
+            now = int(time.time())
+            expire = item.EXPIRE
+            if not expire or now < expire:
+                # 臨近過期才重新整理過期時間
+                if not expire or expire - now < EXPIRE_REFRESH_TIMESTAMP:
+                    self._mediadb.update_tmdb_cache(key, EXPIRE=now + EXPIRE_TIMESTAMP)
+            elif self._tmdb_cache_expire:
+                self.delete_meta_data(key)
+            return info
+
+    def dump_meta_data(self, search, page, num, after=None, before=None):
         """
         分頁獲取當前快取列表
         @param search: 檢索的快取key
         @param page: 頁碼
         @param num: 單頁大小
+        @param after: 上一頁最後一條快取的key，按遊標查詢下一頁
+        @param before: 下一頁第一條快取的key，按遊標查詢上一頁
         @return: 總數, 快取列表
         """
-        if page == 1:
-            begin_pos = 0
-        else:
-            begin_pos = (page - 1) * num
-
         with lock:
-            search_metas = [(k, {
-                "id": v.get("id"),
-                "title": v.get("title"),
-                "year": v.get("year"),
-                "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
-                "poster_path": v.get("poster_path"),
-                "backdrop_path": v.get("backdrop_path")
-            },  str(k).replace("[電影]", "").replace("[電視劇]", "").replace("[未知]", "").replace("-None", ""))
-                for k, v in self._meta_data.items() if search.lower() in k.lower() and v.get("id") != 0]
-            return len(search_metas), search_metas[begin_pos: begin_pos + num]
+            total, items = self._mediadb.search_tmdb_caches(search=search, page=page, num=num,
+                                                            after=after, before=before)
+            search_metas = []
+            for item in items:
+                info = self.__item_to_info(item)
+                search_metas.append((item.KEY, {
+                    "id": info.get("id"),
+                    "title": info.get("title"),
+                    "year": info.get("year"),
+                    "media_type": info.get("type").value if isinstance(info.get("type"), Enum) else info.get(
+                        "type"),
+                    "poster_path": info.get("poster_path"),
+                    "backdrop_path": info.get("backdrop_path")
+                }, str(item.KEY).replace("[電影]", "").replace("[電視劇]", "").replace("[未知]", "").replace("-None", "")))
+            return total, search_metas
 
     def delete_meta_data(self, key):
         """
         刪除快取資訊
         @param key: 快取key
-        @return: 被刪除的快取內容
+        @return: 是否刪除了快取
         """
         with lock:
-            return self._meta_data.pop(key, None)
+            return self._mediadb.delete_tmdb_cache(key=key) > 0
 
     def delete_meta_data_by_tmdbid(self, tmdbid):
         """
         清空對應TMDBID的所有快取記錄，以強制更新TMDB中最新的資料
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
-                with lock:
-                    self._meta_data.pop(key)
+        if not tmdbid:
+            return
+        with lock:
+            self._mediadb.delete_tmdb_cache(tmdbid=tmdbid)
 
     def delete_unknown_meta(self):
         """
         清除未識別的快取記錄，以便重新檢索TMDB
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == '0':
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            self._mediadb.delete_tmdb_cache(tmdbid=0)
 
     def modify_meta_data(self, key, title):
         """
-        刪除快取資訊
+        修改快取的標題
         @param key: 快取key
         @param title: 標題
-        @return: 被修改後快取內容
+        @return: 是否修改成功
         """
         with lock:
-            if self._meta_data.get(key):
-                self._meta_data[key]['title'] = title
-                self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-            return self._meta_data.get(key)
+            return self._mediadb.update_tmdb_cache(key,
+                                                   TITLE=title,
+                                                   EXPIRE=int(time.time()) + EXPIRE_TIMESTAMP)
 
-    @staticmethod
-    def __load_meta_data(path):
+    def __migrate_meta_data(self, path):
         """
-        從檔案中載入快取
+        將舊版本tmdb.dat中的快取一次性遷移到資料庫，遷移後將檔案重新命名
         """
+        if not os.path.exists(path):
+            return
         try:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
+            with open(path, 'rb') as f:
+                meta_data = pickle.load(f)
+            items = [self.__info_to_item(key, info) for key, info in (meta_data or {}).items()
+                     if info and str(info.get("id")) != '0']
+            for i in range(0, len(items), MIGRATE_BATCH_SIZE):
+                if not self._mediadb.insert_tmdb_caches(items[i:i + MIGRATE_BATCH_SIZE]):
+                    return
+            os.replace(path, f"{path}.bak")
+            log.info(f"【Meta】已將 {len(items)} 條TMDB快取遷移到資料庫")
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
-            return {}
 
-    def update_meta_data(self, meta_data):
+    @staticmethod
+    def __info_to_item(key, info):
+        """
+        快取資訊轉換為資料庫記錄
+        """
+        mtype = info.get("type")
+        return {
+            "KEY": key,
+            "TMDBID": str(info.get("id")),
+            "TYPE": mtype.value if isinstance(mtype, Enum) else mtype,
+            "TITLE": info.get("title"),
+            "YEAR": info.get("year"),
+            "POSTER_PATH": info.get("poster_path"),
+            "BACKDROP_PATH": info.get("backdrop_path"),
+            "EXPIRE": info.get(CACHE_EXPIRE_TIMESTAMP_STR) or int(time.time()) + EXPIRE_TIMESTAMP
+        }
+
+    @staticmethod
+    def __item_to_info(item):
         """
-        新增或更新快取條目
+        資料庫記錄轉換為快取資訊
         """
-        if not meta_data:
-            return
-        with lock:
-            for key, item in meta_data.items():
-                if not self._meta_data.get(key):
-                    item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self._meta_data[key] = item
+        tmdbid = item.TMDBID
+        if tmdbid and str(tmdbid).isdigit():
+            tmdbid = int(tmdbid)
+        if str(tmdbid) == '0':
+            return {"id": 0, CACHE_EXPIRE_TIMESTAMP_STR: item.EXPIRE}
+        try:
+            mtype = MediaType(item.TYPE) if item.TYPE else None
+        except ValueError:
+            mtype = item.TYPE
+        return {
+            "id": tmdbid,
+            "type": mtype,
+            "year": item.YEAR,
+            "title": item.TITLE,
+            "poster_path": item.POSTER_PATH,
+            "backdrop_path": item.BACKDROP_PATH,
+            CACHE_EXPIRE_TIMESTAMP_STR: item.EXPIRE
+        }
 
-    def save_meta_data(self, force=False):
+    def update_meta_data(self, meta_data):
         """
-        儲存快取資料到檔案
+        新增快取條目，已存在的不覆蓋
         """
-        meta_data = self.__load_meta_data(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
+        if not meta_data:
             return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
-
-    def _random_sample(self, new_meta_data):
-        """
-        取樣分析是否需要儲存
-        """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(new_meta_data.keys(), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            self._mediadb.insert_tmdb_caches([self.__info_to_item(key, dict(item, **{
+                CACHE_EXPIRE_TIMESTAMP_STR: int(time.time()) + EXPIRE_TIMESTAMP
+            })) for key, item in meta_data.items()])
 
     def get_cache_title(self, key):
         """
         獲取快取的標題
         """
-        cache_media_info = self._meta_data.get(key)
+        cache_media_info = self.get_meta_data_by_key(key)
         if not cache_media_info or not cache_media_info.get("id"):
             return None
         return cache_media_info.get("title")
@@ -223,7 +223,5 @@ class MetaHelper(object):
         """
         重新設定快取標題
         """
-        cache_media_info = self._meta_data.get(key)
-        if not cache_media_info:
-            return
-        self._meta_data[key]['title'] = cn_title
+        with lock:
+            self._mediadb.update_tmdb_cache(key, TITLE=cn_title)
@@ -1,3 +1,4 @@
+from app.utils import EventBus
 from app.utils.commons import singleton
 
 
@@ -21,11 +22,13 @@ class ProgressHelper(object):
     def start(self, ptype="search"):
         self.reset(ptype)
         self._process_detail[ptype]['enable'] = True
+        self.__publish(ptype)
 
     def end(self, ptype="search"):
         if not self._process_detail.get(ptype):
             return
         self._process_detail[ptype]['enable'] = False
+        self.__publish(ptype)
 
     def update(self, value=None, text=None, ptype="search"):
         if not self._process_detail.get(ptype, {}).get('enable'):
@@ -34,6 +37,13 @@ class ProgressHelper(object):
             self._process_detail[ptype]['value'] = value
         if text:
             self._process_detail[ptype]['text'] = text
+        self.__publish(ptype)
 
     def get_process(self, ptype="search"):
         return self._process_detail.get(ptype)
+
+    def __publish(self, ptype):
+        """
+        推送進度變化，未取走的同型別進度只保留最新的
+        """
+        EventBus().publish("progress", dict(self._process_detail[ptype], type=ptype), key=ptype)
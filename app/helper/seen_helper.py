@@ -0,0 +1,77 @@
+import hashlib
+from threading import Lock
+
+from app.utils.commons import singleton
+from app.utils.exception_utils import ExceptionUtils
+
+lock = Lock()
+
+
+@singleton
+class SeenHelper(object):
+    """
+    RSS已處理種子的記憶體索引，儲存下載連結的雜湊，由RSS_TORRENTS預熱並隨增刪同步更新
+    """
+    _seen = set()
+    _loaded = False
+
+    def __init__(self):
+        self._seen = set()
+        self._loaded = False
+
+    def init_config(self):
+        pass
+
+    @staticmethod
+    def __hash(enclosure):
+        return hashlib.md5(str(enclosure).encode("utf-8")).digest()
+
+    def is_loaded(self):
+        return self._loaded
+
+    def load(self, loader):
+        """
+        從資料庫載入索引，只載入一次
+        :param loader: 返回所有下載連結的函式
+        """
+        if self._loaded:
+            return
+        with lock:
+            if self._loaded:
+                return
+            try:
+                self._seen = set(self.__hash(enclosure) for enclosure in loader() if enclosure)
+                self._loaded = True
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+
+    def contains(self, enclosure):
+        """
+        檢查下載連結是否已處理過
+        :return: True已處理，False未處理，None索引未載入無法判斷
+        """
+        if not self._loaded:
+            return None
+        return self.__hash(enclosure) in self._seen
+
+    def add(self, enclosure):
+        if not enclosure:
+            return
+        with lock:
+            if self._loaded:
+                self._seen.add(self.__hash(enclosure))
+
+    def discard(self, enclosure):
+        if not enclosure:
+            return
+        with lock:
+            if self._loaded:
+                self._seen.discard(self.__hash(enclosure))
+
+    def clear(self):
+        with lock:
+            if self._loaded:
+                self._seen = set()
+
+    def count(self):
+        return len(self._seen)
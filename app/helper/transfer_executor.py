@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Semaphore
+
+from app.utils.commons import singleton
+from config import TRANSFER_THREADS, TRANSFER_THREADS_PER_DISK
+
+lock = Lock()
+
+
+@singleton
+class TransferExecutor:
+    """
+    檔案轉移執行器：不同檔案的轉移並行執行，同一檔案系統上同時進行的轉移數受限，相同目的路徑的轉移序列執行
+    """
+    _executor = None
+    _disk_semaphores = {}
+    _path_locks = {}
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=TRANSFER_THREADS)
+        self._disk_semaphores = {}
+        self._path_locks = {}
+
+    @staticmethod
+    def __get_disk(path):
+        """
+        獲取路徑所在的檔案系統，路徑還不存在時取最近的已存在上級目錄
+        """
+        path = os.path.abspath(path)
+        while True:
+            try:
+                return os.stat(path).st_dev
+            except OSError:
+                parent = os.path.dirname(path)
+                if parent == path:
+                    return None
+                path = parent
+
+    def __get_semaphores(self, src, dest):
+        """
+        獲取源和目的檔案系統的並行名額，按固定順序返回避免死鎖
+        """
+        disks = sorted(set([disk for disk in [self.__get_disk(src), self.__get_disk(dest)] if disk is not None]))
+        with lock:
+            for disk in disks:
+                if disk not in self._disk_semaphores:
+                    self._disk_semaphores[disk] = Semaphore(TRANSFER_THREADS_PER_DISK)
+            return [self._disk_semaphores[disk] for disk in disks]
+
+    def __lock_path(self, path):
+        """
+        鎖定目的路徑
+        """
+        with lock:
+            path_lock = self._path_locks.get(path)
+            if not path_lock:
+                path_lock = self._path_locks[path] = [Lock(), 0]
+            path_lock[1] += 1
+        path_lock[0].acquire()
+
+    def __unlock_path(self, path):
+        """
+        釋放目的路徑，沒有其它轉移等待時移除該鎖
+        """
+        with lock:
+            path_lock = self._path_locks.get(path)
+            path_lock[1] -= 1
+            if path_lock[1] == 0:
+                self._path_locks.pop(path)
+        path_lock[0].release()
+
+    def run(self, func, src, dest):
+        """
+        在當前執行緒中執行一次轉移
+        :param func: 轉移方法，引數為源路徑和目的路徑
+        :param src: 源路徑
+        :param dest: 目的路徑
+        """
+        dest_path = os.path.normpath(dest)
+        self.__lock_path(dest_path)
+        try:
+            semaphores = self.__get_semaphores(src, dest)
+            for semaphore in semaphores:
+                semaphore.acquire()
+            try:
+                return func(src, dest)
+            finally:
+                for semaphore in reversed(semaphores):
+                    semaphore.release()
+        finally:
+            self.__unlock_path(dest_path)
+
+    def submit(self, func, *args, after=None):
+        """
+        提交一個轉移任務，返回Future
+        :param func: 任務方法
+        :param after: 需要先完成的任務Future，如轉移到同一位置的前一個檔案
+        """
+
+        def run_task():
+            if after:
+                try:
+                    after.result()
+                except Exception:
+                    # 前一個任務的異常由其結果的使用方處理
+                    pass
+            return func(*args)
+
+        return self._executor.submit(run_task)
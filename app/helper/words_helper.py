@@ -15,6 +15,11 @@ class WordsHelper:
     replaced_offset_words_info = []
     offset_words_info = []
 
+    # 預編譯的自定義識別詞，init_config時重建
+    _compiled_words = {}
+    # 識別詞版本，每次重新載入加1，用於失效識別結果快取
+    _version = 0
+
     def __init__(self):
         self.init_config()
 
@@ -26,6 +31,81 @@ class WordsHelper:
         self.replaced_words_noregex_info = self.dbhelper.get_custom_words(enabled=1, wtype=2, regex=0)
         self.replaced_offset_words_info = self.dbhelper.get_custom_words(enabled=1, wtype=3, regex=1)
         self.offset_words_info = self.dbhelper.get_custom_words(enabled=1, wtype=4, regex=1)
+        self._compiled_words = self.__compile_words()
+        self._version += 1
+
+    def get_version(self):
+        return self._version
+
+    @staticmethod
+    def __compile(pattern):
+        """
+        編譯正則，出錯時返回異常，由process在使用時報告
+        """
+        try:
+            return re.compile(r'%s' % pattern)
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def __compile_literals(words):
+        """
+        將非正則詞編譯為一個轉義後的多選正則，用於一次掃描判斷標題中是否包含任一詞
+        """
+        if not words:
+            return None
+        try:
+            return re.compile("|".join(re.escape(word) for word in words))
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            # 無法合併時總是逐個檢查
+            return re.compile("")
+
+    def __compile_words(self):
+        """
+        預編譯所有自定義識別詞
+        """
+        # 遮蔽詞合併為一個正則
+        ignored_re = None
+        if self.ignored_words_info:
+            ignored_re = self.__compile(
+                "|".join([ignored_word_info.REPLACED for ignored_word_info in self.ignored_words_info]))
+        # 替換詞：(原資訊, 正則, 替換為, 使用記錄)
+        replaced = []
+        for replaced_word_info in self.replaced_words_info or []:
+            replaced.append((replaced_word_info,
+                             self.__compile(replaced_word_info.REPLACED),
+                             r'%s' % replaced_word_info.REPLACE,
+                             "%s@%s" % (replaced_word_info.REPLACED, replaced_word_info.REPLACE)))
+        # 替換+集偏移詞：(原資訊, 正則, 替換為, 使用記錄, 集偏移規則)
+        replaced_offset = []
+        for replaced_offset_word_info in self.replaced_offset_words_info or []:
+            replaced_offset.append((replaced_offset_word_info,
+                                    self.__compile(replaced_offset_word_info.REPLACED),
+                                    r'%s' % replaced_offset_word_info.REPLACE,
+                                    "%s@%s" % (replaced_offset_word_info.REPLACED,
+                                               replaced_offset_word_info.REPLACE),
+                                    self.compile_episode_offset(replaced_offset_word_info.FRONT,
+                                                                replaced_offset_word_info.BACK,
+                                                                replaced_offset_word_info.OFFSET)))
+        # 集偏移詞
+        offset = [self.compile_episode_offset(offset_word_info.FRONT,
+                                              offset_word_info.BACK,
+                                              offset_word_info.OFFSET)
+                  for offset_word_info in self.offset_words_info or []]
+        return {
+            "ignored": ignored_re,
+            "ignored_noregex": [info.REPLACED for info in self.ignored_words_noregex_info or []],
+            "ignored_noregex_re": self.__compile_literals(
+                [info.REPLACED for info in self.ignored_words_noregex_info or []]),
+            "replaced": replaced,
+            "replaced_noregex": [(info, info.REPLACED, info.REPLACE, "%s@%s" % (info.REPLACED, info.REPLACE))
+                                 for info in self.replaced_words_noregex_info or []],
+            "replaced_noregex_re": self.__compile_literals(
+                [info.REPLACED for info in self.replaced_words_noregex_info or []]),
+            "replaced_offset": replaced_offset,
+            "offset": offset
+        }
 
     def process(self, title):
         # 錯誤資訊
@@ -36,25 +116,30 @@ class WordsHelper:
         used_replaced_words = []
         # 應用集偏移
         used_offset_words = []
+        # init_config可能在其它執行緒中重建，取一次引用
+        compiled_words = self._compiled_words
+        if not compiled_words:
+            return title, msg, {"ignored": used_ignored_words,
+                                "replaced": used_replaced_words,
+                                "offset": used_offset_words}
         # 遮蔽
-        if self.ignored_words_info:
+        ignored_re = compiled_words.get("ignored")
+        if ignored_re is not None:
             try:
-                ignored_words = []
-                for ignored_word_info in self.ignored_words_info:
-                    ignored_words.append(ignored_word_info.REPLACED)
-                ignored_words = "|".join(ignored_words)
-                ignored_words = re.compile(r'%s' % ignored_words)
+                if isinstance(ignored_re, Exception):
+                    raise ignored_re
                 # 去重
-                used_ignored_words = list(set(re.findall(ignored_words, title)))
+                used_ignored_words = list(set(ignored_re.findall(title)))
                 if used_ignored_words:
-                    title = re.sub(ignored_words, '', title)
+                    title = ignored_re.sub('', title)
             except Exception as err:
                 ExceptionUtils.exception_traceback(err)
                 msg = "【Meta】自定義遮蔽詞設定有誤：%s" % str(err)
-        if self.ignored_words_noregex_info:
+        # 非正則詞先整體掃描一次，不包含任何詞時跳過逐個替換
+        ignored_noregex_re = compiled_words.get("ignored_noregex_re")
+        if ignored_noregex_re is not None and ignored_noregex_re.search(title):
             try:
-                for ignored_word_noregex_info in self.ignored_words_noregex_info:
-                    ignored_word = ignored_word_noregex_info.REPLACED
+                for ignored_word in compiled_words.get("ignored_noregex"):
                     if title.find(ignored_word) != -1:
                         title = title.replace(ignored_word, '')
                         used_ignored_words.append(ignored_word)
@@ -62,24 +147,20 @@ class WordsHelper:
                 ExceptionUtils.exception_traceback(err)
                 msg = "【Meta】自定義遮蔽詞設定有誤：%s" % str(err)
         # 替換
-        if self.replaced_words_info:
-            for replaced_word_info in self.replaced_words_info:
-                try:
-                    replaced = replaced_word_info.REPLACED
-                    replace = replaced_word_info.REPLACE
-                    replaced_word = "%s@%s" % (replaced, replace)
-                    if re.findall(r'%s' % replaced, title):
-                        used_replaced_words.append(replaced_word)
-                        title = re.sub(r'%s' % replaced, r'%s' % replace, title)
-                except Exception as err:
-                    ExceptionUtils.exception_traceback(err)
-                    msg = "【Meta】自定義替換詞 %s 格式有誤：%s" % (replaced_word_info, str(err))
-        if self.replaced_words_noregex_info:
-            for replaced_word_noregex_info in self.replaced_words_noregex_info:
+        for replaced_word_info, replaced_re, replace, replaced_word in compiled_words.get("replaced"):
+            try:
+                if isinstance(replaced_re, Exception):
+                    raise replaced_re
+                if replaced_re.search(title):
+                    used_replaced_words.append(replaced_word)
+                    title = replaced_re.sub(replace, title)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                msg = "【Meta】自定義替換詞 %s 格式有誤：%s" % (replaced_word_info, str(err))
+        replaced_noregex_re = compiled_words.get("replaced_noregex_re")
+        if replaced_noregex_re is not None and replaced_noregex_re.search(title):
+            for replaced_word_noregex_info, replaced, replace, replaced_word in compiled_words.get("replaced_noregex"):
                 try:
-                    replaced = replaced_word_noregex_info.REPLACED
-                    replace = replaced_word_noregex_info.REPLACE
-                    replaced_word = "%s@%s" % (replaced, replace)
                     if title.find(replaced) != -1:
                         used_replaced_words.append(replaced_word)
                         title = title.replace(replaced, replace)
@@ -87,44 +168,77 @@ class WordsHelper:
                     ExceptionUtils.exception_traceback(err)
                     msg = "【Meta】自定義替換詞 %s 格式有誤：%s" % (replaced_word_noregex_info, str(err))
         # 替換+集偏移
-        if self.replaced_offset_words_info:
-            for replaced_offset_word_info in self.replaced_offset_words_info:
-                try:
-                    replaced = replaced_offset_word_info.REPLACED
-                    replace = replaced_offset_word_info.REPLACE
-                    front = replaced_offset_word_info.FRONT
-                    back = replaced_offset_word_info.BACK
-                    offset = replaced_offset_word_info.OFFSET
-                    replaced_word = "%s@%s" % (replaced, replace)
-                    if re.findall(r'%s' % replaced, title):
-                        used_replaced_words.append(replaced_word)
-                        title = re.sub(r'%s' % replaced, r'%s' % replace, title)
-                        title, msg = self.episode_offset(front, back, offset, used_offset_words, title)
-                except Exception as err:
-                    ExceptionUtils.exception_traceback(err)
-                    msg = "【Meta】自定義替換+集偏移詞 %s 格式有誤：%s" % (replaced_offset_word_info, str(err))
+        for replaced_offset_word_info, replaced_re, replace, replaced_word, offset_rule \
+                in compiled_words.get("replaced_offset"):
+            try:
+                if isinstance(replaced_re, Exception):
+                    raise replaced_re
+                if replaced_re.search(title):
+                    used_replaced_words.append(replaced_word)
+                    title = replaced_re.sub(replace, title)
+                    title, msg = self.apply_episode_offset(offset_rule, used_offset_words, title)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                msg = "【Meta】自定義替換+集偏移詞 %s 格式有誤：%s" % (replaced_offset_word_info, str(err))
         # 集數偏移
-        if self.offset_words_info:
-            for offset_word_info in self.offset_words_info:
-                front = offset_word_info.FRONT
-                back = offset_word_info.BACK
-                offset = offset_word_info.OFFSET
-                title, msg = self.episode_offset(front, back, offset, used_offset_words, title)
+        for offset_rule in compiled_words.get("offset"):
+            title, msg = self.apply_episode_offset(offset_rule, used_offset_words, title)
 
         return title, msg, {"ignored": used_ignored_words,
                             "replaced": used_replaced_words,
                             "offset": used_offset_words}
 
+    @staticmethod
+    def compile_episode_offset(front, back, offset):
+        """
+        預編譯集數偏移規則，出錯的部分保留異常，使用時報告
+        :return: (前定位詞, 後定位詞, 偏移量, 後定位正則, 前定位正則, 集數定位正則, 偏移量表達式)
+        """
+        def __compile(pattern):
+            try:
+                return re.compile(pattern)
+            except Exception as err:
+                return err
+
+        def __compile_offset():
+            try:
+                return compile(offset, "<offset>", "eval")
+            except Exception as err:
+                return err
+
+        return (front, back, offset,
+                __compile(r'%s' % back) if back else None,
+                __compile(r'%s' % front) if front else None,
+                __compile(r'(?<=%s.*?)[0-9]+(?=.*?%s)' % (front, back)),
+                __compile_offset())
+
     @staticmethod
     def episode_offset(front, back, offset, used_offset_words, title):
+        return WordsHelper.apply_episode_offset(WordsHelper.compile_episode_offset(front, back, offset),
+                                                used_offset_words,
+                                                title)
+
+    @staticmethod
+    def apply_episode_offset(offset_rule, used_offset_words, title):
+        """
+        按預編譯的集數偏移規則處理標題
+        """
         msg = ""
+        front, back, offset, back_re, front_re, offset_word_info_re, offset_code = offset_rule
         try:
-            if back and not re.findall(r'%s' % back, title):
-                return title, msg
-            if front and not re.findall(r'%s' % front, title):
-                return title, msg
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9]+(?=.*?%s)' % (front, back))
-            episode_nums_str = re.findall(offset_word_info_re, title)
+            if back_re is not None:
+                if isinstance(back_re, Exception):
+                    raise back_re
+                if not back_re.search(title):
+                    return title, msg
+            if front_re is not None:
+                if isinstance(front_re, Exception):
+                    raise front_re
+                if not front_re.search(title):
+                    return title, msg
+            if isinstance(offset_word_info_re, Exception):
+                raise offset_word_info_re
+            episode_nums_str = offset_word_info_re.findall(title)
             if not episode_nums_str:
                 return title, msg
             offset_word = "%s@%s@%s" % (front, back, offset)
@@ -132,8 +246,9 @@ class WordsHelper:
             offset_flag = False
             for episode_num_str in episode_nums_str:
                 episode_num_int = int(episode_num_str)
-                EP = episode_num_int
-                episode_num_offset_int = eval(offset)
+                if isinstance(offset_code, Exception):
+                    raise offset_code
+                episode_num_offset_int = eval(offset_code, {}, {"EP": episode_num_int})
                 # 向前偏移
                 if episode_num_int > episode_num_offset_int:
                     offset_flag = True
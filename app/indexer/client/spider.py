@@ -9,7 +9,7 @@ from pyquery import PyQuery
 
 import feapder
 import log
-from app.utils import StringUtils, SystemUtils
+from app.utils import StringUtils, SystemUtils, SessionPool
 from app.utils.exception_utils import ExceptionUtils
 from config import Config, DEFAULT_UA, WEBDRIVER_PATH
 from feapder.utils.tools import urlencode
@@ -136,6 +136,8 @@ class TorrentSpider(feapder.AirSpider):
                               render=self.render)
 
     def download_midware(self, request):
+        # 與其它訪問站點的請求共用限速
+        SessionPool().acquire(SessionPool().get_domain(request.url))
         request.headers = {
             "User-Agent": self.ua,
             "Cookie": self.cookie
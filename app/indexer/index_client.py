@@ -1,5 +1,4 @@
 import datetime
-import xml.dom.minidom
 from abc import ABCMeta, abstractmethod
 
 import log
@@ -107,33 +106,30 @@ class IIndexClient(metaclass=ABCMeta):
 
         torrents = []
         try:
-            # 解析XML
-            dom_tree = xml.dom.minidom.parseString(xmls)
-            root_node = dom_tree.documentElement
-            items = root_node.getElementsByTagName("item")
-            for item in items:
+            # 增量解析XML
+            for item in DomUtils.iter_items(xmls):
                 try:
                     # indexer id
-                    indexer_id = DomUtils.tag_value(item, "jackettindexer", "id",
-                                                    default=DomUtils.tag_value(item, "prowlarrindexer", "id", ""))
+                    indexer_id = DomUtils.item_value(item, "jackettindexer", "id",
+                                                     default=DomUtils.item_value(item, "prowlarrindexer", "id", ""))
                     # indexer
-                    indexer = DomUtils.tag_value(item, "jackettindexer",
-                                                 default=DomUtils.tag_value(item, "prowlarrindexer", default=""))
+                    indexer = DomUtils.item_value(item, "jackettindexer",
+                                                  default=DomUtils.item_value(item, "prowlarrindexer", default=""))
 
                     # 標題
-                    title = DomUtils.tag_value(item, "title", default="")
+                    title = DomUtils.item_value(item, "title", default="")
                     if not title:
                         continue
                     # 種子連結
-                    enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+                    enclosure = DomUtils.item_value(item, "enclosure", "url", default="")
                     if not enclosure:
                         continue
                     # 描述
-                    description = DomUtils.tag_value(item, "description", default="")
+                    description = DomUtils.item_value(item, "description", default="")
                     # 種子大小
-                    size = DomUtils.tag_value(item, "size", default=0)
+                    size = DomUtils.item_value(item, "size", default=0)
                     # 種子頁面
-                    page_url = DomUtils.tag_value(item, "comments", default="")
+                    page_url = DomUtils.item_value(item, "comments", default="")
 
                     # 做種數
                     seeders = 0
@@ -148,10 +144,10 @@ class IIndexClient(metaclass=ABCMeta):
                     # imdbid
                     imdbid = ""
 
-                    torznab_attrs = item.getElementsByTagName("torznab:attr")
-                    for torznab_attr in torznab_attrs:
-                        name = torznab_attr.getAttribute('name')
-                        value = torznab_attr.getAttribute('value')
+                    torznab_attrs = item.get("torznab:attr") or []
+                    for _, torznab_attr in torznab_attrs:
+                        name = torznab_attr.get('name', '')
+                        value = torznab_attr.get('value', '')
                         if name == "seeders":
                             seeders = value
                         if name == "peers":
@@ -202,6 +198,8 @@ class IIndexClient(metaclass=ABCMeta):
         index_rule_fail = 0
         index_match_fail = 0
         index_error = 0
+        # 透過初步過濾的種子
+        torrents = []
         for item in result_array:
             # 這此站標題和副標題相反
             if indexer.id in self._reverse_title_sites:
@@ -259,6 +257,7 @@ class IIndexClient(metaclass=ABCMeta):
                 index_rule_fail += 1
                 continue
             # 識別媒體資訊
+            media_info = None
             if not match_media:
                 # 不過濾
                 media_info = meta_info
@@ -275,33 +274,57 @@ class IIndexClient(metaclass=ABCMeta):
                     if match_media and str(cache_info.get("id")) == str(match_media.tmdb_id):
                         # 快取匹配，合併媒體資料
                         media_info = self.media.merge_media_info(meta_info, match_media)
-                    else:
-                        # 重新識別
-                        media_info = self.media.get_media_info(title=torrent_name, subtitle=description, chinese=False)
-                        if not media_info:
-                            log.warn(f"【{self.index_type}】{torrent_name} 識別媒體資訊出錯！")
-                            index_error += 1
-                            continue
-                        elif not media_info.tmdb_info:
-                            log.info(f"【{self.index_type}】{torrent_name} 識別為 {media_info.get_name()} 未匹配到媒體資訊")
-                            index_match_fail += 1
-                            continue
-                        # TMDBID是否匹配
-                        if str(media_info.tmdb_id) != str(match_media.tmdb_id):
-                            log.info(
-                                f"【{self.index_type}】{torrent_name} 識別為 {media_info.type.value} {media_info.get_title_string()} 不匹配")
-                            index_match_fail += 1
-                            continue
-                        # 合併媒體資料
-                        media_info = self.media.merge_media_info(media_info, match_media)
-                # 過濾型別
-                if filter_args.get("type"):
-                    if filter_args.get("type") == MediaType.TV and media_info.type == MediaType.MOVIE \
-                            or filter_args.get("type") == MediaType.MOVIE and media_info.type == MediaType.TV:
-                        log.info(
-                            f"【{self.index_type}】{torrent_name} 是 {media_info.type.value}，不是 {filter_args.get('type').value}")
-                        index_rule_fail += 1
-                        continue
+            torrents.append({
+                "torrent_name": torrent_name,
+                "description": description,
+                "enclosure": enclosure,
+                "size": size,
+                "seeders": seeders,
+                "peers": peers,
+                "page_url": page_url,
+                "uploadvolumefactor": uploadvolumefactor,
+                "downloadvolumefactor": downloadvolumefactor,
+                "res_order": res_order,
+                "media_info": media_info
+            })
+        # 需要重新識別的種子，批次檢索TMDB
+        search_torrents = [torrent for torrent in torrents if not torrent.get("media_info")]
+        if search_torrents:
+            media_infos = self.media.get_media_infos_batch(
+                [(torrent.get("torrent_name"), torrent.get("description")) for torrent in search_torrents],
+                chinese=False)
+            for torrent, media_info in zip(search_torrents, media_infos):
+                torrent_name = torrent.get("torrent_name")
+                if not media_info:
+                    log.warn(f"【{self.index_type}】{torrent_name} 識別媒體資訊出錯！")
+                    index_error += 1
+                    continue
+                elif not media_info.tmdb_info:
+                    log.info(f"【{self.index_type}】{torrent_name} 識別為 {media_info.get_name()} 未匹配到媒體資訊")
+                    index_match_fail += 1
+                    continue
+                # TMDBID是否匹配
+                if str(media_info.tmdb_id) != str(match_media.tmdb_id):
+                    log.info(
+                        f"【{self.index_type}】{torrent_name} 識別為 {media_info.type.value} {media_info.get_title_string()} 不匹配")
+                    index_match_fail += 1
+                    continue
+                # 合併媒體資料
+                torrent["media_info"] = self.media.merge_media_info(media_info, match_media)
+        for torrent in torrents:
+            media_info = torrent.get("media_info")
+            if not media_info:
+                continue
+            torrent_name = torrent.get("torrent_name")
+            description = torrent.get("description")
+            # 過濾型別
+            if match_media and filter_args.get("type"):
+                if filter_args.get("type") == MediaType.TV and media_info.type == MediaType.MOVIE \
+                        or filter_args.get("type") == MediaType.MOVIE and media_info.type == MediaType.TV:
+                    log.info(
+                        f"【{self.index_type}】{torrent_name} 是 {media_info.type.value}，不是 {filter_args.get('type').value}")
+                    index_rule_fail += 1
+                    continue
             # 檢查標題是否匹配季、集、年
             if not self.filter.is_torrent_match_sey(media_info,
                                                     filter_args.get("season"),
@@ -317,15 +340,15 @@ class IIndexClient(metaclass=ABCMeta):
                 f"【{self.index_type}】{torrent_name} {description} 識別為 {media_info.get_title_string()} {media_info.get_season_episode_string()} 匹配成功")
             media_info.set_torrent_info(site=indexer.name,
                                         site_order=order_seq,
-                                        enclosure=enclosure,
-                                        res_order=res_order,
-                                        size=size,
-                                        seeders=seeders,
-                                        peers=peers,
+                                        enclosure=torrent.get("enclosure"),
+                                        res_order=torrent.get("res_order"),
+                                        size=torrent.get("size"),
+                                        seeders=torrent.get("seeders"),
+                                        peers=torrent.get("peers"),
                                         description=description,
-                                        page_url=page_url,
-                                        upload_volume_factor=uploadvolumefactor,
-                                        download_volume_factor=downloadvolumefactor)
+                                        page_url=torrent.get("page_url"),
+                                        upload_volume_factor=torrent.get("uploadvolumefactor"),
+                                        download_volume_factor=torrent.get("downloadvolumefactor"))
             if media_info not in ret_array:
                 index_sucess += 1
                 ret_array.append(media_info)
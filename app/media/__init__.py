@@ -1,4 +1,4 @@
-from .meta.metainfo import MetaInfo
+from .meta.metainfo import MetaInfo, MetaInfoCache
 from .meta.metabase import MetaBase
 from .category import Category
 from .media import Media
@@ -3,6 +3,7 @@ import os
 import random
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 
 import zhconv
@@ -18,7 +19,8 @@ from app.utils import cacheman
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import MediaType, MatchMode
 from config import Config, KEYWORD_BLACKLIST, KEYWORD_SEARCH_WEIGHT_3, KEYWORD_SEARCH_WEIGHT_2, KEYWORD_SEARCH_WEIGHT_1, \
-    KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD, TMDB_IMAGE_ORIGINAL_URL, DEFAULT_TMDB_PROXY
+    KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD, TMDB_IMAGE_ORIGINAL_URL, DEFAULT_TMDB_PROXY, \
+    MEDIA_BATCH_THREADS
 
 
 class Media:
@@ -647,6 +649,90 @@ class Media:
         if mtype:
             meta_info.type = mtype
         media_key = self.__make_cache_key(meta_info)
+        file_media_info = self.__search_media_info(meta_info=meta_info,
+                                                   media_key=media_key,
+                                                   strict=strict,
+                                                   cache=cache,
+                                                   chinese=chinese)
+        # 賦值TMDB資訊並返回
+        meta_info.set_tmdb_info(file_media_info)
+        return meta_info
+
+    def get_media_infos_batch(self, titles,
+                              mtype=None,
+                              strict=None,
+                              cache=True,
+                              chinese=True):
+        """
+        批次識別種子名稱並搜刮TMDB資訊，識別結果快取key相同的只查詢一次TMDB，不同的key並行查詢
+        :param titles: 種子名稱列表，元素為名稱或（名稱, 副標題）
+        :param mtype: 型別：電影、電視劇、動漫
+        :param strict: 是否嚴格模式，為true時，不會再去掉年份再查一次
+        :param cache: 是否使用快取，預設TRUE
+        :param chinese: 原標題為英文時是否從別名中檢索中文名稱
+        :return: 與titles順序一致的帶有TMDB資訊的MetaInfo物件列表，無法識別的為None
+        """
+        if not titles:
+            return []
+        if not self.tmdb:
+            log.error("【Meta】TMDB API Key 未設定！")
+            return [None] * len(titles)
+        meta_infos = []
+        # 快取key -> 識別結果相同的種子下標
+        key_indexes = {}
+        for index, title in enumerate(titles):
+            if isinstance(title, (tuple, list)):
+                title, subtitle = title
+            else:
+                subtitle = None
+            if not title:
+                meta_infos.append(None)
+                continue
+            meta_info = MetaInfo(title, subtitle=subtitle)
+            if not meta_info.get_name() or not meta_info.type:
+                log.warn("【Rmt】%s 未識別出有效資訊！" % meta_info.org_string)
+                meta_infos.append(None)
+                continue
+            if mtype:
+                meta_info.type = mtype
+            meta_infos.append(meta_info)
+            key_indexes.setdefault(self.__make_cache_key(meta_info), []).append(index)
+        if not key_indexes:
+            return meta_infos
+        # 每個key只查詢一次TMDB
+        executor = ThreadPoolExecutor(max_workers=min(len(key_indexes), MEDIA_BATCH_THREADS))
+        all_task = {}
+        for media_key, indexes in key_indexes.items():
+            task = executor.submit(self.__search_media_info,
+                                   meta_infos[indexes[0]],
+                                   media_key,
+                                   strict,
+                                   cache,
+                                   chinese)
+            all_task[task] = media_key
+        for future in as_completed(all_task):
+            media_key = all_task.get(future)
+            try:
+                file_media_info = future.result()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                file_media_info = None
+            # 結果分發給所有相同key的種子
+            for index in key_indexes.get(media_key):
+                meta_infos[index].set_tmdb_info(file_media_info)
+        executor.shutdown()
+        return meta_infos
+
+    def __search_media_info(self, meta_info, media_key, strict=None, cache=True, chinese=True):
+        """
+        按識別出的名稱年份型別查詢快取或搜刮TMDB資訊
+        :param meta_info: 識別出的種子資訊
+        :param media_key: 快取key
+        :param strict: 是否嚴格模式，為true時，不會再去掉年份再查一次
+        :param cache: 是否使用快取
+        :param chinese: 原標題為英文時是否從別名中檢索中文名稱
+        :return: TMDB資訊
+        """
         if not cache or not self.meta.get_meta_data_by_key(media_key):
             # 快取沒有或者強制不使用快取
             if meta_info.type != MediaType.TV and not meta_info.year:
@@ -713,9 +799,7 @@ class Media:
                                                      chinese=chinese)
             else:
                 file_media_info = None
-        # 賦值TMDB資訊並返回
-        meta_info.set_tmdb_info(file_media_info)
-        return meta_info
+        return file_media_info
 
     def __insert_media_cache(self, media_key, file_media_info):
         """
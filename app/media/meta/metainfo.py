@@ -1,12 +1,103 @@
+import copy
 import os.path
+from collections import OrderedDict
+from threading import Lock
+
 import regex as re
 
 import log
 from app.helper import WordsHelper
+from app.media.fanart import Fanart
 from app.media.meta.metaanime import MetaAnime
 from app.media.meta.metavideo import MetaVideo
+from app.utils.commons import singleton
 from app.utils.types import MediaType
-from config import RMT_MEDIAEXT
+from config import Config, RMT_MEDIAEXT, META_INFO_CACHE_SIZE
+
+lock = Lock()
+
+
+@singleton
+class MetaInfoCache(object):
+    """
+    名稱識別結果的LRU快取，自定義識別詞或製作組變化時整體失效
+    """
+    _cache = OrderedDict()
+    _version = None
+    _hits = 0
+    _misses = 0
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._version = None
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def __get_version():
+        """
+        當前識別規則版本：自定義識別詞版本 + 自定義製作組
+        """
+        return WordsHelper().get_version(), (Config().get_config('laboratory') or {}).get('release_groups')
+
+    @staticmethod
+    def __copy(meta_info):
+        """
+        淺複製識別結果，可變的列表和字典單獨複製，避免呼叫方修改影響快取
+        """
+        meta_copy = copy.copy(meta_info)
+        for key, value in meta_copy.__dict__.items():
+            if isinstance(value, (list, dict)):
+                setattr(meta_copy, key, copy.copy(value))
+        # Fanart例項儲存了查詢到的圖片，每個副本單獨使用
+        meta_copy.fanart = Fanart()
+        return meta_copy
+
+    def get(self, key):
+        """
+        查詢快取，返回識別結果的副本，未命中返回None
+        """
+        version = self.__get_version()
+        with lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            meta_info = self._cache.get(key)
+            if meta_info is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+        return self.__copy(meta_info)
+
+    def set(self, key, meta_info):
+        """
+        儲存識別結果的副本，超出容量時淘汰最久未使用的
+        """
+        meta_copy = self.__copy(meta_info)
+        with lock:
+            self._cache[key] = meta_copy
+            self._cache.move_to_end(key)
+            while len(self._cache) > META_INFO_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with lock:
+            self._cache.clear()
+
+    def get_stats(self):
+        """
+        快取統計
+        """
+        with lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "max_size": META_INFO_CACHE_SIZE,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits * 100 / total, 1) if total else 0
+            }
 
 
 def MetaInfo(title, subtitle=None, mtype=None):
@@ -17,7 +108,18 @@ def MetaInfo(title, subtitle=None, mtype=None):
     :param mtype: 指定識別型別，為空則自動識別型別
     :return: MetaAnime、MetaVideo
     """
+    cache_key = (title, subtitle, mtype)
+    meta_info = MetaInfoCache().get(cache_key)
+    if meta_info is None:
+        meta_info = _parse_meta_info(title, subtitle, mtype)
+        MetaInfoCache().set(cache_key, meta_info)
+    return meta_info
+
 
+def _parse_meta_info(title, subtitle=None, mtype=None):
+    """
+    識別名稱，不使用快取
+    """
     # 應用自定義識別詞
     if subtitle and title not in subtitle:
         name = f'{title}@@@{subtitle}'
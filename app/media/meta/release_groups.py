@@ -1,4 +1,6 @@
 import re
+from functools import lru_cache
+
 from config import Config
 
 
@@ -72,20 +74,36 @@ class ReleaseGroupsMatcher(object):
 
     def __init__(self):
         self.__config = Config()
+        custom_release_groups = (self.__config.get_config('laboratory') or {}).get('release_groups')
+        self.__release_groups = self.__build_release_groups(custom_release_groups)
+
+    @classmethod
+    @lru_cache(maxsize=8)
+    def __build_release_groups(cls, custom_release_groups):
+        """
+        合併內建和自定義製作組為一個正則片段，自定義製作組不變時直接使用快取
+        """
         release_groups = []
-        for site_groups in self.RELEASE_GROUPS.values():
+        for site_groups in cls.RELEASE_GROUPS.values():
             for release_group in site_groups:
                 release_groups.append(release_group)
-        custom_release_groups = (self.__config.get_config('laboratory') or {}).get('release_groups')
         if custom_release_groups:
             if custom_release_groups.startswith(';'):
                 custom_release_groups = custom_release_groups[1:]
             if custom_release_groups.endswith(';'):
                 custom_release_groups = custom_release_groups[:-1]
             custom_release_groups = custom_release_groups.replace(";", "|")
-            self.__release_groups = f"{'|'.join(release_groups)}|{custom_release_groups}"
+            return f"{'|'.join(release_groups)}|{custom_release_groups}"
         else:
-            self.__release_groups = '|'.join(release_groups)
+            return '|'.join(release_groups)
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def __compile_groups(groups):
+        """
+        編譯製作組正則，所有製作組合並為一個多選分支，一次掃描完成匹配
+        """
+        return re.compile(r"(?<=[-@\[￡【])(?:%s)(?=[@.\s\]\[】])" % groups, re.I)
 
     def match(self, title=None, groups=None):
         """
@@ -98,5 +116,5 @@ class ReleaseGroupsMatcher(object):
         if not groups:
             groups = self.__release_groups
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【])(?:%s)(?=[@.\s\]\[】])" % groups, re.I)
-        return '@'.join(re.findall(groups_re, title))
+        groups_re = self.__compile_groups(groups)
+        return '@'.join(groups_re.findall(title))
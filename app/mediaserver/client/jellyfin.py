@@ -1,9 +1,10 @@
+import datetime
 import re
 
 import log
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import MediaServerType
-from config import Config
+from config import Config, MEDIASYNC_PAGE_SIZE
 from app.mediaserver.media_client import IMediaClient
 from app.utils.commons import singleton
 from app.utils import RequestUtils, SystemUtils
@@ -374,38 +375,45 @@ class Jellyfin(IMediaClient):
             ExceptionUtils.exception_traceback(e)
             return {}
 
-    def get_items(self, parent):
+    def get_items(self, parent, since=None):
         """
-        獲取媒體伺服器所有媒體庫列表
+        分頁獲取媒體庫中的電影和電視劇，一次請求返回一頁媒體及所需欄位
+        :param parent: 媒體庫ID
+        :param since: 只返回該時間（時間戳）之後有更新的媒體
+        :raises: 某一頁讀取失敗時丟擲異常，已返回的媒體不完整
         """
         if not parent:
-            yield {}
+            return
         if not self._host or not self._apikey:
-            yield {}
-        req_url = "%sUsers/%s/Items?parentId=%s&api_key=%s" % (self._host, self._user, parent, self._apikey)
+            return
+        req_url = "%sUsers/%s/Items?parentId=%s&recursive=true&includeItemTypes=Movie,Series" \
+                  "&fields=ProviderIds,OriginalTitle,ProductionYear,Path,ParentId&limit=%s&api_key=%s" % (self._host, self._user, parent, MEDIASYNC_PAGE_SIZE, self._apikey)
+        if since:
+            req_url += "&minDateLastSaved=%s" % datetime.datetime.utcfromtimestamp(since).strftime("%Y-%m-%dT%H:%M:%SZ")
+        start_index = 0
         try:
-            res = RequestUtils().get_res(req_url)
-            if res and res.status_code == 200:
+            while True:
+                res = RequestUtils().get_res("%s&startIndex=%s" % (req_url, start_index))
+                if not res or res.status_code != 200:
+                    raise IOError("Users/Items 未獲取到返回資料")
                 results = res.json().get("Items") or []
                 for result in results:
                     if not result:
                         continue
-                    if result.get("Type") in ["Movie", "Series"]:
-                        item_info = self.get_iteminfo(result.get("Id"))
-                        yield {"id": result.get("Id"),
-                               "library": item_info.get("ParentId"),
-                               "type": item_info.get("Type"),
-                               "title": item_info.get("Name"),
-                               "originalTitle": item_info.get("OriginalTitle"),
-                               "year": item_info.get("ProductionYear"),
-                               "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
-                               "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
-                               "path": item_info.get("Path"),
-                               "json": str(item_info)}
-                    elif "Folder" in result.get("Type"):
-                        for item in self.get_items(result.get("Id")):
-                            yield item
+                    yield {"id": result.get("Id"),
+                           "library": result.get("ParentId"),
+                           "type": result.get("Type"),
+                           "title": result.get("Name"),
+                           "originalTitle": result.get("OriginalTitle"),
+                           "year": result.get("ProductionYear"),
+                           "tmdbid": (result.get("ProviderIds") or {}).get("Tmdb"),
+                           "imdbid": (result.get("ProviderIds") or {}).get("Imdb"),
+                           "path": result.get("Path"),
+                           "json": str(result)}
+                if len(results) < MEDIASYNC_PAGE_SIZE:
+                    break
+                start_index += len(results)
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             log.error(f"【{self.server_type}】連線Users/Items出錯：" + str(e))
-        yield {}
+            raise
@@ -1,9 +1,11 @@
+import datetime
+
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import MediaServerType
 from plexapi.myplex import MyPlexAccount
 
 import log
-from config import Config
+from config import Config, MEDIASYNC_PAGE_SIZE
 from app.mediaserver.media_client import IMediaClient
 from app.utils.commons import singleton
 from plexapi.server import PlexServer
@@ -177,26 +179,33 @@ class Plex(IMediaClient):
             libraries.append({"id": library.key, "name": library.title})
         return libraries
 
-    def get_items(self, parent):
+    def get_items(self, parent, since=None):
         """
-        獲取媒體伺服器所有媒體庫列表
+        獲取媒體庫中的所有媒體，按頁從伺服器讀取
+        :param parent: 媒體庫ID
+        :param since: 只返回該時間（時間戳）之後有更新的媒體
+        :raises: 讀取失敗時丟擲異常，已返回的媒體不完整
         """
-        if not parent:
-            yield {}
-        if not self._plex:
-            yield {}
+        if not parent or not self._plex:
+            return
         try:
             section = self._plex.library.sectionByID(parent)
-            if section:
-                for item in section.all():
-                    if not item:
-                        continue
-                    yield {"id": item.key,
-                           "library": item.librarySectionID,
-                           "type": item.type,
-                           "title": item.title,
-                           "year": item.year,
-                           "json": str(item.__dict__)}
+            if not section:
+                return
+            if since:
+                items = section.search(filters={"updatedAt>>": datetime.datetime.fromtimestamp(since)},
+                                       container_size=MEDIASYNC_PAGE_SIZE)
+            else:
+                items = section.all(container_size=MEDIASYNC_PAGE_SIZE)
+            for item in items:
+                if not item:
+                    continue
+                yield {"id": item.key,
+                       "library": item.librarySectionID,
+                       "type": item.type,
+                       "title": item.title,
+                       "year": item.year,
+                       "json": str(item.__dict__)}
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
-        yield {}
+            raise
@@ -86,9 +86,11 @@ class IMediaClient(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def get_items(self, parent):
+    def get_items(self, parent, since=None):
         """
         獲取媒體庫中的所有媒體
         :param parent: 上一級的ID
+        :param since: 只返回該時間（時間戳）之後有更新的媒體
+        :raises: 讀取失敗時丟擲異常，由呼叫方判斷同步不完整
         """
         pass
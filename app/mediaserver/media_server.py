@@ -1,14 +1,17 @@
 import threading
+import time
 
 import log
 from app.db import MediaDb
 from app.helper import ProgressHelper
 from app.utils.types import MediaServerType
-from config import Config
+from config import Config, MEDIASYNC_PAGE_SIZE, MEDIASYNC_FULL_INTERVAL
 from app.mediaserver.client import Emby, Jellyfin, Plex
 
 lock = threading.Lock()
 server_lock = threading.Lock()
+# 各媒體伺服器上次同步的開始時間及上次全量同步的開始時間
+_sync_times = {}
 
 
 class MediaServer:
@@ -141,61 +144,105 @@ class MediaServer:
             return []
         return self.server.get_libraries()
 
-    def get_items(self, parent):
+    def get_items(self, parent, since=None):
         """
         獲取媒體庫中的所有媒體
         :param parent: 上一級的ID
+        :param since: 只返回該時間（時間戳）之後有更新的媒體
         """
         if not self.server:
             return []
-        return self.server.get_items(parent)
+        return self.server.get_items(parent, since=since)
 
     def sync_mediaserver(self):
         """
-        同步媒體庫所有資料到本地資料庫
+        同步媒體庫資料到本地資料庫：超過全量同步間隔時同步所有媒體並清理已刪除的，否則只同步有更新的媒體
         """
         if not self.server:
             return
         with lock:
+            server_type = self._server_type.value
+            start_time = time.time()
+            last_sync = _sync_times.get(server_type)
+            if last_sync and start_time - last_sync[1] < MEDIASYNC_FULL_INTERVAL * 3600:
+                # 向前多取一段時間，容忍與媒體伺服器的時間誤差
+                since = last_sync[0] - 600
+            else:
+                since = None
             # 開始進度條
-            log.info("【MEDIASERVER】開始同步媒體庫資料...")
+            log.info("【MEDIASERVER】開始%s同步媒體庫資料..." % ("增量" if since else "全量"))
             self.progress.start("mediasync")
             self.progress.update(ptype="mediasync", text="請稍候...")
             # 彙總統計
-            medias_count = self.get_medias_count()
-            total_media_count = medias_count.get("MovieCount") + medias_count.get("SeriesCount")
-            total_count = 0
-            movie_count = 0
-            tv_count = 0
-            # 清空登記薄
-            self.mediadb.empty()
+            if since:
+                total_media_count = 0
+            else:
+                medias_count = self.get_medias_count() or {}
+                total_media_count = (medias_count.get("MovieCount") or 0) + (medias_count.get("SeriesCount") or 0)
+            sync_count = 0
+            item_ids = set()
+            # 是否讀取到了全部媒體
+            complete = True
             for library in self.get_libraries():
-                # 獲取媒體庫所有專案
+                # 分頁獲取媒體庫專案，按批寫入
                 self.progress.update(ptype="mediasync",
                                      text="正在獲取 %s 資料..." % (library.get("name")))
-                for item in self.get_items(library.get("id")):
-                    if not item:
-                        continue
-                    if self.mediadb.insert(self._server_type.value, item):
-                        total_count += 1
-                        if item.get("type") in ['Movie', 'movie']:
-                            movie_count += 1
-                        elif item.get("type") in ['Series', 'show']:
-                            tv_count += 1
-                        self.progress.update(ptype="mediasync",
-                                             text="正在同步 %s，已完成：%s / %s ..." % (library.get("name"), total_count, total_media_count),
-                                             value=round(100 * total_count/total_media_count, 1))
+                items = []
+                try:
+                    for item in self.get_items(library.get("id"), since=since):
+                        if not item:
+                            continue
+                        items.append(item)
+                        if len(items) >= MEDIASYNC_PAGE_SIZE:
+                            sync_count += self.__save_items(items, item_ids)
+                            items = []
+                            self.progress.update(ptype="mediasync",
+                                                 text="正在同步 %s，已完成：%s / %s ..." % (
+                                                     library.get("name"), sync_count, total_media_count or "-"),
+                                                 value=round(100 * sync_count / total_media_count, 1)
+                                                 if total_media_count else 0)
+                except Exception as err:
+                    complete = False
+                    log.error("【MEDIASERVER】%s 資料讀取不完整：%s" % (library.get("name"), str(err)))
+                sync_count += self.__save_items(items, item_ids)
+            if not complete:
+                # 讀取不完整時不清理媒體，也不更新同步時間，下次重新同步這段時間的更新
+                log.warn("【MEDIASERVER】媒體庫資料讀取不完整，本次不清理已刪除的媒體")
+            elif since:
+                _sync_times[server_type] = (start_time, last_sync[1])
+            else:
+                # 清理媒體伺服器中已刪除的媒體及其它媒體伺服器的資料
+                self.mediadb.delete_items(server_type, set(self.mediadb.get_item_ids(server_type)) - item_ids)
+                for other_type in MediaServerType:
+                    if other_type != self._server_type:
+                        self.mediadb.empty(server_type=other_type.value)
+                _sync_times[server_type] = (start_time, start_time)
             # 更新總體同步情況
-            self.mediadb.statistics(server_type=self._server_type.value,
-                                    total_count=total_count,
+            items_count = self.mediadb.get_items_count(server_type)
+            movie_count = items_count.get('Movie', 0) + items_count.get('movie', 0)
+            tv_count = items_count.get('Series', 0) + items_count.get('show', 0)
+            self.mediadb.statistics(server_type=server_type,
+                                    total_count=movie_count + tv_count,
                                     movie_count=movie_count,
                                     tv_count=tv_count)
             # 結束進度條
             self.progress.update(ptype="mediasync",
                                  value=100,
-                                 text="媒體庫資料同步完成，同步數量：%s" % total_count)
+                                 text="媒體庫資料同步完成，同步數量：%s" % sync_count)
             self.progress.end("mediasync")
-            log.info("【MEDIASERVER】媒體庫資料同步完成，同步數量：%s" % total_count)
+            log.info("【MEDIASERVER】媒體庫資料同步完成，同步數量：%s，耗時：%s 秒" % (
+                sync_count, round(time.time() - start_time, 1)))
+
+    def __save_items(self, items, item_ids):
+        """
+        批次寫入一批媒體，返回寫入的數量
+        """
+        if not items:
+            return 0
+        item_ids.update([item.get("id") for item in items])
+        if self.mediadb.upsert_items(self._server_type.value, items):
+            return len(items)
+        return 0
 
     def check_item_exists(self, title, year=None, tmdbid=None):
         """
@@ -203,6 +250,27 @@ class MediaServer:
         """
         return self.mediadb.exists(server_type=self._server_type.value, title=title, year=year, tmdbid=tmdbid)
 
+    def check_items_exists(self, items):
+        """
+        批次檢查媒體庫是否已存在，規則同check_item_exists，只查詢一次資料庫
+        :param items: (標題, 年份, TMDBID)列表
+        :return: 與items對應的是否存在列表
+        """
+        if not items:
+            return []
+        title_years, titles, tmdbids = self.mediadb.get_exists_items(server_type=self._server_type.value,
+                                                                     titles=[item[0] for item in items],
+                                                                     tmdbids=[item[2] for item in items])
+        ret_list = []
+        for title, year, tmdbid in items:
+            if not title:
+                ret_list.append(False)
+            elif year:
+                ret_list.append((title, str(year)) in title_years or (bool(tmdbid) and str(tmdbid) in tmdbids))
+            else:
+                ret_list.append(title in titles or (bool(tmdbid) and str(tmdbid) in tmdbids))
+        return ret_list
+
     def get_mediasync_status(self):
         """
         獲取當前媒體庫同步狀態
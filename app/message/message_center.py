@@ -2,6 +2,7 @@ import datetime
 import time
 from collections import deque
 
+from app.utils import EventBus
 from app.utils.commons import singleton
 
 
@@ -35,10 +36,12 @@ class MessageCenter:
         """
         將訊息增加到佇列
         """
-        self._message_queue.appendleft({"level": level,
-                                        "title": title,
-                                        "content": content,
-                                        "time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))})
+        message = {"level": level,
+                   "title": title,
+                   "content": content,
+                   "time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))}
+        self._message_queue.appendleft(message)
+        EventBus().publish("message", message)
 
     def get_system_messages(self, num=20, lst_time=None):
         """
@@ -1,6 +1,10 @@
+import hashlib
+import json
+import math
 import re
+import time
 import traceback
-import xml.dom.minidom
+from concurrent.futures import ThreadPoolExecutor, wait
 from threading import Lock
 
 import log
@@ -14,12 +18,17 @@ from app.utils import DomUtils, RequestUtils, StringUtils
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.rsstitle_utils import RssTitleUtils
 from app.utils.types import MediaType, SearchType
+from config import Config, RSS_FETCH_THREADS, RSS_FETCH_TIMEOUT
 
 lock = Lock()
 
 
 class Rss:
     _sites = []
+    # RSS地址對應的ETag、Last-Modified，用於條件請求
+    _rss_validators = {}
+    # 上次RSS時的訂閱特徵，訂閱變化時需重新處理全部RSS
+    _rss_subscribe_sign = None
     filter = None
     media = None
     downloader = None
@@ -38,6 +47,8 @@ class Rss:
 
     def init_config(self):
         self._sites = self.sites.get_sites(rss=True)
+        self._rss_validators = {}
+        self._rss_subscribe_sign = None
 
     def rssdownload(self):
         """
@@ -87,9 +98,14 @@ class Rss:
             else:
                 check_sites = list(set(check_sites))
 
-            # 程式碼站點配置優先順序的序號
-            rss_download_torrents = []
-            rss_no_exists = {}
+            # 訂閱或站點規則有變化時，未更新的RSS也需要重新匹配，清除條件請求快取
+            subscribe_sign = self.__get_subscribe_sign(rss_movies, rss_tvs)
+            if subscribe_sign != self._rss_subscribe_sign:
+                self._rss_validators = {}
+                self._rss_subscribe_sign = subscribe_sign
+
+            # 需要下載RSS的站點
+            rss_sites = []
             for site_info in self._sites:
                 if not site_info:
                     continue
@@ -99,31 +115,57 @@ class Rss:
                 if check_sites and site_name not in check_sites:
                     continue
                 # 站點rss連結
-                rss_url = site_info.get("rssurl")
-                if not rss_url:
+                if not site_info.get("rssurl"):
                     log.info(f"【Rss】{site_name} 未配置rssurl，跳過...")
                     continue
+                rss_sites.append(site_info)
+
+            # 並行下載所有站點的RSS，全部完成後再開始匹配
+            rss_site_articles, rss_site_validators = self.__fetch_sites_rssxml(rss_sites)
+            # 處理出錯的站點
+            rss_failed_sites = set()
+
+            # 構建本輪的訂閱索引
+            rss_index = RssSubscribeIndex(rss_movies=rss_movies, rss_tvs=rss_tvs)
+
+            # 程式碼站點配置優先順序的序號
+            rss_download_torrents = []
+            rss_no_exists = {}
+            for site_info in rss_sites:
+                # 站點名稱
+                site_name = site_info.get("name")
+                # RSS未更新
+                if site_name not in rss_site_articles:
+                    continue
                 site_cookie = site_info.get("cookie")
                 site_ua = site_info.get("ua")
                 # 是否解析種子詳情
                 site_parse = False if site_info.get("parse") == "N" else True
                 # 使用的規則
                 site_fliter_rule = site_info.get("rule")
-                # 開始下載RSS
+                # 開始處理RSS
                 log.info(f"【Rss】正在處理：{site_name}")
                 if site_info.get("pri"):
                     site_order = 100 - int(site_info.get("pri"))
                 else:
                     site_order = 0
-                rss_acticles = self.parse_rssxml(rss_url)
+                rss_acticles = rss_site_articles.get(site_name)
                 if not rss_acticles:
                     log.warn(f"【Rss】{site_name} 未下載到資料")
                     continue
                 else:
                     log.info(f"【Rss】{site_name} 獲取資料：{len(rss_acticles)}")
+                # 識別種子名稱，未命中快取的批次檢索TMDB
+                try:
+                    rss_medias = self.__recognize_rss_articles(rss_acticles)
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    log.error("【Rss】%s 識別RSS種子發生錯誤：%s" % (site_name, str(e)))
+                    rss_failed_sites.add(site_name)
+                    continue
                 # 處理RSS結果
                 res_num = 0
-                for article in rss_acticles:
+                for article, media_info in rss_medias:
                     try:
                         # 種子名
                         title = article.get('title')
@@ -137,26 +179,11 @@ class Rss:
                         size = article.get('size')
                         # 開始處理
                         log.info(f"【Rss】開始處理：{title}")
-                        # 檢查這個種子是不是下過了
-                        if self.dbhelper.is_torrent_rssd(enclosure):
-                            log.info(f"【Rss】{title} 已成功訂閱過")
+                        if not media_info:
+                            log.warn(f"【Rss】{title} 無法識別出媒體資訊！")
                             continue
-                        # 識別種子名稱，開始檢索TMDB
-                        media_info = MetaInfo(title=title, subtitle=description)
-                        cache_info = self.media.get_cache_info(media_info)
-                        if cache_info.get("id"):
-                            # 使用快取資訊
-                            media_info.tmdb_id = cache_info.get("id")
-                            media_info.type = cache_info.get("type")
-                            media_info.title = cache_info.get("title")
-                            media_info.year = cache_info.get("year")
-                        else:
-                            # 重新查詢TMDB
-                            media_info = self.media.get_media_info(title=title, subtitle=description)
-                            if not media_info:
-                                log.warn(f"【Rss】{title} 無法識別出媒體資訊！")
-                            elif not media_info.tmdb_info:
-                                log.info(f"【Rss】{title} 識別為 {media_info.get_name()} 未匹配到TMDB媒體資訊")
+                        elif not media_info.tmdb_id:
+                            log.info(f"【Rss】{title} 識別為 {media_info.get_name()} 未匹配到TMDB媒體資訊")
                         # 大小及種子頁面
                         media_info.set_torrent_info(size=size,
                                                     page_url=page_url,
@@ -171,7 +198,8 @@ class Rss:
                             site_filter_rule=site_fliter_rule,
                             site_cookie=site_cookie,
                             site_parse=site_parse,
-                            site_ua=site_ua)
+                            site_ua=site_ua,
+                            rss_index=rss_index)
                         for msg in match_msg:
                             log.info(f"【Rss】{msg}")
                         # 未匹配
@@ -269,6 +297,7 @@ class Rss:
                     except Exception as e:
                         ExceptionUtils.exception_traceback(e)
                         log.error("【Rss】處理RSS發生錯誤：%s - %s" % (str(e), traceback.format_exc()))
+                        rss_failed_sites.add(site_name)
                         continue
                 log.info("【Rss】%s 處理結束，匹配到 %s 個有效資源" % (site_name, res_num))
             log.info("【Rss】所有RSS處理結束，共 %s 個有效資源" % len(rss_download_torrents))
@@ -314,6 +343,148 @@ class Rss:
                 else:
                     log.info("【Rss】未下載到任何資源")
 
+            # 處理完成的站點才記錄條件請求資訊，出錯的站點下次重新處理
+            for site_name, (url, validators) in rss_site_validators.items():
+                if site_name in rss_failed_sites:
+                    continue
+                if validators:
+                    self._rss_validators[url] = validators
+                else:
+                    self._rss_validators.pop(url, None)
+
+    def __get_subscribe_sign(self, rss_movies, rss_tvs):
+        """
+        影響匹配的訂閱欄位及站點規則、解析設定的特徵，缺失集數等計數變化不影響
+        """
+        match_keys = ["name", "year", "season", "tmdbid", "rss_sites", "over_edition", "filter_restype",
+                      "filter_pix", "filter_team", "filter_rule", "fuzzy_match", "total_ep", "current_ep"]
+        sign = json.dumps({"movies": {rid: [info.get(key) for key in match_keys] for rid, info in rss_movies.items()},
+                           "tvs": {rid: [info.get(key) for key in match_keys] for rid, info in rss_tvs.items()},
+                           "sites": [(site.get("name"), site.get("rule"), site.get("parse"))
+                                     for site in self._sites if site]},
+                          sort_keys=True, default=str)
+        return hashlib.md5(sign.encode("utf-8")).hexdigest()
+
+    def __recognize_rss_articles(self, rss_acticles):
+        """
+        識別RSS中未處理過的種子，命中快取的直接使用快取資訊，其餘批次檢索TMDB
+        :param rss_acticles: RSS種子資訊列表
+        :return: (種子資訊, 媒體資訊)列表，無法識別的媒體資訊為None
+        """
+        rss_medias = []
+        # 需要檢索TMDB的種子在rss_medias中的下標
+        search_indexes = []
+        # 本次已識別的種子連結
+        enclosures = set()
+        for article in rss_acticles:
+            try:
+                title = article.get('title')
+                enclosure = article.get('enclosure')
+                # 檢查這個種子是不是下過了
+                if enclosure in enclosures or self.dbhelper.is_torrent_rssd(enclosure):
+                    log.info(f"【Rss】{title} 已成功訂閱過")
+                    continue
+                enclosures.add(enclosure)
+                media_info = MetaInfo(title=title, subtitle=article.get('description'))
+                cache_info = self.media.get_cache_info(media_info)
+                if cache_info.get("id"):
+                    # 使用快取資訊
+                    media_info.tmdb_id = cache_info.get("id")
+                    media_info.type = cache_info.get("type")
+                    media_info.title = cache_info.get("title")
+                    media_info.year = cache_info.get("year")
+                else:
+                    search_indexes.append(len(rss_medias))
+                rss_medias.append((article, media_info))
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Rss】識別RSS種子發生錯誤：%s - %s" % (str(e), traceback.format_exc()))
+        if search_indexes:
+            # 重新查詢TMDB
+            media_infos = self.media.get_media_infos_batch(
+                [(rss_medias[index][0].get('title'), rss_medias[index][0].get('description'))
+                 for index in search_indexes])
+            for index, media_info in zip(search_indexes, media_infos):
+                rss_medias[index] = (rss_medias[index][0], media_info)
+        return rss_medias
+
+    def __fetch_sites_rssxml(self, sites):
+        """
+        並行下載站點RSS，使用ETag/Last-Modified條件請求，未更新的RSS不再解析
+        :param sites: 需要下載RSS的站點列表
+        :return: 站點名稱及種子資訊列表的字典，未更新或下載失敗的站點不包含在內；
+                 站點名稱及(RSS地址, 新的驗證資訊)的字典，處理完成後再記錄
+        """
+        ret_articles = {}
+        ret_validators = {}
+        if not sites:
+            return ret_articles, ret_validators
+        log.info(f"【Rss】開始並行下載 {len(sites)} 個站點的RSS...")
+        start_time = time.time()
+        max_workers = min(len(sites), RSS_FETCH_THREADS)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        all_task = {}
+        for site_info in sites:
+            task = executor.submit(self.__fetch_site_rssxml,
+                                   site_info.get("rssurl"),
+                                   site_info.get("ua"))
+            all_task[task] = site_info
+        # 單個站點超時由請求控制，此處為整體兜底：排隊的站點按執行緒數分批計算，另留一輪餘量
+        done, not_done = wait(all_task, timeout=(math.ceil(len(sites) / max_workers) + 1) * RSS_FETCH_TIMEOUT)
+        executor.shutdown(wait=False)
+        for future in not_done:
+            future.cancel()
+            log.warn(f"【Rss】{all_task.get(future).get('name')} RSS下載超時")
+        for future in done:
+            site_info = all_task.get(future)
+            site_name = site_info.get("name")
+            try:
+                status, content, size, cost, validators = future.result()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.warn(f"【Rss】{site_name} RSS下載出錯：{str(e)}")
+                continue
+            if status == 304:
+                log.info(f"【Rss】{site_name} RSS未更新，耗時 {round(cost, 2)} 秒")
+                continue
+            if not content:
+                log.info(f"【Rss】{site_name} RSS下載失敗，耗時 {round(cost, 2)} 秒")
+                ret_articles[site_name] = []
+                continue
+            log.info(f"【Rss】{site_name} RSS下載完成，耗時 {round(cost, 2)} 秒，大小 {size} 位元組")
+            ret_articles[site_name] = self.parse_rsstext(url=site_info.get("rssurl"), content=content)
+            ret_validators[site_name] = (site_info.get("rssurl"), validators)
+        log.info(f"【Rss】所有站點RSS下載完成，總耗時 {round(time.time() - start_time, 2)} 秒")
+        return ret_articles, ret_validators
+
+    def __fetch_site_rssxml(self, url, ua=None):
+        """
+        使用條件請求下載單個站點的RSS
+        :param url: RSS地址
+        :param ua: 站點請求UA
+        :return: 狀態碼、RSS內容、位元組數、耗時、新的驗證資訊（沒有時為None）
+        """
+        start_time = time.time()
+        headers = {"User-Agent": ua or Config().get_ua()}
+        validators = self._rss_validators.get(url) or {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators.get("etag")
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators.get("last_modified")
+        ret = RequestUtils(headers=headers, timeout=RSS_FETCH_TIMEOUT).get_res(url)
+        if ret is None:
+            return None, None, 0, time.time() - start_time, None
+        if ret.status_code == 304:
+            return 304, None, 0, time.time() - start_time, None
+        if not ret.ok:
+            return ret.status_code, None, 0, time.time() - start_time, None
+        # 驗證資訊在RSS處理完成後記錄，下次使用條件請求
+        etag = ret.headers.get("ETag")
+        last_modified = ret.headers.get("Last-Modified")
+        validators = {"etag": etag, "last_modified": last_modified} if etag or last_modified else None
+        ret.encoding = ret.apparent_encoding
+        return ret.status_code, ret.text, len(ret.content), time.time() - start_time, validators
+
     @staticmethod
     def parse_rssxml(url):
         """
@@ -321,15 +492,8 @@ class Rss:
         :param url: RSS地址
         :return: 種子資訊列表
         """
-        _special_title_sites = {
-            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
-        }
-
-        # 開始處理
-        ret_array = []
         if not url:
             return []
-        site_domain = StringUtils.get_url_domain(url)
         try:
             ret = RequestUtils().get_res(url)
             if not ret:
@@ -339,59 +503,73 @@ class Rss:
             ExceptionUtils.exception_traceback(e2)
             log.console(str(e2))
             return []
-        if ret:
-            ret_xml = ret.text
-            try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
-                    try:
-                        # 標題
-                        title = DomUtils.tag_value(item, "title", default="")
-                        if not title:
-                            continue
-                        # 標題特殊處理
-                        if site_domain and site_domain in _special_title_sites:
-                            title = _special_title_sites.get(site_domain)(title)
-                        # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
-                        # 種子頁面
-                        link = DomUtils.tag_value(item, "link", default="")
-                        # 種子連結
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
-                        if not enclosure and not link:
-                            continue
-                        # 部分RSS只有link沒有enclosure
-                        if not enclosure and link:
-                            enclosure = link
-                            link = None
-                        # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
-                        if size and str(size).isdigit():
-                            size = int(size)
-                        else:
-                            size = 0
-                        # 釋出日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
-                        if pubdate:
-                            # 轉換為時間
-                            pubdate = StringUtils.get_time_stamp(pubdate)
-                        # 返回物件
-                        tmp_dict = {'title': title,
-                                    'enclosure': enclosure,
-                                    'size': size,
-                                    'description': description,
-                                    'link': link,
-                                    'pubdate': pubdate}
-                        ret_array.append(tmp_dict)
-                    except Exception as e1:
-                        ExceptionUtils.exception_traceback(e1)
+        return Rss.parse_rsstext(url=url, content=ret.text)
+
+    @staticmethod
+    def parse_rsstext(url, content):
+        """
+        解析RSS內容，獲取RSS中的種子資訊
+        :param url: RSS地址，用於站點標題特殊處理
+        :param content: RSS XML內容
+        :return: 種子資訊列表
+        """
+        _special_title_sites = {
+            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
+        }
+
+        # 開始處理
+        ret_array = []
+        if not content:
+            return []
+        site_domain = StringUtils.get_url_domain(url)
+        try:
+            # 增量解析XML
+            for item in DomUtils.iter_items(content):
+                try:
+                    # 標題
+                    title = DomUtils.item_value(item, "title", default="")
+                    if not title:
+                        continue
+                    # 標題特殊處理
+                    if site_domain and site_domain in _special_title_sites:
+                        title = _special_title_sites.get(site_domain)(title)
+                    # 描述
+                    description = DomUtils.item_value(item, "description", default="")
+                    # 種子頁面
+                    link = DomUtils.item_value(item, "link", default="")
+                    # 種子連結
+                    enclosure = DomUtils.item_value(item, "enclosure", "url", default="")
+                    if not enclosure and not link:
                         continue
-            except Exception as e2:
-                ExceptionUtils.exception_traceback(e2)
-                return ret_array
+                    # 部分RSS只有link沒有enclosure
+                    if not enclosure and link:
+                        enclosure = link
+                        link = None
+                    # 大小
+                    size = DomUtils.item_value(item, "enclosure", "length", default=0)
+                    if size and str(size).isdigit():
+                        size = int(size)
+                    else:
+                        size = 0
+                    # 釋出日期
+                    pubdate = DomUtils.item_value(item, "pubDate", default="")
+                    if pubdate:
+                        # 轉換為時間
+                        pubdate = StringUtils.get_time_stamp(pubdate)
+                    # 返回物件
+                    tmp_dict = {'title': title,
+                                'enclosure': enclosure,
+                                'size': size,
+                                'description': description,
+                                'link': link,
+                                'pubdate': pubdate}
+                    ret_array.append(tmp_dict)
+                except Exception as e1:
+                    ExceptionUtils.exception_traceback(e1)
+                    continue
+        except Exception as e2:
+            ExceptionUtils.exception_traceback(e2)
+            return ret_array
         return ret_array
 
     def check_torrent_rss(self,
@@ -401,7 +579,8 @@ class Rss:
                           site_filter_rule,
                           site_cookie,
                           site_parse,
-                          site_ua):
+                          site_ua,
+                          rss_index=None):
         """
         判斷種子是否命中訂閱
         :param media_info: 已識別的種子媒體資訊
@@ -411,6 +590,7 @@ class Rss:
         :param site_cookie: 站點的Cookie
         :param site_parse: 是否解析種子詳情
         :param site_ua: 站點請求UA
+        :param rss_index: 本輪訂閱清單的索引
         :return: 匹配到的訂閱ID、是否洗版、總集數、匹配規則的資源順序、上傳因子、下載因子，匹配的季（電視劇）
         """
         # 預設值
@@ -425,91 +605,18 @@ class Rss:
         download_volume_factor = None
         hit_and_run = False
 
+        # 本輪未構建索引時臨時構建
+        if not rss_index:
+            rss_index = RssSubscribeIndex(rss_movies=rss_movies, rss_tvs=rss_tvs)
         # 匹配電影
         if media_info.type == MediaType.MOVIE and rss_movies:
-            for rid, rss_info in rss_movies.items():
-                rss_sites = rss_info.get('rss_sites')
-                # 過濾訂閱站點
-                if rss_sites and media_info.site not in rss_sites:
-                    continue
-                # tmdbid或名稱年份匹配
-                name = rss_info.get('name')
-                year = rss_info.get('year')
-                tmdbid = rss_info.get('tmdbid')
-                fuzzy_match = rss_info.get('fuzzy_match')
-                # 非模糊匹配
-                if not fuzzy_match:
-                    # 有tmdbid時使用tmdbid匹配
-                    if tmdbid and not tmdbid.startswith("DB:"):
-                        if str(media_info.tmdb_id) != str(tmdbid):
-                            continue
-                    else:
-                        # 豆瓣年份與tmdb取向不同
-                        if year and str(media_info.year) not in [str(year),
-                                                                 str(int(year) + 1),
-                                                                 str(int(year) - 1)]:
-                            continue
-                        if name != media_info.title:
-                            continue
-                # 模糊匹配
-                else:
-                    # 匹配年份
-                    if year and str(year) != str(media_info.year):
-                        continue
-                    # 匹配關鍵字或正規表示式
-                    search_title = f"{media_info.org_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
-                        continue
-                # 媒體匹配成功
-                match_flag = True
-                match_rss_info = rss_info
-
-                break
+            match_rss_info = rss_index.match_movie(media_info) or {}
         # 匹配電視劇
         elif rss_tvs:
-            # 匹配種子標題
-            for rid, rss_info in rss_tvs.items():
-                rss_sites = rss_info.get('rss_sites')
-                # 過濾訂閱站點
-                if rss_sites and media_info.site not in rss_sites:
-                    continue
-                # 有tmdbid時精確匹配
-                name = rss_info.get('name')
-                year = rss_info.get('year')
-                season = rss_info.get('season')
-                tmdbid = rss_info.get('tmdbid')
-                fuzzy_match = rss_info.get('fuzzy_match')
-                # 非模糊匹配
-                if not fuzzy_match:
-                    if tmdbid and not tmdbid.startswith("DB:"):
-                        if str(media_info.tmdb_id) != str(tmdbid):
-                            continue
-                    else:
-                        # 匹配年份，年份可以為空
-                        if year and str(year) != str(media_info.year):
-                            continue
-                        # 匹配名稱
-                        if name != media_info.title:
-                            continue
-                    # 匹配季，季可以為空
-                    if season and season != media_info.get_season_string():
-                        continue
-                # 模糊匹配
-                else:
-                    # 匹配季，季可以為空
-                    if season and season != "S00" and season != media_info.get_season_string():
-                        continue
-                    # 匹配年份
-                    if year and str(year) != str(media_info.year):
-                        continue
-                    # 匹配關鍵字或正規表示式
-                    search_title = f"{media_info.org_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
-                        continue
-                # 媒體匹配成功
-                match_flag = True
-                match_rss_info = rss_info
-                break
+            match_rss_info = rss_index.match_tv(media_info) or {}
+        if match_rss_info:
+            # 媒體匹配成功
+            match_flag = True
         # 名稱匹配成功，開始過濾
         if match_flag:
             # 解析種子詳情
@@ -563,3 +670,185 @@ class Rss:
                 media_info.get_title_string(),
                 media_info.get_season_episode_string()))
             return False, match_msg, match_rss_info
+
+
+class RssSubscribeIndex:
+    """
+    訂閱清單索引，每輪RSS構建一次：精確匹配按TMDBID和名稱雜湊查詢，模糊匹配先用預編譯的合併正規表示式整體篩選，
+    篩選出的候選訂閱再按原順序逐一校驗，匹配結果與逐條遍歷一致
+    """
+
+    def __init__(self, rss_movies=None, rss_tvs=None):
+        self._movies = self.__build(rss_movies)
+        self._tvs = self.__build(rss_tvs)
+
+    @staticmethod
+    def __build(rss_infos):
+        index = {
+            # 訂閱列表，下標即訂閱原順序
+            "infos": list((rss_infos or {}).values()),
+            # TMDBID -> 訂閱下標
+            "tmdbids": {},
+            # 名稱 -> 訂閱下標
+            "names": {},
+            # 模糊匹配的訂閱下標
+            "fuzzy": [],
+            # 無法合併到合併正規表示式中、需每次校驗的模糊匹配訂閱下標
+            "fuzzy_always": [],
+            # 模糊匹配訂閱下標 -> 預編譯的正規表示式
+            "patterns": {},
+            # 所有模糊匹配關鍵字合併的正規表示式
+            "fuzzy_regex": None
+        }
+        alternations = []
+        for order, rss_info in enumerate(index["infos"]):
+            name = rss_info.get('name')
+            tmdbid = rss_info.get('tmdbid')
+            if not rss_info.get('fuzzy_match'):
+                if tmdbid and not tmdbid.startswith("DB:"):
+                    index["tmdbids"].setdefault(str(tmdbid), []).append(order)
+                else:
+                    index["names"].setdefault(name, []).append(order)
+                continue
+            index["fuzzy"].append(order)
+            try:
+                index["patterns"][order] = re.compile(name, re.I)
+                # 含反向引用或條件分組的表示式合併後分組序號會變化
+                if re.search(r"\\\d|\(\?P=|\(\?\(", name):
+                    raise re.error("backreference")
+                re.compile(f"(?:{name})")
+                alternations.append(f"(?:{name})")
+                alternations.append(re.escape(name))
+            except (re.error, TypeError):
+                index["fuzzy_always"].append(order)
+        if alternations:
+            try:
+                index["fuzzy_regex"] = re.compile("|".join(alternations), re.I)
+            except re.error:
+                index["fuzzy_always"] = index["fuzzy"]
+        return index
+
+    @staticmethod
+    def __match(index, media_info, is_match):
+        if not index["infos"]:
+            return None
+        orders = set(index["tmdbids"].get(str(media_info.tmdb_id), []))
+        orders.update(index["names"].get(media_info.title, []))
+        if index["fuzzy"]:
+            search_title = f"{media_info.org_string} {media_info.title} {media_info.year}"
+            if index["fuzzy_regex"] and index["fuzzy_regex"].search(search_title):
+                orders.update(index["fuzzy"])
+            else:
+                orders.update(index["fuzzy_always"])
+        for order in sorted(orders):
+            rss_info = index["infos"][order]
+            if is_match(media_info, rss_info, index["patterns"].get(order)):
+                return rss_info
+        return None
+
+    def match_movie(self, media_info):
+        """
+        查詢種子命中的第一個電影訂閱
+        """
+        return self.__match(self._movies, media_info, self.is_movie_match)
+
+    def match_tv(self, media_info):
+        """
+        查詢種子命中的第一個電視劇訂閱
+        """
+        return self.__match(self._tvs, media_info, self.is_tv_match)
+
+    @staticmethod
+    def __is_fuzzy_name_match(media_info, name, pattern):
+        # 匹配關鍵字或正規表示式
+        search_title = f"{media_info.org_string} {media_info.title} {media_info.year}"
+        if pattern:
+            return pattern.search(search_title) or name in search_title
+        return re.search(name, search_title, re.I) or name in search_title
+
+    @staticmethod
+    def is_movie_match(media_info, rss_info, pattern=None):
+        """
+        判斷種子是否命中電影訂閱
+        :param media_info: 已識別的種子媒體資訊
+        :param rss_info: 電影訂閱資訊
+        :param pattern: 模糊匹配時預編譯的正規表示式
+        """
+        rss_sites = rss_info.get('rss_sites')
+        # 過濾訂閱站點
+        if rss_sites and media_info.site not in rss_sites:
+            return False
+        # tmdbid或名稱年份匹配
+        name = rss_info.get('name')
+        year = rss_info.get('year')
+        tmdbid = rss_info.get('tmdbid')
+        fuzzy_match = rss_info.get('fuzzy_match')
+        # 非模糊匹配
+        if not fuzzy_match:
+            # 有tmdbid時使用tmdbid匹配
+            if tmdbid and not tmdbid.startswith("DB:"):
+                if str(media_info.tmdb_id) != str(tmdbid):
+                    return False
+            else:
+                # 豆瓣年份與tmdb取向不同
+                if year and str(media_info.year) not in [str(year),
+                                                         str(int(year) + 1),
+                                                         str(int(year) - 1)]:
+                    return False
+                if name != media_info.title:
+                    return False
+        # 模糊匹配
+        else:
+            # 匹配年份
+            if year and str(year) != str(media_info.year):
+                return False
+            # 匹配關鍵字或正規表示式
+            if not RssSubscribeIndex.__is_fuzzy_name_match(media_info, name, pattern):
+                return False
+        return True
+
+    @staticmethod
+    def is_tv_match(media_info, rss_info, pattern=None):
+        """
+        判斷種子是否命中電視劇訂閱
+        :param media_info: 已識別的種子媒體資訊
+        :param rss_info: 電視劇訂閱資訊
+        :param pattern: 模糊匹配時預編譯的正規表示式
+        """
+        rss_sites = rss_info.get('rss_sites')
+        # 過濾訂閱站點
+        if rss_sites and media_info.site not in rss_sites:
+            return False
+        # 有tmdbid時精確匹配
+        name = rss_info.get('name')
+        year = rss_info.get('year')
+        season = rss_info.get('season')
+        tmdbid = rss_info.get('tmdbid')
+        fuzzy_match = rss_info.get('fuzzy_match')
+        # 非模糊匹配
+        if not fuzzy_match:
+            if tmdbid and not tmdbid.startswith("DB:"):
+                if str(media_info.tmdb_id) != str(tmdbid):
+                    return False
+            else:
+                # 匹配年份，年份可以為空
+                if year and str(year) != str(media_info.year):
+                    return False
+                # 匹配名稱
+                if name != media_info.title:
+                    return False
+            # 匹配季，季可以為空
+            if season and season != media_info.get_season_string():
+                return False
+        # 模糊匹配
+        else:
+            # 匹配季，季可以為空
+            if season and season != "S00" and season != media_info.get_season_string():
+                return False
+            # 匹配年份
+            if year and str(year) != str(media_info.year):
+                return False
+            # 匹配關鍵字或正規表示式
+            if not RssSubscribeIndex.__is_fuzzy_name_match(media_info, name, pattern):
+                return False
+        return True
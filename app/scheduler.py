@@ -9,7 +9,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 import log
 from app.doubansync import DoubanSync
 from app.downloader import Downloader
-from app.helper import MetaHelper
+from app.helper import MetaHelper, LibraryIndex
 from app.mediaserver import MediaServer
 from app.rss import Rss
 from app.sites import Sites
@@ -17,9 +17,11 @@ from app.subscribe import Subscribe
 from app.sync import Sync
 from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
-from config import PT_TRANSFER_INTERVAL, METAINFO_SAVE_INTERVAL, \
+from config import PT_TRANSFER_INTERVAL, \
     SYNC_TRANSFER_INTERVAL, RSS_CHECK_INTERVAL, REFRESH_PT_DATA_INTERVAL, \
-    RSS_REFRESH_TMDB_INTERVAL, META_DELETE_UNKNOWN_INTERVAL, REFRESH_WALLPAPER_INTERVAL, Config
+    RSS_REFRESH_TMDB_INTERVAL, META_DELETE_UNKNOWN_INTERVAL, REFRESH_WALLPAPER_INTERVAL, \
+    LIBRARY_INDEX_REFRESH_INTERVAL, DASHBOARD_REFRESH_INTERVAL, Config
+from web.backend.dashboard import Dashboard
 from web.backend.wallpaper import get_login_wallpaper
 
 
@@ -177,12 +179,21 @@ class Scheduler:
                     self.SCHEDULER.add_job(MediaServer().sync_mediaserver, 'interval', hours=mediasync_interval)
                     log.info("媒體庫同步服務啟動")
 
-        # 後設資料定時儲存
-        self.SCHEDULER.add_job(MetaHelper().save_meta_data, 'interval', seconds=METAINFO_SAVE_INTERVAL)
-
         # 定時把佇列中的監控檔案轉移走
         self.SCHEDULER.add_job(Sync().transfer_mon_files, 'interval', seconds=SYNC_TRANSFER_INTERVAL)
 
+        # 媒體庫索引建立及定時重新掃描
+        self.SCHEDULER.add_job(LibraryIndex().refresh,
+                               'interval',
+                               seconds=LIBRARY_INDEX_REFRESH_INTERVAL,
+                               next_run_time=datetime.datetime.now())
+
+        # 首頁統計資料
+        self.SCHEDULER.add_job(Dashboard().refresh,
+                               'interval',
+                               seconds=DASHBOARD_REFRESH_INTERVAL,
+                               next_run_time=datetime.datetime.now())
+
         # RSS佇列中檢索
         self.SCHEDULER.add_job(Subscribe().subscribe_search, 'interval', seconds=RSS_CHECK_INTERVAL)
 
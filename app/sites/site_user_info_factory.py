@@ -1,11 +1,9 @@
 import importlib
 import pkgutil
 
-import requests
-
 import log
 from app.helper import ChromeHelper, CHROME_LOCK, SiteHelper
-from app.utils import RequestUtils
+from app.utils import RequestUtils, SessionPool
 from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import SiteSchema
@@ -40,7 +38,7 @@ class SiteUserInfoFactory(object):
         if not site_cookie:
             return None
         log.debug(f"【Sites】站點 {site_name} url={url} site_cookie={site_cookie} ua={ua}")
-        session = requests.Session()
+        session = SessionPool().new_session(url)
         # 檢測環境，有瀏覽器核心的優先使用模擬簽到
         chrome = ChromeHelper()
         if emulate and chrome.get_status():
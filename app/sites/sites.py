@@ -1,7 +1,5 @@
 import json
-import random
 import re
-import time
 import traceback
 from datetime import datetime
 from functools import lru_cache
@@ -19,8 +17,8 @@ from app.message import Message
 from app.sites import SiteUserInfoFactory
 from app.sites.siteconf import SiteConf
 from app.utils.commons import singleton
-from app.utils import RequestUtils, StringUtils
-from app.helper import ChromeHelper, CHROME_LOCK, SiteHelper, DbHelper
+from app.utils import RequestUtils, StringUtils, SessionPool, TorrentAttrCache
+from app.helper import ChromeHelper, CHROME_LOCK, SiteHelper, DbHelper, ThreadHelper
 from app.utils.exception_utils import ExceptionUtils
 from config import SITE_CHECKIN_XPATH, Config
 
@@ -47,6 +45,9 @@ class Sites:
     _MAX_CONCURRENCY = 10
 
     def __init__(self):
+        # 後臺重新整理中的任務數
+        self._refreshing = 0
+        self._refreshing_lock = Lock()
         self.init_config()
 
     def init_config(self):
@@ -118,6 +119,9 @@ class Sites:
             site_strict_url = StringUtils.get_url_domain(site.SIGNURL or site.RSSURL)
             if site_strict_url:
                 self._siteByUrls[site_strict_url] = site_info
+        # 站點域名的請求統一限速
+        SessionPool().set_site_domains([SessionPool().get_domain(url)
+                                        for site in self._sites for url in [site.SIGNURL, site.RSSURL]])
 
     def __init_favicons(self):
         """
@@ -524,6 +528,31 @@ class Sites:
 
         self.refresh_all_site_data(force=True, specify_sites=specify_sites)
 
+    def refresh_pt_background(self, specify_sites=None):
+        """
+        後臺重新整理指定站點資料，不等待完成
+        """
+        if not specify_sites:
+            return
+        with self._refreshing_lock:
+            self._refreshing += 1
+        ThreadHelper().start_thread(self.__refresh_pt_background, (specify_sites,))
+
+    def __refresh_pt_background(self, specify_sites):
+        try:
+            self.refresh_pt(specify_sites=specify_sites)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+        finally:
+            with self._refreshing_lock:
+                self._refreshing -= 1
+
+    def is_refreshing(self):
+        """
+        是否有站點資料正在後臺重新整理
+        """
+        return self._refreshing > 0
+
     def get_pt_site_activity_history(self, site, days=365 * 2):
         """
         查詢站點 上傳，下載，做種資料
@@ -674,6 +703,9 @@ class Sites:
         :param ua: 站點的ua
         :return: 種子屬性，包含FREE 2XFREE HR PEER_COUNT等屬性
         """
+        cache_attr = TorrentAttrCache.get(torrent_url) if torrent_url else None
+        if cache_attr:
+            return dict(cache_attr)
         ret_attr = {
             "free": False,
             "2xfree": False,
@@ -685,6 +717,7 @@ class Sites:
         xpath_strs = self.get_grapsite_conf(torrent_url)
         if not xpath_strs:
             return ret_attr
+        # 站點請求由SessionPool統一限速，不再隨機休眠
         html_text = self.__get_site_page_html(url=torrent_url, cookie=cookie, ua=ua)
         if not html_text:
             return ret_attr
@@ -713,10 +746,9 @@ class Sites:
                         if m.isdigit():
                             peer_count_digit_str = peer_count_digit_str + m
                     ret_attr["peer_count"] = int(peer_count_digit_str) if len(peer_count_digit_str) > 0 else 0
+            TorrentAttrCache.set(torrent_url, dict(ret_attr))
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
-        # 隨機休眼後再返回
-        time.sleep(round(random.uniform(1, 5), 1))
         return ret_attr
 
     def is_public_site(self, url):
@@ -5,12 +5,11 @@ import re
 from abc import ABCMeta, abstractmethod
 from urllib.parse import urljoin, urlsplit
 
-import requests
 from lxml import etree
 
 import log
 from app.helper import SiteHelper
-from app.utils import RequestUtils
+from app.utils import RequestUtils, SessionPool
 from app.utils.types import SiteSchema
 
 
@@ -80,7 +79,7 @@ class _ISiteUserInfo(metaclass=ABCMeta):
         self.site_favicon = ""
         self._site_cookie = site_cookie
         self._index_html = index_html
-        self._session = session if session else requests.Session()
+        self._session = session if session else SessionPool().new_session(url)
         self._ua = ua
 
     def site_schema(self):
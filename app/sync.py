@@ -323,7 +323,7 @@ class Sync(object):
             sync_mode = target_dirs.get('syncmod')
             # 只做硬連結，不做識別重新命名
             if onlylink:
-                for link_file in PathUtils.get_dir_files(monpath):
+                for link_file in PathUtils.iter_dir_files(monpath, cache=True):
                     if self.dbhelper.is_sync_in_history(link_file, target_path):
                         continue
                     log.info("【Sync】開始同步 %s" % link_file)
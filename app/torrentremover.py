@@ -1,4 +1,6 @@
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from threading import Lock
 
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -10,6 +12,7 @@ from app.message import Message
 from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import DownloaderType
+from config import TORRENT_REMOVE_BATCH_SIZE
 
 lock = Lock()
 
@@ -22,6 +25,8 @@ class TorrentRemover(object):
 
     _scheduler = None
     _remove_tasks = {}
+    # 每個下載器一把鎖，同一下載器的任務序列執行
+    _downloader_locks = {}
 
     # 適用下載器
     TORRENTREMOVER_DICT = {
@@ -68,6 +73,7 @@ class TorrentRemover(object):
     }
 
     def __init__(self):
+        self._downloader_locks = {}
         self.init_config()
 
     def init_config(self):
@@ -147,65 +153,90 @@ class TorrentRemover(object):
             tasks = [task] if task else []
         if not tasks:
             return
+        # 按下載器分組，不同下載器的任務並行處理
+        downloader_tasks = {}
         for task in tasks:
-            try:
-                lock.acquire()
-                # 獲取需刪除種子列表
-                downloader_type = self.TORRENTREMOVER_DICT.get(task.get("downloader")).get("downloader_type")
-                task.get("config")["samedata"] = task.get("samedata")
-                task.get("config")["onlynastool"] = task.get("onlynastool")
-                torrents = self.downloader.get_remove_torrents(
-                    downloader=downloader_type,
-                    config=task.get("config")
-                )
-                log.info(f"【TorrentRemover】自動刪種任務：{task.get('name')} 獲取符合處理條件種子數 {len(torrents)}")
-                title = f"自動刪種任務：{task.get('name')}"
-                text = ""
-                if task.get("action") == 1:
-                    text = f"共暫停{len(torrents)}個種子"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size")/1021/1024/1024, 3)
-                        text_item = f"{name} 來自站點：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】暫停種子：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 暫停種子
-                        self.downloader.stop_torrents(downloader=downloader_type,
-                                                      ids=[torrent.get("id")])
-                elif task.get("action") == 2:
-                    text = f"共刪除{len(torrents)}個種子"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
-                        text_item = f"{name} 來自站點：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】刪除種子：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 刪除種子
-                        self.downloader.delete_torrents(downloader=downloader_type,
-                                                        delete_file=False,
-                                                        ids=[torrent.get("id")])
-                elif task.get("action") == 3:
-                    text = f"共刪除{len(torrents)}個種子（及檔案）"
-                    for torrent in torrents:
-                        name = torrent.get("name")
-                        site = torrent.get("site")
-                        size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
-                        text_item = f"{name} 來自站點：{site} 大小：{size} GB"
-                        log.info(f"【TorrentRemover】刪除種子及檔案：{text_item}")
-                        text = f"{text}\n{text_item}"
-                        # 刪除種子
-                        self.downloader.delete_torrents(downloader=downloader_type,
-                                                        delete_file=True,
-                                                        ids=[torrent.get("id")])
-                if torrents and title and text:
-                    self.message.send_brushtask_remove_message(title=title, text=text)
-            except Exception as e:
-                ExceptionUtils.exception_traceback(e)
-                log.error(f"【TorrentRemover】自動刪種任務：{task.get('name')}異常：{str(e)}")
-            finally:
-                lock.release()
+            downloader_tasks.setdefault(task.get("downloader"), []).append(task)
+        if len(downloader_tasks) == 1:
+            for downloader, group_tasks in downloader_tasks.items():
+                self.__remove_downloader_torrents(downloader, group_tasks)
+            return
+        with ThreadPoolExecutor(max_workers=len(downloader_tasks)) as executor:
+            wait([executor.submit(self.__remove_downloader_torrents, downloader, group_tasks)
+                  for downloader, group_tasks in downloader_tasks.items()])
+
+    def __get_downloader_lock(self, downloader):
+        """
+        獲取下載器對應的鎖
+        """
+        with lock:
+            if downloader not in self._downloader_locks:
+                self._downloader_locks[downloader] = Lock()
+            return self._downloader_locks[downloader]
+
+    def __remove_downloader_torrents(self, downloader, tasks):
+        """
+        序列處理同一下載器的自動刪種任務
+        """
+        with self.__get_downloader_lock(downloader):
+            for task in tasks:
+                try:
+                    self.__remove_task_torrents(task)
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    log.error(f"【TorrentRemover】自動刪種任務：{task.get('name')}異常：{str(e)}")
+
+    def __remove_task_torrents(self, task):
+        """
+        處理單個自動刪種任務，符合條件的種子按批次暫停或刪除
+        """
+        start_time = time.time()
+        # 獲取需刪除種子列表
+        downloader_type = self.TORRENTREMOVER_DICT.get(task.get("downloader")).get("downloader_type")
+        task.get("config")["samedata"] = task.get("samedata")
+        task.get("config")["onlynastool"] = task.get("onlynastool")
+        torrents = self.downloader.get_remove_torrents(
+            downloader=downloader_type,
+            config=task.get("config")
+        )
+        rpc_count = 1
+        log.info(f"【TorrentRemover】自動刪種任務：{task.get('name')} 獲取符合處理條件種子數 {len(torrents)}")
+        title = f"自動刪種任務：{task.get('name')}"
+        text = ""
+        if task.get("action") == 1:
+            text = f"共暫停{len(torrents)}個種子"
+            log_prefix = "暫停種子"
+        elif task.get("action") == 2:
+            text = f"共刪除{len(torrents)}個種子"
+            log_prefix = "刪除種子"
+        elif task.get("action") == 3:
+            text = f"共刪除{len(torrents)}個種子（及檔案）"
+            log_prefix = "刪除種子及檔案"
+        else:
+            return
+        for torrent in torrents:
+            name = torrent.get("name")
+            site = torrent.get("site")
+            size = round(torrent.get("size") / 1021 / 1024 / 1024, 3)
+            text_item = f"{name} 來自站點：{site} 大小：{size} GB"
+            log.info(f"【TorrentRemover】{log_prefix}：{text_item}")
+            text = f"{text}\n{text_item}"
+        # 按批次暫停或刪除種子
+        torrent_ids = [torrent.get("id") for torrent in torrents]
+        for i in range(0, len(torrent_ids), TORRENT_REMOVE_BATCH_SIZE):
+            ids = torrent_ids[i:i + TORRENT_REMOVE_BATCH_SIZE]
+            if task.get("action") == 1:
+                self.downloader.stop_torrents(downloader=downloader_type,
+                                              ids=ids)
+            else:
+                self.downloader.delete_torrents(downloader=downloader_type,
+                                                delete_file=task.get("action") == 3,
+                                                ids=ids)
+            rpc_count += 1
+        log.info(f"【TorrentRemover】自動刪種任務：{task.get('name')} 處理完成，"
+                 f"耗時 {round(time.time() - start_time, 1)} 秒，呼叫下載器 {rpc_count} 次")
+        if torrents and title and text:
+            self.message.send_brushtask_remove_message(title=title, text=text)
 
     def update_torrent_remove_task(self, data):
         """
@@ -1,12 +1,14 @@
 from .dom_utils import DomUtils
 from .episode_format import EpisodeFormat
-from .http_utils import RequestUtils
+from .event_bus import EventBus
+from .http_utils import RequestUtils, SessionPool
 from .json_utils import JsonUtils
 from .number_utils import NumberUtils
 from .path_utils import PathUtils
+from .rate_limiter import RateLimiter
 from .string_utils import StringUtils
 from .system_utils import SystemUtils
 from .tokens import Tokens
 from .torrent import Torrent
 from .web_utils import WebUtils
-from .cache_manager import cacheman, TokenCache
+from .cache_manager import cacheman, TokenCache, TorrentAttrCache, RecommendCache
@@ -11,4 +11,10 @@ cacheman = CacheManager(CACHES, cache_class=LRUCache)
 
 TokenCache = Cache(maxsize=256, ttl=4*3600, timer=time.time, default=None)
 
+# 種子詳情頁屬性快取，短時間內重複檢查同一種子時不再請求站點
+TorrentAttrCache = Cache(maxsize=1024, ttl=300, timer=time.time, default=None)
+
+# 推薦列表快取，按來源和頁碼快取已處理的列表，前後翻頁時不再請求TMDB、豆瓣、Bangumi
+RecommendCache = Cache(maxsize=256, ttl=1800, timer=time.time, default=None)
+
 ConfigLoadCache = Cache(maxsize=1, ttl=10, timer=time.time, default=None)
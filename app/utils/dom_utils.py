@@ -1,3 +1,6 @@
+from xml.etree import ElementTree
+
+
 class DomUtils:
 
     @staticmethod
@@ -28,3 +31,75 @@ class DomUtils:
             text = doc.createTextNode(str(value))
             node.appendChild(text)
         return node
+
+    @staticmethod
+    def iter_items(content, item_tag="item", chunk_size=64 * 1024):
+        """
+        增量解析XML，逐個返回item節點，處理完的節點立即釋放，不構建完整DOM樹
+        :param content: XML內容，字串、位元組或分塊內容的迭代器
+        :param item_tag: 需要返回的節點名，帶名稱空間字首時使用 字首:名稱
+        :param chunk_size: 字串或位元組內容的分塊大小
+        :return: 生成器，每個item為 子節點名 -> [(文字, 屬性字典), ...] 的字典，子節點名格式同 getElementsByTagName
+        """
+        if not content:
+            return
+        if isinstance(content, (str, bytes)):
+            chunks = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+        else:
+            chunks = content
+        parser = ElementTree.XMLPullParser(events=("start-ns", "start", "end"))
+        # 名稱空間URI對應的字首
+        ns_prefixes = {}
+        # 當前節點的父節點棧
+        parents = []
+
+        def __qname(tag):
+            if tag[:1] != "{":
+                return tag
+            uri, local = tag[1:].split("}", 1)
+            prefix = ns_prefixes.get(uri)
+            return f"{prefix}:{local}" if prefix else local
+
+        def __read_events():
+            for event, elem in parser.read_events():
+                if event == "start-ns":
+                    prefix, uri = elem
+                    ns_prefixes.setdefault(uri, prefix)
+                elif event == "start":
+                    parents.append(elem)
+                else:
+                    parents.pop()
+                    if __qname(elem.tag) != item_tag:
+                        continue
+                    item = {}
+                    for child in elem.iter():
+                        if child is elem:
+                            continue
+                        item.setdefault(__qname(child.tag), []).append((child.text, child.attrib))
+                    yield item
+                    # 釋放已處理的節點
+                    elem.clear()
+                    if parents:
+                        parents[-1].remove(elem)
+
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from __read_events()
+        parser.close()
+        yield from __read_events()
+
+    @staticmethod
+    def item_value(item, tag_name, attname="", default=None):
+        """
+        解析iter_items返回的item的標籤值，語義同tag_value
+        """
+        values = item.get(tag_name)
+        if values:
+            text, attrs = values[0]
+            if attname:
+                attvalue = attrs.get(attname)
+                if attvalue:
+                    return attvalue
+            elif text:
+                return text
+        return default
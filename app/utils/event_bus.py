@@ -0,0 +1,84 @@
+from collections import deque
+from threading import Condition, Lock
+
+from app.utils.commons import singleton
+from config import EVENT_QUEUE_SIZE
+
+
+class EventSubscriber(object):
+    """
+    事件訂閱者，每個訂閱者有自己的事件佇列，佇列滿時丟棄最早的事件
+    """
+
+    def __init__(self, topics=None, maxsize=EVENT_QUEUE_SIZE):
+        """
+        :param topics: 訂閱的主題，為空時訂閱全部
+        :param maxsize: 佇列中最多保留的事件數
+        """
+        self._topics = set(topics) if topics else None
+        self._events = deque(maxlen=maxsize)
+        self._cond = Condition()
+
+    def wants(self, topic):
+        return not self._topics or topic in self._topics
+
+    def put(self, topic, data, key=None):
+        """
+        事件加入佇列，同主題同key且尚未取走的事件只保留最新的一個
+        """
+        with self._cond:
+            if key is not None:
+                for index, event in enumerate(self._events):
+                    if event[0] == topic and event[1] == key:
+                        del self._events[index]
+                        break
+            self._events.append((topic, key, data))
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        取出一個事件，超時返回None
+        :return: (主題, 資料)
+        """
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            if not self._events:
+                return None
+            topic, _, data = self._events.popleft()
+            return topic, data
+
+
+@singleton
+class EventBus(object):
+    """
+    程序內的釋出/訂閱匯流排：進度、日誌、系統訊息等發生時釋出，由Web端推送給瀏覽器，代替定時輪詢
+    """
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = Lock()
+
+    def subscribe(self, topics=None):
+        """
+        新建訂閱者，不再使用時需呼叫unsubscribe
+        """
+        subscriber = EventSubscriber(topics)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscriber]
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers = [sub for sub in self._subscribers if sub is not subscriber]
+
+    def publish(self, topic, data, key=None):
+        """
+        釋出事件，不阻塞
+        :param topic: 主題
+        :param data: 事件資料，需可JSON序列化
+        :param key: 同一key的事件可合併，只推送最新的
+        """
+        for subscriber in self._subscribers:
+            if subscriber.wants(topic):
+                subscriber.put(topic, data, key)
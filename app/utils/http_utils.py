@@ -1,10 +1,139 @@
+import time
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from urllib.parse import urlparse
+
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
 from urllib3.exceptions import InsecureRequestWarning
-from config import Config
+
+from app.utils.commons import singleton
+from app.utils.rate_limiter import RateLimiter
+from config import Config, SITE_REQUEST_RATE, SITE_REQUEST_BURST, HTTP_POOL_MAXSIZE
 
 urllib3.disable_warnings(InsecureRequestWarning)
 
+lock = Lock()
+
+
+@singleton
+class SessionPool(object):
+    """
+    程序內共享的HTTP會話池，按域名複用連線；站點域名的請求按令牌桶限速，並統計請求數、耗時和錯誤數
+    """
+    _sessions = {}
+    _adapters = {}
+    _site_domains = set()
+    _limiter = None
+    _stats = {}
+
+    def __init__(self):
+        self._sessions = {}
+        self._adapters = {}
+        self._site_domains = set()
+        self._limiter = RateLimiter(rate=SITE_REQUEST_RATE, burst=SITE_REQUEST_BURST)
+        self._stats = {}
+
+    @staticmethod
+    def get_domain(url):
+        """
+        獲取地址的域名（含埠）
+        """
+        if not url:
+            return ""
+        return urlparse(url).netloc.lower()
+
+    def set_site_domains(self, domains):
+        """
+        設定需要限速的站點域名，由站點配置載入時呼叫
+        """
+        self._site_domains = set([domain.lower() for domain in domains if domain])
+
+    def __get_adapter(self, domain):
+        """
+        獲取域名對應的連線池
+        """
+        adapter = self._adapters.get(domain)
+        if adapter:
+            return adapter
+        with lock:
+            adapter = self._adapters.get(domain)
+            if not adapter:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+                self._adapters[domain] = adapter
+        return adapter
+
+    def new_session(self, url):
+        """
+        新建一個儲存Cookie的會話，用於需要保持登入狀態的連續請求，連線池仍按域名共享
+        """
+        adapter = self.__get_adapter(self.get_domain(url))
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_session(self, domain):
+        """
+        獲取域名對應的共享會話，會話不儲存伺服器返回的Cookie，Cookie仍由每次請求傳入
+        """
+        session = self._sessions.get(domain)
+        if session:
+            return session
+        adapter = self.__get_adapter(domain)
+        with lock:
+            session = self._sessions.get(domain)
+            if not session:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[domain] = session
+        return session
+
+    def acquire(self, domain):
+        """
+        站點域名的請求獲取令牌，返回等待的秒數
+        """
+        if domain not in self._site_domains:
+            return 0
+        return self._limiter.acquire(domain)
+
+    def record(self, domain, cost, wait=0, error=False):
+        """
+        記錄一次請求
+        """
+        with lock:
+            stat = self._stats.get(domain)
+            if not stat:
+                stat = self._stats[domain] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "cost": 0,
+                    "wait": 0
+                }
+            stat["requests"] += 1
+            stat["cost"] += cost
+            stat["wait"] += wait
+            if error:
+                stat["errors"] += 1
+
+    def get_stats(self):
+        """
+        按域名返回請求統計，請求數多的在前
+        """
+        with lock:
+            stats = [{
+                "domain": domain,
+                "site": domain in self._site_domains,
+                "requests": stat.get("requests"),
+                "errors": stat.get("errors"),
+                "avg_cost": round(stat.get("cost") * 1000 / stat.get("requests")),
+                "wait": round(stat.get("wait"), 1)
+            } for domain, stat in self._stats.items()]
+        return sorted(stats, key=lambda x: x.get("requests"), reverse=True)
+
 
 class RequestUtils:
     _headers = None
@@ -52,96 +181,69 @@ class RequestUtils:
         if timeout:
             self._timeout = timeout
 
+    def __request(self, method, url, **kwargs):
+        """
+        透過共享會話池發起請求：站點域名先按令牌桶限速，並記錄耗時和錯誤
+        未指定session時使用按域名共享的會話
+        """
+        pool = SessionPool()
+        domain = pool.get_domain(url)
+        wait = pool.acquire(domain)
+        session = self._session or pool.get_session(domain)
+        start_time = time.time()
+        try:
+            res = session.request(method,
+                                  url,
+                                  verify=False,
+                                  headers=self._headers,
+                                  proxies=self._proxies,
+                                  timeout=self._timeout,
+                                  **kwargs)
+        except requests.exceptions.RequestException:
+            pool.record(domain, time.time() - start_time, wait=wait, error=True)
+            raise
+        pool.record(domain, time.time() - start_time, wait=wait, error=res.status_code >= 400)
+        return res
+
     def post(self, url, params=None, json=None):
         if json is None:
             json = {}
         try:
-            if self._session:
-                return self._session.post(url,
-                                          data=params,
-                                          verify=False,
-                                          headers=self._headers,
-                                          proxies=self._proxies,
-                                          timeout=self._timeout,
-                                          json=json)
-            else:
-                return requests.post(url,
-                                     data=params,
-                                     verify=False,
-                                     headers=self._headers,
-                                     proxies=self._proxies,
-                                     timeout=self._timeout,
-                                     json=json)
+            return self.__request("POST",
+                                  url,
+                                  data=params,
+                                  json=json)
         except requests.exceptions.RequestException:
             return None
 
     def get(self, url, params=None):
         try:
-            if self._session:
-                r = self._session.get(url,
-                                      verify=False,
-                                      headers=self._headers,
-                                      proxies=self._proxies,
-                                      timeout=self._timeout,
-                                      params=params)
-            else:
-                r = requests.get(url,
-                                 verify=False,
-                                 headers=self._headers,
-                                 proxies=self._proxies,
-                                 timeout=self._timeout,
-                                 params=params)
+            r = self.__request("GET",
+                               url,
+                               params=params)
             return str(r.content, 'utf-8')
         except requests.exceptions.RequestException:
             return None
 
     def get_res(self, url, params=None, allow_redirects=True):
         try:
-            if self._session:
-                return self._session.get(url,
-                                         params=params,
-                                         verify=False,
-                                         headers=self._headers,
-                                         proxies=self._proxies,
-                                         cookies=self._cookies,
-                                         timeout=self._timeout,
-                                         allow_redirects=allow_redirects)
-            else:
-                return requests.get(url,
-                                    params=params,
-                                    verify=False,
-                                    headers=self._headers,
-                                    proxies=self._proxies,
-                                    cookies=self._cookies,
-                                    timeout=self._timeout,
-                                    allow_redirects=allow_redirects)
+            return self.__request("GET",
+                                  url,
+                                  params=params,
+                                  cookies=self._cookies,
+                                  allow_redirects=allow_redirects)
         except requests.exceptions.RequestException:
             return None
 
     def post_res(self, url, params=None, allow_redirects=True, files=None, json=None):
         try:
-            if self._session:
-                return self._session.post(url,
-                                          data=params,
-                                          verify=False,
-                                          headers=self._headers,
-                                          proxies=self._proxies,
-                                          cookies=self._cookies,
-                                          timeout=self._timeout,
-                                          allow_redirects=allow_redirects,
-                                          files=files,
-                                          json=json)
-            else:
-                return requests.post(url,
-                                     data=params,
-                                     verify=False,
-                                     headers=self._headers,
-                                     proxies=self._proxies,
-                                     cookies=self._cookies,
-                                     timeout=self._timeout,
-                                     allow_redirects=allow_redirects,
-                                     files=files,
-                                     json=json)
+            return self.__request("POST",
+                                  url,
+                                  data=params,
+                                  cookies=self._cookies,
+                                  allow_redirects=allow_redirects,
+                                  files=files,
+                                  json=json)
         except requests.exceptions.RequestException:
             return None
 
@@ -1,52 +1,126 @@
 import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from config import DIR_LISTING_CACHE_SIZE
+
+# 目錄列表快取：目錄路徑 -> (目錄修改時間, 檔名列表, 子目錄名列表)
+_listing_cache = OrderedDict()
+lock = Lock()
 
 
 class PathUtils:
 
     @staticmethod
-    def get_dir_files(in_path, exts="", filesize=0, episode_format=None):
+    def __list_dir(path, cache=False):
         """
-        獲得目錄下的媒體檔案列表List ，按字尾、大小、格式過濾
+        列出目錄下的檔案和子目錄（不含指向目錄的符號連結）
+        :param path: 目錄路徑
+        :param cache: 是否按目錄修改時間快取列表，目錄中新增、刪除、重新命名檔案時修改時間會變化
+        :return: 檔案列表[(檔名, DirEntry)]，命中快取時DirEntry為None；子目錄名列表
+        """
+        dir_mtime = None
+        if cache:
+            try:
+                dir_mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return [], []
+            with lock:
+                listing = _listing_cache.get(path)
+                if listing and listing[0] == dir_mtime:
+                    _listing_cache.move_to_end(path)
+                    return [(name, None) for name in listing[1]], listing[2]
+        files = []
+        dirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                dirs.append(entry.name)
+                        else:
+                            files.append((entry.name, entry))
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+        # 剛修改過的目錄不快取，避免同一時間刻度內的再次修改被忽略
+        if cache and time.time_ns() - dir_mtime > 2 * 1000 * 1000 * 1000:
+            with lock:
+                _listing_cache[path] = (dir_mtime, [name for name, _ in files], dirs)
+                _listing_cache.move_to_end(path)
+                while len(_listing_cache) > DIR_LISTING_CACHE_SIZE:
+                    _listing_cache.popitem(last=False)
+        return files, dirs
+
+    @staticmethod
+    def iter_dir_files(in_path, exts="", filesize=0, episode_format=None, cache=False):
+        """
+        逐個返回目錄下的媒體檔案，按字尾、大小、格式過濾，順序與os.walk一致
+        :param cache: 是否快取目錄列表，適用於媒體庫等不常變化的目錄，未變化的目錄再次掃描時無需列出
         """
         if not in_path:
-            return []
+            return
         if not os.path.exists(in_path):
-            return []
-        ret_list = []
-        if os.path.isdir(in_path):
-            for root, dirs, files in os.walk(in_path):
-                for file in files:
-                    cur_path = os.path.join(root, file)
-                    # 檢查路徑是否合法
-                    if PathUtils.is_invalid_path(cur_path):
-                        continue
-                    # 檢查格式匹配
-                    if episode_format and not episode_format.match(file):
-                        continue
-                    # 檢查字尾
-                    if exts and os.path.splitext(file)[-1].lower() not in exts:
-                        continue
-                    # 檢查檔案大小
-                    if filesize and os.path.getsize(cur_path) < filesize:
-                        continue
-                    # 命中
-                    if cur_path not in ret_list:
-                        ret_list.append(cur_path)
-        else:
+            return
+        if not os.path.isdir(in_path):
             # 檢查路徑是否合法
             if PathUtils.is_invalid_path(in_path):
-                return []
+                return
             # 檢查字尾
             if exts and os.path.splitext(in_path)[-1].lower() not in exts:
-                return []
+                return
             # 檢查格式
             if episode_format and not episode_format.match(os.path.basename(in_path)):
-                return []
+                return
             # 檢查檔案大小
             if filesize and os.path.getsize(in_path) < filesize:
-                return []
-            ret_list.append(in_path)
-        return ret_list
+                return
+            yield in_path
+            return
+        ret_paths = set()
+        dir_paths = [in_path]
+        while dir_paths:
+            root = dir_paths.pop()
+            files, dirs = PathUtils.__list_dir(root, cache=cache)
+            for file, entry in files:
+                cur_path = os.path.join(root, file)
+                # 檢查路徑是否合法
+                if PathUtils.is_invalid_path(cur_path):
+                    continue
+                # 檢查格式匹配
+                if episode_format and not episode_format.match(file):
+                    continue
+                # 檢查字尾
+                if exts and os.path.splitext(file)[-1].lower() not in exts:
+                    continue
+                # 檢查檔案大小，優先使用掃描目錄時的stat
+                if filesize:
+                    try:
+                        file_size = entry.stat().st_size if entry else os.path.getsize(cur_path)
+                    except OSError:
+                        continue
+                    if file_size < filesize:
+                        continue
+                # 命中
+                if cur_path not in ret_paths:
+                    ret_paths.add(cur_path)
+                    yield cur_path
+            # 先進後出，保證按目錄順序深度優先
+            dir_paths.extend([os.path.join(root, d) for d in reversed(dirs)])
+
+    @staticmethod
+    def get_dir_files(in_path, exts="", filesize=0, episode_format=None, cache=False):
+        """
+        獲得目錄下的媒體檔案列表List ，按字尾、大小、格式過濾
+        """
+        return list(PathUtils.iter_dir_files(in_path=in_path,
+                                             exts=exts,
+                                             filesize=filesize,
+                                             episode_format=episode_format,
+                                             cache=cache))
 
     @staticmethod
     def get_dir_level1_files(in_path, exts=""):
@@ -56,11 +130,11 @@ class PathUtils:
         ret_list = []
         if not os.path.exists(in_path):
             return []
-        for file in os.listdir(in_path):
-            path = os.path.join(in_path, file)
-            if os.path.isfile(path):
-                if not exts or os.path.splitext(file)[-1].lower() in exts:
-                    ret_list.append(path)
+        with os.scandir(in_path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    if not exts or os.path.splitext(entry.name)[-1].lower() in exts:
+                        ret_list.append(os.path.join(in_path, entry.name))
         return ret_list
 
     @staticmethod
@@ -0,0 +1,46 @@
+import time
+from threading import Lock
+
+
+class RateLimiter(object):
+    """
+    按Key（一般為站點域名）分別計數的令牌桶限速器，取不到令牌時阻塞等待
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: 每秒生成的令牌數
+        :param burst: 令牌桶容量，允許的突發請求數
+        """
+        self._rate = float(rate)
+        self._burst = max(1, int(burst))
+        # key -> [令牌數, 上次更新時間]
+        self._buckets = {}
+        self._lock = Lock()
+
+    def __reserve(self, key):
+        """
+        預留一個令牌，返回需要等待的秒數
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, last_time = self._buckets.get(key) or [self._burst, now]
+            tokens = min(self._burst, tokens + (now - last_time) * self._rate)
+            # 令牌數可以為負，表示已預留給等待中的請求
+            tokens -= 1
+            self._buckets[key] = [tokens, now]
+            if tokens >= 0:
+                return 0
+            return -tokens / self._rate
+
+    def acquire(self, key=None):
+        """
+        獲取一個令牌，必要時阻塞到可用
+        :return: 等待的秒數
+        """
+        if self._rate <= 0:
+            return 0
+        wait_time = self.__reserve(key)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
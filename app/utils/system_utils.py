@@ -109,13 +109,53 @@ class SystemUtils:
     def is_macos():
         return True if platform.system() == 'Darwin' else False
 
+    @staticmethod
+    def is_same_disk(src, dest):
+        """
+        判斷兩個路徑是否在同一檔案系統，目的檔案不存在時按其所在目錄判斷
+        """
+        try:
+            if not os.path.exists(dest):
+                dest = os.path.dirname(dest)
+            return os.stat(src).st_dev == os.stat(dest).st_dev
+        except OSError:
+            return False
+
+    @staticmethod
+    def __copy_file_range(src, dest):
+        """
+        使用copy_file_range在核心中複製檔案內容，支援的檔案系統上無需讀寫資料（如btrfs、XFS的reflink）
+        :return: 是否複製成功
+        """
+        try:
+            with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+                size = os.fstat(fsrc.fileno()).st_size
+                copied = 0
+                while copied < size:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(size - copied, 1024 * 1024 * 1024))
+                    if not sent:
+                        break
+                    copied += sent
+            if copied != size:
+                return False
+            shutil.copystat(src, dest)
+            return True
+        except OSError:
+            return False
+
     @staticmethod
     def copy(src, dest):
         """
-        複製
+        複製，同一檔案系統上優先使用copy_file_range，否則由shutil複製（Linux下使用sendfile）
         """
         try:
-            shutil.copy2(os.path.normpath(src), os.path.normpath(dest))
+            src = os.path.normpath(src)
+            dest = os.path.normpath(dest)
+            if not hasattr(os, "copy_file_range") \
+                    or os.path.isdir(dest) \
+                    or not SystemUtils.is_same_disk(src, dest) \
+                    or not SystemUtils.__copy_file_range(src, dest):
+                shutil.copy2(src, dest)
             return 0, ""
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
@@ -124,9 +164,15 @@ class SystemUtils:
     @staticmethod
     def move(src, dest):
         """
-        移動
+        移動，優先直接重新命名
         """
         try:
+            try:
+                os.replace(os.path.normpath(src), os.path.normpath(dest))
+                return 0, ""
+            except OSError:
+                # 跨檔案系統等不能直接重新命名的，按原方式移動
+                pass
             tmp_file = os.path.normpath(os.path.join(os.path.dirname(src),
                                                      os.path.basename(dest)))
             os.rename(os.path.normpath(src), tmp_file)
@@ -9,6 +9,11 @@ import ruamel.yaml
 WECHAT_MENU = {'_0_0': '/ptt', '_0_1': '/ptr', '_0_2': '/rss', '_1_0': '/rst', '_1_1': '/db', '_2_0': '/pts'}
 # 種子名/檔名要素分隔字元
 SPLIT_CHARS = r"\.|\s+|\(|\)|\[|]|-|\+|【|】|/|～|;|&|\||#|_|「|」|（|）|~"
+# 單個站點每秒的請求數及允許的突發請求數，所有訪問站點的請求共用
+SITE_REQUEST_RATE = 1
+SITE_REQUEST_BURST = 3
+# 每個域名共享會話的最大連線數
+HTTP_POOL_MAXSIZE = 10
 # 預設User-Agent
 DEFAULT_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36"
 # 收藏了的媒體的目錄名，名字可以改，在Emby中點選紅星則會自動將電影轉移到此分類下，需要在Emby Webhook中配置使用者行為通知
@@ -26,20 +31,57 @@ RMT_MIN_FILESIZE = 150 * 1024 * 1024
 AUTO_REMOVE_TORRENTS_INTERVAL = 1800
 # 下載檔案轉移檢查時間間隔，
 PT_TRANSFER_INTERVAL = 300
-# TMDB資訊快取定時儲存時間
-METAINFO_SAVE_INTERVAL = 600
+# 檔案轉移並行的執行緒數，及同一檔案系統上同時進行的轉移數
+TRANSFER_THREADS = 8
+TRANSFER_THREADS_PER_DISK = 2
+# 掃描媒體庫時快取的目錄列表數
+DIR_LISTING_CACHE_SIZE = 50000
+# 媒體庫索引重新掃描的時間間隔（秒），只重新列出修改時間變化的目錄
+LIBRARY_INDEX_REFRESH_INTERVAL = 600
 # SYNC目錄同步聚合轉移時間
 SYNC_TRANSFER_INTERVAL = 60
 # RSS佇列中處理時間間隔
 RSS_CHECK_INTERVAL = 300
+# RSS並行下載的執行緒數
+RSS_FETCH_THREADS = 10
+# 單個站點RSS下載超時時間（秒）
+RSS_FETCH_TIMEOUT = 30
 # 站點流量資料重新整理時間間隔（小時）
 REFRESH_PT_DATA_INTERVAL = 6
 # 重新整理訂閱TMDB資料的時間間隔（小時）
 RSS_REFRESH_TMDB_INTERVAL = 6
 # 刷流刪除的檢查時間間隔
 BRUSH_REMOVE_TORRENTS_INTERVAL = 300
+# 下載器種子狀態映象的同步間隔（秒），讀取時超過該間隔才向下載器增量同步
+DOWNLOADER_SYNC_INTERVAL = 10
+# 自動刪種每次呼叫下載器暫停/刪除的種子數
+TORRENT_REMOVE_BATCH_SIZE = 200
+# 刷流並行檢查種子詳情的執行緒數
+BRUSH_ATTR_FETCH_THREADS = 5
 # 定時清除未識別的快取時間間隔（小時）
 META_DELETE_UNKNOWN_INTERVAL = 12
+# 批次識別媒體資訊時並行查詢TMDB的執行緒數
+MEDIA_BATCH_THREADS = 5
+# 媒體庫同步時每頁查詢及每批寫入資料庫的媒體數
+MEDIASYNC_PAGE_SIZE = 200
+# 媒體庫全量同步的時間間隔（小時），期間只同步有更新的媒體，全量同步時清理已刪除的媒體
+MEDIASYNC_FULL_INTERVAL = 24
+# 首頁統計資料後臺重新整理的時間間隔（秒），及轉移歷史統計的天數
+DASHBOARD_REFRESH_INTERVAL = 300
+DASHBOARD_TRANSFER_DAYS = 30
+# 每個事件推送連線中最多積壓的事件數，及無事件時傳送心跳的時間間隔（秒）
+EVENT_QUEUE_SIZE = 500
+EVENT_STREAM_HEARTBEAT = 15
+# 推薦列表按來源的快取時間（秒），快取期間翻頁不再請求TMDB、豆瓣、Bangumi
+RECOMMEND_CACHE_TTL = {"tmdb": 1800, "douban": 1800, "bangumi": 3600}
+# SQLite每個連線的頁快取大小（KB）、記憶體對映大小（位元組）及等待鎖的超時時間（秒）
+DB_CACHE_SIZE = 16 * 1024
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_BUSY_TIMEOUT = 30
+# 資料庫寫入執行緒每次合併提交的最大寫操作數
+DB_WRITE_BATCH_SIZE = 50
+# 名稱識別結果快取的最大條數
+META_INFO_CACHE_SIZE = 5000
 # 定時重新整理桌布的間隔（小時）
 REFRESH_WALLPAPER_INTERVAL = 1
 # fanart的api，用於拉取封面圖片
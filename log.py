@@ -7,12 +7,15 @@ from collections import deque
 from html import escape
 from logging.handlers import RotatingFileHandler
 
+from app.utils.event_bus import EventBus
 from config import Config
 
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
 lock = threading.Lock()
 LOG_QUEUE = deque(maxlen=200)
 LOG_INDEX = 0
+# 日誌序號，推送時用於斷線重連後補發
+LOG_SEQ = 0
 
 
 class Logger:
@@ -73,7 +76,7 @@ class Logger:
 
 
 def __append_log_queue(level, text):
-    global LOG_INDEX, LOG_QUEUE
+    global LOG_INDEX, LOG_QUEUE, LOG_SEQ
     with lock:
         text = escape(text)
         if text.startswith("【"):
@@ -81,12 +84,16 @@ def __append_log_queue(level, text):
             text = text.replace(f"【{source}】", "")
         else:
             source = "System"
-        LOG_QUEUE.append({
+        LOG_SEQ += 1
+        item = {
+            "id": LOG_SEQ,
             "time": time.strftime('%H:%M:%S', time.localtime(time.time())),
             "level": level,
             "source": source,
-            "text": text})
+            "text": text}
+        LOG_QUEUE.append(item)
         LOG_INDEX += 1
+        EventBus().publish("log", item)
 
 
 def debug(text, module=None):
@@ -67,7 +67,7 @@ import log
 from web.main import App
 from app.brushtask import BrushTask
 from app.db import init_db, update_db
-from app.helper import IndexerHelper, DisplayHelper, ChromeHelper
+from app.helper import IndexerHelper, DisplayHelper, ChromeHelper, DbHelper
 from app.rsschecker import RssChecker
 from app.scheduler import run_scheduler, restart_scheduler
 from app.sync import run_monitor, restart_monitor
@@ -149,6 +149,8 @@ def start_service():
     TorrentRemover()
     # 載入索引器配置
     IndexerHelper()
+    # 預熱RSS已處理種子索引
+    DbHelper().init_rss_torrents_index()
 
 
 def monitor_config():
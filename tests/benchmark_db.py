@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+資料庫併發讀寫對比：原實現（回滾日誌模式、各執行緒直接提交）與 當前實現（WAL、寫入執行緒合併提交）
+使用臨時目錄中的資料庫，不影響配置目錄
+執行：python -m tests.benchmark_db [寫執行緒數] [讀執行緒數]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 每個執行緒的操作次數
+OPERATIONS = 200
+
+base_dir = tempfile.mkdtemp()
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for file_name in ["config.yaml", "default-category.yaml"]:
+    shutil.copy(os.path.join(root_path, "config", file_name), base_dir)
+os.environ["NASTOOL_CONFIG"] = os.path.join(base_dir, "config.yaml")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker, scoped_session  # noqa: E402
+from sqlalchemy.pool import QueuePool  # noqa: E402
+
+from app.db import MainDb  # noqa: E402
+from app.db.models import SYSTEMDICT  # noqa: E402
+from app.helper import DictHelper  # noqa: E402
+
+
+class LegacyDb:
+    """
+    原資料庫實現：預設回滾日誌模式，各執行緒在自己的連線中寫入並提交
+    """
+
+    def __init__(self):
+        self.engine = create_engine(f"sqlite:///{os.path.join(base_dir, 'legacy.db')}?check_same_thread=False",
+                                    echo=False,
+                                    poolclass=QueuePool,
+                                    pool_pre_ping=True,
+                                    pool_size=50,
+                                    pool_recycle=60 * 30)
+        SYSTEMDICT.__table__.create(self.engine)
+        self.session = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+
+    def set(self, dtype, key, value):
+        session = self.session()
+        try:
+            session.add(SYSTEMDICT(TYPE=dtype, KEY=key, VALUE=value))
+            session.commit()
+            return True
+        except Exception:
+            session.rollback()
+            return False
+
+    def get(self, dtype, key):
+        ret = self.session().query(SYSTEMDICT.VALUE).filter(SYSTEMDICT.TYPE == dtype, SYSTEMDICT.KEY == key).first()
+        return ret[0] if ret else ""
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run(name, db, writers, readers):
+    write_costs = []
+    read_costs = []
+    errors = []
+    lock = threading.Lock()
+
+    def write(index):
+        for i in range(OPERATIONS):
+            start_time = time.perf_counter()
+            ret = db.set("Benchmark", "%s-%s" % (index, i), "value")
+            with lock:
+                write_costs.append(time.perf_counter() - start_time)
+                if not ret:
+                    errors.append(1)
+
+    def read(index):
+        for i in range(OPERATIONS):
+            start_time = time.perf_counter()
+            db.get("Benchmark", "%s-%s" % (index, i))
+            with lock:
+                read_costs.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers + readers) as executor:
+        futures = [executor.submit(write, i) for i in range(writers)] + \
+                  [executor.submit(read, i) for i in range(readers)]
+        for future in futures:
+            future.result()
+    cost = time.perf_counter() - start_time
+    print(f"{name:<8} time={round(cost, 2)}s "
+          f"writes/s={int(len(write_costs) / cost)} "
+          f"write_p50={round(percentile(write_costs, 50) * 1000, 1)}ms "
+          f"write_p99={round(percentile(write_costs, 99) * 1000, 1)}ms "
+          f"read_p99={round(percentile(read_costs, 99) * 1000, 1)}ms "
+          f"failed_writes={len(errors)}")
+
+
+if __name__ == '__main__':
+    writer_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    reader_count = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    try:
+        MainDb.init_db()
+        print(f"writers={writer_count} readers={reader_count} operations={OPERATIONS}")
+        run("legacy", LegacyDb(), writer_count, reader_count)
+        run("current", DictHelper(), writer_count, reader_count)
+    finally:
+        shutil.rmtree(base_dir)
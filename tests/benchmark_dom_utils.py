@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+RSS/Torznab XML解析效能對比：xml.dom.minidom 與 DomUtils.iter_items
+執行：python -m tests.benchmark_dom_utils
+"""
+import os
+import time
+import tracemalloc
+import xml.dom.minidom
+
+from app.utils import DomUtils
+
+FEEDS_PATH = os.path.join(os.path.dirname(__file__), "cases", "feeds")
+# 測試的XML大小
+FEED_SIZES = [1024 * 1024, 5 * 1024 * 1024]
+FEED_TAGS = [("title", ""), ("description", ""), ("link", ""), ("comments", ""), ("size", ""),
+             ("pubDate", ""), ("enclosure", "url"), ("enclosure", "length")]
+
+
+def inflate_feed(content, size):
+    """
+    重複item直到XML達到指定大小
+    """
+    head, rest = content.split("<item>", 1)
+    body, tail = rest.rsplit("</item>", 1)
+    item = "<item>%s</item>\n" % body
+    return head + item * max(1, size // len(item)) + tail
+
+
+def parse_minidom(content):
+    ret = []
+    for item in xml.dom.minidom.parseString(content).documentElement.getElementsByTagName("item"):
+        ret.append({tag: DomUtils.tag_value(item, tag, att) for tag, att in FEED_TAGS})
+    return ret
+
+
+def parse_stream(content):
+    ret = []
+    for item in DomUtils.iter_items(content):
+        ret.append({tag: DomUtils.item_value(item, tag, att) for tag, att in FEED_TAGS})
+    return ret
+
+
+def measure(func, content):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    count = len(func(content))
+    cost = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, cost, peak
+
+
+if __name__ == '__main__':
+    for feed in sorted(os.listdir(FEEDS_PATH)):
+        with open(os.path.join(FEEDS_PATH, feed), "r", encoding="utf-8") as f:
+            feed_content = f.read()
+        for feed_size in FEED_SIZES:
+            content = inflate_feed(feed_content, feed_size)
+            print(f"{feed} {round(len(content.encode('utf-8')) / 1024 / 1024, 1)}MB")
+            for name, func in [("minidom", parse_minidom), ("iter_items", parse_stream)]:
+                count, cost, peak = measure(func, content)
+                print(f"  {name:<10} items={count} time={round(cost, 3)}s peak={round(peak / 1024 / 1024, 1)}MB")
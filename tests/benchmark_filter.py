@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+過濾規則匹配吞吐量對比：逐條重建規則並re.search 與 預編譯規則組的 Filter.check_rules
+執行：python -m tests.benchmark_filter
+"""
+import time
+
+from app.filter import Filter
+from tests.test_filter import FILTER_GROUPS, FILTER_RULES, legacy_check_rules, build_torrents
+
+# 重複次數
+ROUNDS = 50
+
+
+def measure(func, torrents):
+    start_time = time.perf_counter()
+    for _ in range(ROUNDS):
+        for meta_info in torrents:
+            func(meta_info)
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    filter_obj = Filter()
+    filter_obj._groups = FILTER_GROUPS
+    filter_obj._rules = FILTER_RULES
+    filter_obj._compiled_groups = filter_obj._Filter__compile_rule_groups()
+    torrents = build_torrents()
+    matched = len([meta_info for meta_info in torrents if filter_obj.check_rules(meta_info)[0]])
+    print(f"torrents={len(torrents)} matched={matched} rounds={ROUNDS}")
+    for name, func in [("legacy", lambda meta_info: legacy_check_rules(filter_obj, meta_info)),
+                       ("compiled", lambda meta_info: filter_obj.check_rules(meta_info))]:
+        cost = measure(func, torrents)
+        print(f"  {name:<8} time={round(cost, 3)}s torrents/s={int(ROUNDS * len(torrents) / cost)}")
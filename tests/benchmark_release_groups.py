@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+製作組匹配效能對比：每次拼接編譯正則 與 預編譯的 ReleaseGroupsMatcher
+執行：python -m tests.benchmark_release_groups
+"""
+import re
+import time
+
+from app.media.meta.release_groups import ReleaseGroupsMatcher
+from config import Config
+from tests.cases.meta_cases import meta_cases
+
+# 重複次數
+ROUNDS = 200
+
+
+def legacy_match(title):
+    """
+    原ReleaseGroupsMatcher每次例項化時拼接製作組、匹配時重新編譯正則的邏輯
+    """
+    release_groups = []
+    for site_groups in ReleaseGroupsMatcher.RELEASE_GROUPS.values():
+        for release_group in site_groups:
+            release_groups.append(release_group)
+    custom_release_groups = (Config().get_config('laboratory') or {}).get('release_groups')
+    if custom_release_groups:
+        custom_release_groups = custom_release_groups.strip(';').replace(";", "|")
+        groups = f"{'|'.join(release_groups)}|{custom_release_groups}"
+    else:
+        groups = '|'.join(release_groups)
+    title = f"{title} "
+    groups_re = re.compile(r"(?<=[-@\[￡【])(?:%s)(?=[@.\s\]\[】])" % groups, re.I)
+    return '@'.join(re.findall(groups_re, title))
+
+
+def compiled_match(title):
+    return ReleaseGroupsMatcher().match(title=title)
+
+
+def measure(func, titles):
+    start_time = time.perf_counter()
+    for _ in range(ROUNDS):
+        for title in titles:
+            func(title)
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    titles = [case.get("title") for case in meta_cases if case.get("title")]
+    for title in titles:
+        assert legacy_match(title) == compiled_match(title), title
+    print(f"titles={len(titles)} rounds={ROUNDS}")
+    for name, func in [("legacy", legacy_match), ("compiled", compiled_match)]:
+        cost = measure(func, titles)
+        print(f"  {name:<8} time={round(cost, 3)}s per_title={round(cost * 1000000 / ROUNDS / len(titles), 1)}us")
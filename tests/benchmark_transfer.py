@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+檔案轉移耗時對比：呼叫外部命令（cp/mv）、原shutil實現 與 SystemUtils的copy_file_range/重新命名實現
+執行：python -m tests.benchmark_transfer [目錄]，目錄預設為系統臨時目錄
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.utils import SystemUtils
+
+# 小檔案數量及大小
+SMALL_FILES = 2000
+SMALL_SIZE = 16 * 1024
+# 大檔案數量及大小
+LARGE_FILES = 3
+LARGE_SIZE = 256 * 1024 * 1024
+
+
+def legacy_copy(src, dest):
+    shutil.copy2(os.path.normpath(src), os.path.normpath(dest))
+
+
+def legacy_move(src, dest):
+    tmp_file = os.path.normpath(os.path.join(os.path.dirname(src), os.path.basename(dest)))
+    os.rename(os.path.normpath(src), tmp_file)
+    shutil.move(tmp_file, os.path.normpath(dest))
+
+
+def command_copy(src, dest):
+    subprocess.run(["cp", "-p", src, dest], check=True)
+
+
+def command_move(src, dest):
+    subprocess.run(["mv", src, dest], check=True)
+
+
+def create_files(path, count, size):
+    os.makedirs(path)
+    data = os.urandom(min(size, 1024 * 1024))
+    files = []
+    for i in range(count):
+        file_path = os.path.join(path, "%05d.mkv" % i)
+        with open(file_path, "wb") as f:
+            written = 0
+            while written < size:
+                f.write(data[:size - written])
+                written += len(data[:size - written])
+        files.append(file_path)
+    return files
+
+
+def measure(func, files, dest_dir):
+    os.makedirs(dest_dir)
+    start_time = time.perf_counter()
+    for file_path in files:
+        func(file_path, os.path.join(dest_dir, os.path.basename(file_path)))
+    return time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    base_dir = tempfile.mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1 else None)
+    try:
+        for name, count, size in [("small", SMALL_FILES, SMALL_SIZE), ("large", LARGE_FILES, LARGE_SIZE)]:
+            files = create_files(os.path.join(base_dir, name), count, size)
+            print(f"{name}: files={count} size={size // 1024}KB")
+            for mode, funcs in [("copy", [("command", command_copy),
+                                          ("legacy", legacy_copy),
+                                          ("native", SystemUtils.copy)]),
+                                ("move", [("command", command_move),
+                                          ("legacy", legacy_move),
+                                          ("native", SystemUtils.move)])]:
+                for func_name, func in funcs:
+                    dest_dir = os.path.join(base_dir, f"{name}-{mode}-{func_name}")
+                    cost = measure(func, files, dest_dir)
+                    print(f"  {mode:<4} {func_name:<8} time={round(cost, 3)}s files/s={int(count / cost)}")
+                    if mode == "move":
+                        # 移回原目錄供下一輪使用
+                        for file_path in files:
+                            os.rename(os.path.join(dest_dir, os.path.basename(file_path)), file_path)
+                    shutil.rmtree(dest_dir)
+    finally:
+        shutil.rmtree(base_dir)
@@ -1,11 +1,80 @@
 import unittest
 
+from tests.test_dashboard import DashboardTest
+from tests.test_db_writer import DbWriterTest
+from tests.test_dom_utils import DomUtilsTest
+from tests.test_event_bus import EventBusTest
+from tests.test_filter import FilterTest
+from tests.test_fts_search import FtsSearchTest
+from tests.test_library_index import LibraryIndexTest
+from tests.test_media_sync import MediaSyncTest
 from tests.test_metainfo import MetaInfoTest
+from tests.test_metainfo_cache import MetaInfoCacheTest
+from tests.test_path_utils import PathUtilsTest
+from tests.test_rate_limiter import RateLimiterTest
+from tests.test_recommend import RecommendTest
+from tests.test_rss_index import RssSubscribeIndexTest
+from tests.test_system_utils import SystemUtilsTest
+from tests.test_torrent_mirror import TorrentMirrorTest
+from tests.test_transfer_executor import TransferExecutorTest
+from tests.test_words_helper import WordsHelperTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
     # 测试名称识别
     suite.addTest(MetaInfoTest('test_metainfo'))
+    # 测试识别结果缓存
+    suite.addTest(MetaInfoCacheTest('test_cache_hit'))
+    suite.addTest(MetaInfoCacheTest('test_cache_invalidate'))
+    # 测试XML增量解析
+    suite.addTest(DomUtilsTest('test_iter_items'))
+    suite.addTest(DomUtilsTest('test_iter_items_bytes'))
+    # 测试订阅索引匹配
+    suite.addTest(RssSubscribeIndexTest('test_index_match'))
+    # 测试过滤规则
+    suite.addTest(FilterTest('test_check_rules'))
+    suite.addTest(FilterTest('test_is_rule_free'))
+    # 测试站点限速
+    suite.addTest(RateLimiterTest('test_acquire'))
+    # 测试下载器种子镜像
+    suite.addTest(TorrentMirrorTest('test_qbittorrent_sync'))
+    suite.addTest(TorrentMirrorTest('test_transmission_sync'))
+    # 测试目录扫描
+    suite.addTest(PathUtilsTest('test_get_dir_files'))
+    suite.addTest(PathUtilsTest('test_listing_cache'))
+    # 测试媒体库索引
+    suite.addTest(LibraryIndexTest('test_lookup'))
+    suite.addTest(LibraryIndexTest('test_update'))
+    # 测试媒体库增量同步
+    suite.addTest(MediaSyncTest('test_sync'))
+    suite.addTest(MediaSyncTest('test_duplicate_items'))
+    suite.addTest(MediaSyncTest('test_failed_sync'))
+    suite.addTest(MediaSyncTest('test_plex'))
+    # 测试数据库写入线程
+    suite.addTest(DbWriterTest('test_concurrent_writes'))
+    suite.addTest(DbWriterTest('test_failed_write'))
+    suite.addTest(DbWriterTest('test_backup'))
+    # 测试全文检索及游标翻页
+    suite.addTest(FtsSearchTest('test_transfer_history'))
+    suite.addTest(FtsSearchTest('test_keyset_paging'))
+    suite.addTest(FtsSearchTest('test_tmdb_cache'))
+    # 测试首页统计数据缓存
+    suite.addTest(DashboardTest('test_cached'))
+    suite.addTest(DashboardTest('test_transfer_statistics'))
+    # 测试事件推送
+    suite.addTest(EventBusTest('test_publish'))
+    suite.addTest(EventBusTest('test_progress'))
+    suite.addTest(EventBusTest('test_stream'))
+    # 测试推荐列表缓存及批量查询状态
+    suite.addTest(RecommendTest('test_recommend'))
+    # 测试文件复制移动
+    suite.addTest(SystemUtilsTest('test_copy_move'))
+    # 测试文件转移执行器
+    suite.addTest(TransferExecutorTest('test_run'))
+    suite.addTest(TransferExecutorTest('test_submit_after'))
+    # 测试自定义识别词
+    suite.addTest(WordsHelperTest('test_process'))
+    suite.addTest(WordsHelperTest('test_invalid_word'))
 
     # 运行测试
     runner = unittest.TextTestRunner()
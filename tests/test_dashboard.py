@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase, mock
+
+from app.db import MainDb
+from app.db.models import TRANSFERHISTORY
+from app.helper import DbHelper
+from web.backend.dashboard import Dashboard
+
+
+class DashboardTest(TestCase):
+
+    def setUp(self):
+        MainDb.init_db()
+        self.today = time.strftime('%Y-%m-%d', time.localtime(time.time()))
+        self.clear()
+        self.mediaserver = mock.Mock()
+        self.mediaserver.get_medias_count.return_value = {"MovieCount": 1200, "SeriesCount": 30, "SongCount": 0}
+        self.mediaserver.get_user_count.return_value = 2
+        self.mediaserver.get_activity_log.return_value = []
+
+    def tearDown(self):
+        self.clear()
+
+    @staticmethod
+    def clear():
+        MainDb().query(TRANSFERHISTORY).filter(TRANSFERHISTORY.SOURCE == "DashboardTest").delete()
+        MainDb().commit()
+
+    def add_history(self, mtype, count):
+        db = MainDb()
+        db.insert([TRANSFERHISTORY(SOURCE="DashboardTest", TYPE=mtype, TITLE="DashboardTest",
+                                   DATE="%s 10:00:00" % self.today) for _ in range(count)])
+        db.commit()
+
+    def refresh(self):
+        with mock.patch("web.backend.dashboard.MediaServer", return_value=self.mediaserver):
+            Dashboard().refresh()
+
+    def today_counts(self):
+        statistics = Dashboard().get_transfer_statistics()
+        movie = dict(zip(statistics.get("MovieChartLabels"), statistics.get("MovieNums"))).get(self.today, 0)
+        tv = dict(zip(statistics.get("TvChartLabels"), statistics.get("TvNums"))).get(self.today, 0)
+        anime = dict(zip(statistics.get("TvChartLabels"), statistics.get("AnimeNums"))).get(self.today, 0)
+        return movie, tv, anime
+
+    def test_cached(self):
+        self.refresh()
+        self.assertEqual(Dashboard().get_library_mediacount().get("Movie"), "1,200")
+        self.assertIsNotNone(Dashboard().get_update_time())
+        # 讀取時不請求媒體伺服器
+        with mock.patch("web.backend.dashboard.MediaServer", side_effect=AssertionError("media server called")):
+            self.assertEqual(Dashboard().get_library_mediacount().get("User"), 2)
+            self.assertEqual(Dashboard().get_library_playhistory().get("result"), [])
+
+    def test_transfer_statistics(self):
+        self.add_history("電影", 1)
+        self.refresh()
+        movie, tv, anime = self.today_counts()
+        self.add_history("電影", 3)
+        self.add_history("電視劇", 2)
+        self.add_history("動漫", 1)
+        # 只統計新增的記錄
+        dbhelper = mock.Mock()
+        dbhelper.get_transfer_statistics.side_effect = DbHelper().get_transfer_statistics
+        with mock.patch("web.backend.dashboard.DbHelper", return_value=dbhelper):
+            self.refresh()
+        self.assertGreater(dbhelper.get_transfer_statistics.call_args.kwargs.get("min_id"), 0)
+        self.assertEqual(self.today_counts(), (movie + 3, tv + 2, anime + 1))
+        # 刪除記錄後重新統計
+        self.clear()
+        Dashboard().invalidate_transfer()
+        self.refresh()
+        self.assertEqual(self.today_counts(), (movie - 1, tv, anime))
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from sqlalchemy import event
+
+from app.db import MainDb
+from app.db import main_db
+from app.db.main_db import DbPersist
+from app.db.models import SYSTEMDICT
+from app.helper import DictHelper
+
+
+class FailingHelper:
+    _db = MainDb()
+
+    @DbPersist(_db)
+    def set_then_fail(self, key):
+        self._db.insert(SYSTEMDICT(TYPE="DbWriterTest", KEY=key, VALUE="1"))
+        self._db.flush()
+        raise ValueError("test")
+
+    @DbPersist(_db)
+    def set_nested(self, key):
+        # 巢狀的寫操作失敗只回滾自身
+        self.set_then_fail(key + "-failed")
+        return DictHelper().set("DbWriterTest", key, "nested")
+
+
+class DbWriterTest(TestCase):
+
+    def setUp(self):
+        MainDb.init_db()
+        MainDb().query(SYSTEMDICT).filter(SYSTEMDICT.TYPE == "DbWriterTest").delete()
+        MainDb().commit()
+
+    def test_concurrent_writes(self):
+        commits = []
+
+        def on_commit(_):
+            commits.append(1)
+
+        event.listen(main_db._WriterEngine, "commit", on_commit)
+        try:
+            def write(index):
+                # 讀寫交替，寫入後本執行緒立即可讀到
+                self.assertTrue(DictHelper().set("DbWriterTest", "key%s" % index, "value%s" % index))
+                self.assertEqual(DictHelper().get("DbWriterTest", "key%s" % index), "value%s" % index)
+                time.sleep(0.001)
+
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                list(executor.map(write, range(400)))
+        finally:
+            event.remove(main_db._WriterEngine, "commit", on_commit)
+        self.assertEqual(MainDb().query(SYSTEMDICT).filter(SYSTEMDICT.TYPE == "DbWriterTest").count(), 400)
+        # 同時到達的寫操作合併提交
+        self.assertLess(len(commits), 400)
+
+    def test_failed_write(self):
+        helper = FailingHelper()
+        self.assertFalse(helper.set_then_fail("failed"))
+        self.assertTrue(helper.set_nested("nested"))
+        self.assertFalse(DictHelper().exists("DbWriterTest", "failed"))
+        self.assertFalse(DictHelper().exists("DbWriterTest", "nested-failed"))
+        self.assertEqual(DictHelper().get("DbWriterTest", "nested"), "nested")
+
+    def test_backup(self):
+        # 備份包含WAL中尚未合併到主檔案的資料
+        self.assertTrue(DictHelper().set("DbWriterTest", "backup", "value"))
+        with tempfile.TemporaryDirectory() as temp_path:
+            backup_file = os.path.join(temp_path, "user.db")
+            MainDb.backup(backup_file)
+            conn = sqlite3.connect(backup_file)
+            try:
+                self.assertEqual(conn.execute("SELECT VALUE FROM SYSTEM_DICT WHERE TYPE = ? AND KEY = ?",
+                                              ("DbWriterTest", "backup")).fetchone(), ("value",))
+            finally:
+                conn.close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import os
+import xml.dom.minidom
+from unittest import TestCase
+
+from app.utils import DomUtils
+
+FEEDS_PATH = os.path.join(os.path.dirname(__file__), "cases", "feeds")
+
+# 需要對比的標籤及屬性
+FEED_TAGS = [("title", ""),
+             ("link", ""),
+             ("description", ""),
+             ("comments", ""),
+             ("size", ""),
+             ("pubDate", ""),
+             ("enclosure", "url"),
+             ("enclosure", "length"),
+             ("jackettindexer", ""),
+             ("jackettindexer", "id")]
+
+
+def read_feed(name):
+    with open(os.path.join(FEEDS_PATH, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class DomUtilsTest(TestCase):
+
+    def test_iter_items(self):
+        for feed in os.listdir(FEEDS_PATH):
+            content = read_feed(feed)
+            dom_items = xml.dom.minidom.parseString(content).documentElement.getElementsByTagName("item")
+            items = list(DomUtils.iter_items(content, chunk_size=1024))
+            self.assertEqual(len(dom_items), len(items))
+            for dom_item, item in zip(dom_items, items):
+                for tag_name, attname in FEED_TAGS:
+                    self.assertEqual(DomUtils.tag_value(dom_item, tag_name, attname, default=""),
+                                     DomUtils.item_value(item, tag_name, attname, default=""))
+                self.assertEqual([(attr.getAttribute("name"), attr.getAttribute("value"))
+                                  for attr in dom_item.getElementsByTagName("torznab:attr")],
+                                 [(attrs.get("name"), attrs.get("value"))
+                                  for _, attrs in item.get("torznab:attr") or []])
+
+    def test_iter_items_bytes(self):
+        content = read_feed("nexusphp_rss.xml")
+        self.assertEqual(list(DomUtils.iter_items(content)),
+                         list(DomUtils.iter_items(content.encode("utf-8"), chunk_size=7)))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import json
+from unittest import TestCase
+
+import log
+from app.helper import ProgressHelper
+from app.message import MessageCenter
+from app.utils import EventBus
+
+
+class EventBusTest(TestCase):
+
+    def setUp(self):
+        self.subscriber = EventBus().subscribe(["progress", "message"])
+
+    def tearDown(self):
+        EventBus().unsubscribe(self.subscriber)
+
+    def get_events(self):
+        events = []
+        while True:
+            event = self.subscriber.get(timeout=0)
+            if not event:
+                return events
+            events.append(event)
+
+    def test_publish(self):
+        # 只收到訂閱的主題
+        log.info("【EventBusTest】log")
+        MessageCenter().insert_system_message(level="INFO", title="EventBusTest：訊息內容")
+        events = self.get_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], "message")
+        self.assertEqual(events[0][1].get("content"), "訊息內容")
+        # 取消訂閱後不再接收
+        EventBus().unsubscribe(self.subscriber)
+        MessageCenter().insert_system_message(level="INFO", title="EventBusTest")
+        self.assertEqual(self.get_events(), [])
+
+    def test_progress(self):
+        # 未取走的同型別進度只保留最新的
+        ProgressHelper().start("EventBusTest")
+        for value in range(1, 51):
+            ProgressHelper().update(value=value, text="%s%%" % value, ptype="EventBusTest")
+        ProgressHelper().update(value=10, ptype="search-other")
+        events = self.get_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][1], {"type": "EventBusTest", "enable": True, "value": 50, "text": "50%"})
+        ProgressHelper().end("EventBusTest")
+        self.assertFalse(self.get_events()[0][1].get("enable"))
+
+    def test_stream(self):
+        from web.main import App
+        App.config["LOGIN_DISABLED"] = True
+        try:
+            log.info("【EventBusTest】before")
+            last_id = log.LOG_QUEUE[-1].get("id")
+            response = App.test_client().get("/stream?topic=log&after=%s" % (last_id - 1), buffered=False)
+            self.assertEqual(response.mimetype, "text/event-stream")
+            chunks = (chunk.decode() for chunk in response.response)
+            self.assertTrue(next(chunks).startswith("retry"))
+            # 補發序號之後的日誌，再推送新日誌
+            self.assertIn("before", next(chunks))
+            log.info("【EventBusTest】after")
+            chunk = next(chunks)
+            self.assertTrue(chunk.startswith("id: %s\n" % (last_id + 1)))
+            self.assertEqual(json.loads(chunk.split("data: ")[1]).get("text"), "after")
+            response.close()
+        finally:
+            App.config["LOGIN_DISABLED"] = False
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import re
+from unittest import TestCase
+
+from app.filter import Filter
+from app.media import MetaInfo
+from app.utils.types import MediaType
+from tests.cases.meta_cases import meta_cases
+
+
+class FakeGroup:
+    def __init__(self, gid, name, default="N"):
+        self.ID = gid
+        self.GROUP_NAME = name
+        self.IS_DEFAULT = default
+        self.NOTE = ""
+
+
+class FakeRule:
+    def __init__(self, rid, gid, name, pri, include="", exclude="", size="", note=""):
+        self.ID = rid
+        self.GROUP_ID = gid
+        self.ROLE_NAME = name
+        self.PRIORITY = pri
+        self.INCLUDE = include
+        self.EXCLUDE = exclude
+        self.SIZE_LIMIT = size
+        self.NOTE = note
+
+
+FILTER_GROUPS = [FakeGroup(1, "日常觀影", "Y"), FakeGroup(2, "4K收藏"), FakeGroup(3, "空規則組")]
+FILTER_RULES = [
+    FakeRule(1, 1, "1080p", "50", include="1080[pi]\nWEB|Blu-?Ray", exclude="Remux\nDolby\n", size="1,30"),
+    FakeRule(2, 1, "720p", "30", include="720p", size="8"),
+    FakeRule(3, 1, "Free", "10", exclude="DV\nHDR", note="1.0 0.0"),
+    FakeRule(4, 2, "2160p", "80", include="2160p|4K\n", exclude="\nx264", size="10,100"),
+    FakeRule(5, 2, "全部", "1", note="2.0 0.0"),
+]
+
+
+def legacy_check_rules(filter_obj, meta_info, rulegroup=None):
+    """
+    原Filter.check_rules中每次重建規則並逐條re.search的匹配邏輯
+    """
+    if not meta_info:
+        return False, 0, ""
+    if meta_info.subtitle:
+        title = "%s %s" % (meta_info.org_string, meta_info.subtitle)
+    else:
+        title = meta_info.org_string
+    if not rulegroup:
+        rulegroup = filter_obj.get_rule_groups(default=True)
+        if not rulegroup:
+            return True, 0, "未配置過濾規則"
+    else:
+        rulegroup = filter_obj.get_rule_groups(groupid=rulegroup)
+    filters = filter_obj.get_rules(groupid=rulegroup.get("id"))
+    order_seq = 0
+    group_match = True
+    for filter_info in filters:
+        rule_match = True
+        order_seq = 100 - int(filter_info.get('pri'))
+        includes = filter_info.get('include')
+        if includes and rule_match:
+            include_flag = True
+            for include in includes:
+                if not include:
+                    continue
+                if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
+                    include_flag = False
+                    break
+            if not include_flag:
+                rule_match = False
+        excludes = filter_info.get('exclude')
+        if excludes and rule_match:
+            exclude_flag = False
+            exclude_count = 0
+            for exclude in excludes:
+                if not exclude:
+                    continue
+                exclude_count += 1
+                if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
+                    exclude_flag = True
+            if exclude_count > 0 and not exclude_flag:
+                rule_match = False
+        sizes = filter_info.get('size')
+        if sizes and rule_match and meta_info.size:
+            if sizes.find(',') != -1:
+                sizes = sizes.split(',')
+                begin_size = int(sizes[0].strip()) if sizes[0].isdigit() else 0
+                end_size = int(sizes[1].strip()) if sizes[1].isdigit() else 0
+            else:
+                begin_size = 0
+                end_size = int(sizes.strip()) if sizes.isdigit() else 0
+            if meta_info.type == MediaType.MOVIE:
+                if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                    rule_match = False
+            else:
+                if meta_info.total_episodes \
+                        and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(
+                            meta_info.total_episodes) <= end_size * 1024 ** 3:
+                    rule_match = False
+        free = filter_info.get("free")
+        if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
+            ul_factor, dl_factor = free.split()
+            if float(ul_factor) > meta_info.upload_volume_factor \
+                    or float(dl_factor) < meta_info.download_volume_factor:
+                rule_match = False
+        if rule_match:
+            return True, order_seq, rulegroup.get("name")
+        else:
+            group_match = False
+    if not group_match:
+        return False, 0, rulegroup.get("name")
+    return True, order_seq, rulegroup.get("name")
+
+
+def build_torrents():
+    """
+    用識別用例的標題生成不同大小和促銷的種子
+    """
+    torrents = []
+    for index, case in enumerate([case for case in meta_cases if case.get("title")]):
+        for size, factors in [(0, (None, None)),
+                              (2 * 1024 ** 3, (1.0, 0.0)),
+                              (15 * 1024 ** 3, (1.0, 1.0)),
+                              (60 * 1024 ** 3, (2.0, 0.0))]:
+            meta_info = MetaInfo(title=case.get("title"), subtitle=case.get("subtitle"))
+            meta_info.set_torrent_info(size=size,
+                                       upload_volume_factor=factors[0],
+                                       download_volume_factor=factors[1])
+            torrents.append(meta_info)
+    return torrents
+
+
+class FilterTest(TestCase):
+
+    def setUp(self):
+        self.filter = Filter()
+        self.filter._groups = FILTER_GROUPS
+        self.filter._rules = FILTER_RULES
+        self.filter._compiled_groups = self.filter._Filter__compile_rule_groups()
+
+    def tearDown(self):
+        self.filter.init_config()
+
+    def test_check_rules(self):
+        for meta_info in build_torrents():
+            for rulegroup in [None, 1, "2", 3, 99]:
+                self.assertEqual(legacy_check_rules(self.filter, meta_info, rulegroup),
+                                 self.filter.check_rules(meta_info, rulegroup),
+                                 f"{meta_info.org_string} {rulegroup}")
+
+    def test_is_rule_free(self):
+        self.assertTrue(self.filter.is_rule_free())
+        self.assertTrue(self.filter.is_rule_free(2))
+        self.assertFalse(self.filter.is_rule_free(3))
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.db import MainDb, MediaDb
+from app.db.main_db import DbPersist
+from app.db.models import TRANSFERHISTORY
+from app.helper import DbHelper
+
+
+class HistoryHelper:
+    """
+    測試資料經寫入執行緒寫入，只操作SOURCE為FtsSearchTest的記錄
+    """
+    _db = MainDb()
+
+    @DbPersist(_db)
+    def insert(self):
+        self._db.insert([TRANSFERHISTORY(SOURCE="FtsSearchTest",
+                                         SOURCE_FILENAME="Fts.Test.Show.S01E%02d.1080p.mkv" % i,
+                                         TITLE="流浪地球%s" % (i % 3),
+                                         DATE="2023-01-%02d 10:00:00" % (i % 28 + 1)) for i in range(1, 71)])
+
+    @DbPersist(_db)
+    def update(self, filename, new_filename):
+        self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.SOURCE == "FtsSearchTest",
+                                               TRANSFERHISTORY.SOURCE_FILENAME == filename).update(
+            {"SOURCE_FILENAME": new_filename})
+
+    @DbPersist(_db)
+    def delete(self, filename=None):
+        query = self._db.query(TRANSFERHISTORY).filter(TRANSFERHISTORY.SOURCE == "FtsSearchTest")
+        if filename:
+            query = query.filter(TRANSFERHISTORY.SOURCE_FILENAME == filename)
+        query.delete()
+
+
+class FtsSearchTest(TestCase):
+
+    def setUp(self):
+        MainDb.init_db()
+        MediaDb.init_db()
+        HistoryHelper().delete()
+        HistoryHelper().insert()
+
+    def tearDown(self):
+        HistoryHelper().delete()
+
+    @staticmethod
+    def count_rows(rows):
+        return len([row for row in rows if row.SOURCE == "FtsSearchTest"])
+
+    def test_transfer_history(self):
+        dbhelper = DbHelper()
+        # 子串匹配：全文索引（3個字元以上）及逐行匹配（少於3個字元），庫中可能已有其他匹配的記錄
+        for search, count in [("fts.test.show", 70), ("S01E07", 1), ("流浪地球1", 24), ("浪地", 70)]:
+            total, rows = dbhelper.get_transfer_history(search, 1, 100000)
+            self.assertGreaterEqual(total, count, search)
+            self.assertEqual(self.count_rows(rows), count, search)
+        # 修改、刪除後索引同步
+        HistoryHelper().update("Fts.Test.Show.S01E07.1080p.mkv", "Fts.Test.Show.S01E99.1080p.mkv")
+        HistoryHelper().delete("Fts.Test.Show.S01E08.1080p.mkv")
+        self.assertEqual(self.count_rows(dbhelper.get_transfer_history("S01E07", 1, 100000)[1]), 0)
+        self.assertEqual(self.count_rows(dbhelper.get_transfer_history("S01E99", 1, 100000)[1]), 1)
+        self.assertEqual(self.count_rows(dbhelper.get_transfer_history("fts.test.show", 1, 100000)[1]), 69)
+
+    def test_keyset_paging(self):
+        dbhelper = DbHelper()
+        total, first_page = dbhelper.get_transfer_history("fts.test.show", 1, 30)
+        _, second_page = dbhelper.get_transfer_history("fts.test.show", 2, 30)
+        # 按遊標翻頁與按頁碼結果一致
+        last = first_page[-1]
+        _, next_page = dbhelper.get_transfer_history("fts.test.show", 2, 30, after=(last.DATE, last.ID))
+        self.assertEqual([row.ID for row in next_page], [row.ID for row in second_page])
+        first = second_page[0]
+        _, pre_page = dbhelper.get_transfer_history("fts.test.show", 1, 30, before=(first.DATE, first.ID))
+        self.assertEqual([row.ID for row in pre_page], [row.ID for row in first_page])
+
+    def test_tmdb_cache(self):
+        mediadb = MediaDb()
+        mediadb.delete_tmdb_cache(tmdbid="FtsSearchTest")
+        mediadb.insert_tmdb_caches([{"KEY": "[電影]FtsSearchTest-%02d-2023" % i, "TMDBID": "FtsSearchTest"}
+                                    for i in range(50)])
+        total, rows = mediadb.search_tmdb_caches("ftssearchtest-1", 1, 30)
+        self.assertEqual(total, 10)
+        total, first_page = mediadb.search_tmdb_caches("FtsSearchTest", 1, 30)
+        self.assertEqual(total, 50)
+        _, next_page = mediadb.search_tmdb_caches("FtsSearchTest", 2, 30, after=first_page[-1].KEY)
+        _, second_page = mediadb.search_tmdb_caches("FtsSearchTest", 2, 30)
+        self.assertEqual([row.KEY for row in next_page], [row.KEY for row in second_page])
+        _, pre_page = mediadb.search_tmdb_caches("FtsSearchTest", 1, 30, before=second_page[0].KEY)
+        self.assertEqual([row.KEY for row in pre_page], [row.KEY for row in first_page])
+        mediadb.delete_tmdb_cache(tmdbid="FtsSearchTest")
+        self.assertEqual(mediadb.search_tmdb_caches("FtsSearchTest", 1, 30)[0], 0)
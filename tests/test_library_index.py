@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from app.helper import LibraryIndex
+from app.utils import PathUtils
+from config import RMT_MEDIAEXT
+
+
+def build_library():
+    root = tempfile.mkdtemp()
+    for show in ["A (2020)", "B (2021)", "@eaDir"]:
+        for season in ["Season 1", "Season 2"]:
+            path = os.path.join(root, "tv", show, season)
+            os.makedirs(path)
+            for episode in range(1, 4):
+                for ext in [".mkv", ".srt"]:
+                    with open(os.path.join(path, "%s - S%02dE%02d%s" % (show, int(season[-1]), episode, ext)),
+                              "w") as f:
+                        f.write("0")
+    os.makedirs(os.path.join(root, "movie", "C (2022)"))
+    with open(os.path.join(root, "movie", "C (2022)", "C (2022).MP4"), "w") as f:
+        f.write("0")
+    return root
+
+
+class LibraryIndexTest(TestCase):
+
+    def setUp(self):
+        self.root = build_library()
+        self.refresh()
+
+    def refresh(self):
+        config = mock.Mock()
+        config.get_config.return_value = {"tv_path": os.path.join(self.root, "tv"),
+                                          "movie_path": [os.path.join(self.root, "movie")]}
+        with mock.patch("app.helper.library_index.Config", return_value=config):
+            LibraryIndex().refresh()
+
+    def test_lookup(self):
+        index = LibraryIndex()
+        season_path = os.path.join(self.root, "tv", "A (2020)", "Season 1")
+        for path in [season_path,
+                     os.path.join(season_path, "A (2020) - S01E01.mkv"),
+                     os.path.join(season_path, "A (2020) - S01E01.mp4"),
+                     os.path.join(self.root, "tv", "D (2023)", "Season 1", "D (2023) - S01E01.mkv"),
+                     os.path.join(self.root, "movie", "C (2022)", "C (2022).MP4")]:
+            self.assertEqual(index.exists(path), os.path.exists(path))
+        # 不在媒體庫中
+        self.assertIsNone(index.exists(os.path.join(self.root, "other.mkv")))
+        # 與目錄掃描結果一致
+        for path in [os.path.join(self.root, "tv"),
+                     season_path,
+                     os.path.join(self.root, "movie", "C (2022)"),
+                     os.path.join(self.root, "movie", "D (2023)")]:
+            self.assertEqual(sorted(index.get_media_files(path, RMT_MEDIAEXT)),
+                             sorted(PathUtils.get_dir_files(path, RMT_MEDIAEXT)))
+        # 查詢時不訪問檔案系統
+        with mock.patch("os.path.exists", side_effect=AssertionError("exists called")), \
+                mock.patch("os.scandir", side_effect=AssertionError("scandir called")):
+            self.assertTrue(index.exists(season_path))
+            self.assertEqual(len(index.get_media_files(season_path, RMT_MEDIAEXT)), 3)
+
+    def test_update(self):
+        index = LibraryIndex()
+        # 新建立的目錄和檔案
+        new_file = os.path.join(self.root, "tv", "D (2023)", "Season 1", "D (2023) - S01E01.mkv")
+        os.makedirs(os.path.dirname(new_file))
+        with open(new_file, "w") as f:
+            f.write("0")
+        index.add_path(new_file)
+        self.assertTrue(index.exists(new_file))
+        self.assertEqual(index.get_media_files(os.path.dirname(new_file), RMT_MEDIAEXT), [new_file])
+        # 刪除後失效，回退到檔案系統判斷
+        movie_path = os.path.join(self.root, "movie", "C (2022)")
+        shutil.rmtree(movie_path)
+        index.invalidate(movie_path)
+        self.assertIsNone(index.exists(movie_path))
+        # 重新掃描後恢復
+        self.refresh()
+        self.assertFalse(index.exists(movie_path))
+        self.assertTrue(index.exists(new_file))
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase, mock
+
+from app.db import MediaDb
+from app.mediaserver import MediaServer
+from app.mediaserver import media_server
+from app.mediaserver.client import Plex
+from app.utils.types import MediaServerType
+
+
+class FakeServer:
+
+    def __init__(self, items):
+        self.items = items
+        self.since = []
+
+    @staticmethod
+    def get_libraries():
+        return [{"id": "1", "name": "電影"}]
+
+    def get_medias_count(self):
+        return {"MovieCount": len(self.items), "SeriesCount": 0}
+
+    def get_items(self, parent, since=None):
+        self.since.append(since)
+        for item in self.items:
+            if not since or item.get("saved") >= since:
+                yield item
+
+
+class FailingServer(FakeServer):
+
+    def get_items(self, parent, since=None):
+        # 讀取第一頁後失敗
+        for item in list(super().get_items(parent, since))[:100]:
+            yield item
+        raise IOError("test")
+
+
+def movie(item_id, title, saved=0):
+    return {"id": item_id, "library": "1", "type": "Movie", "title": title, "year": "2022", "saved": saved}
+
+
+class MediaSyncTest(TestCase):
+
+    def setUp(self):
+        MediaDb.init_db()
+        media_server._sync_times.clear()
+        self.mediaserver = MediaServer()
+        self.mediaserver._server_type = MediaServerType.EMBY
+        self.server = FakeServer([movie("%s" % i, "電影%s" % i) for i in range(450)])
+        self.mediaserver._server = self.server
+
+    def test_sync(self):
+        mediadb = MediaDb()
+        server_type = MediaServerType.EMBY.value
+        # 全量同步
+        with mock.patch("app.mediaserver.media_server.MEDIASYNC_PAGE_SIZE", 100):
+            self.mediaserver.sync_mediaserver()
+        self.assertIsNone(self.server.since[-1])
+        self.assertEqual(len(mediadb.get_item_ids(server_type)), 450)
+        self.assertEqual(self.mediaserver.get_mediasync_status().get("movie_count"), "450")
+        # 增量同步只寫入有更新的媒體，已刪除的媒體保留到下次全量同步
+        self.server.items = self.server.items[1:] + [movie("450", "新電影", saved=2 ** 40)]
+        self.server.items[0]["title"] = "已修改"
+        self.server.items[0]["saved"] = 2 ** 40
+        self.mediaserver.sync_mediaserver()
+        self.assertIsNotNone(self.server.since[-1])
+        self.assertTrue(mediadb.exists(server_type, "新電影", "2022", None))
+        self.assertTrue(mediadb.exists(server_type, "已修改", "2022", None))
+        self.assertFalse(mediadb.exists(server_type, "電影1", "2022", None))
+        self.assertEqual(len(mediadb.get_item_ids(server_type)), 451)
+        # 全量同步清理已刪除的媒體
+        media_server._sync_times.clear()
+        self.mediaserver.sync_mediaserver()
+        self.assertFalse(mediadb.exists(server_type, "電影0", "2022", None))
+        self.assertEqual(len(mediadb.get_item_ids(server_type)), 450)
+
+    def test_duplicate_items(self):
+        mediadb = MediaDb()
+        server_type = MediaServerType.EMBY.value
+        self.server.items = [movie("1", "電影1"), movie("2", "電影2"), movie("1", "電影1")]
+        self.mediaserver.sync_mediaserver()
+        self.assertEqual(len(mediadb.get_item_ids(server_type)), 2)
+        self.assertEqual(self.mediaserver.get_mediasync_status().get("movie_count"), "2")
+
+    def test_failed_sync(self):
+        mediadb = MediaDb()
+        server_type = MediaServerType.EMBY.value
+        self.mediaserver.sync_mediaserver()
+        sync_times = media_server._sync_times.get(server_type)
+        # 讀取不完整時不清理未讀取到的媒體，不更新同步時間
+        self.mediaserver._server = FailingServer(self.server.items)
+        media_server._sync_times.clear()
+        self.mediaserver.sync_mediaserver()
+        self.assertEqual(len(mediadb.get_item_ids(server_type)), 450)
+        self.assertIsNone(media_server._sync_times.get(server_type))
+        media_server._sync_times[server_type] = sync_times
+        self.mediaserver.sync_mediaserver()
+        self.assertEqual(media_server._sync_times.get(server_type), sync_times)
+
+    def test_plex(self):
+        mediadb = MediaDb()
+        server_type = MediaServerType.PLEX.value
+        plex = Plex()
+        plex_server = plex._plex
+        plex._plex = mock.Mock()
+        library = mock.Mock(key="1", title="電影")
+        plex._plex.library.sections.return_value = [library]
+        plex._plex.library.sectionByID.return_value.all.return_value = [
+            mock.Mock(key="/library/metadata/%s" % i, librarySectionID="1", type="movie", title="電影%s" % i,
+                      year=2022) for i in range(10)]
+        plex._plex.library.sectionByID.return_value.search.return_value = []
+        plex._plex.library.sectionByID.return_value.totalSize = 10
+        self.mediaserver._server_type = MediaServerType.PLEX
+        self.mediaserver._server = plex
+        try:
+            # 每個媒體只同步一次
+            self.mediaserver.sync_mediaserver()
+            self.assertEqual(len(mediadb.get_item_ids(server_type)), 10)
+            self.assertEqual(self.mediaserver.get_mediasync_status().get("movie_count"), "10")
+            # 增量同步只查詢有更新的媒體
+            plex._plex.library.sectionByID.return_value.all.reset_mock()
+            self.mediaserver.sync_mediaserver()
+            plex._plex.library.sectionByID.return_value.all.assert_not_called()
+            self.assertEqual(len(mediadb.get_item_ids(server_type)), 10)
+        finally:
+            plex._plex = plex_server
+            mediadb.empty(server_type=server_type)
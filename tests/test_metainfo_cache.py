@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.helper import WordsHelper
+from app.media import MetaInfo, MetaInfoCache
+
+
+class MetaInfoCacheTest(TestCase):
+    title = "The.Mandalorian.S02E08.Chapter.16.2160p.DSNP.WEB-DL.DDP5.1.Atmos.HDR.H.265-MZABI"
+
+    def setUp(self):
+        MetaInfoCache().clear()
+
+    def test_cache_hit(self):
+        stats = MetaInfoCache().get_stats()
+        first = MetaInfo(self.title)
+        second = MetaInfo(self.title)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.__dict__.keys(), second.__dict__.keys())
+        for key in ["type", "cn_name", "en_name", "begin_season", "begin_episode", "resource_pix",
+                    "resource_team", "ignored_words", "replaced_words", "offset_words"]:
+            self.assertEqual(getattr(first, key), getattr(second, key), key)
+        new_stats = MetaInfoCache().get_stats()
+        self.assertEqual(new_stats.get("hits") - stats.get("hits"), 1)
+        self.assertEqual(new_stats.get("misses") - stats.get("misses"), 1)
+        # 修改返回的物件不影響快取
+        second.set_torrent_info(size=1024, site="test")
+        second.ignored_words.append("test")
+        third = MetaInfo(self.title)
+        self.assertNotEqual(third.site, "test")
+        self.assertNotIn("test", third.ignored_words)
+
+    def test_cache_invalidate(self):
+        MetaInfo(self.title)
+        self.assertEqual(MetaInfoCache().get_stats().get("size"), 1)
+        # 識別詞重新載入後快取失效
+        WordsHelper().init_config()
+        misses = MetaInfoCache().get_stats().get("misses")
+        MetaInfo(self.title)
+        self.assertEqual(MetaInfoCache().get_stats().get("misses"), misses + 1)
+        self.assertEqual(MetaInfoCache().get_stats().get("size"), 1)
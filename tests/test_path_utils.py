@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from app.utils import PathUtils
+
+
+def legacy_get_dir_files(in_path, exts="", filesize=0):
+    """
+    原os.walk實現，用於對比結果
+    """
+    ret_list = []
+    for root, dirs, files in os.walk(in_path):
+        for file in files:
+            cur_path = os.path.join(root, file)
+            if PathUtils.is_invalid_path(cur_path):
+                continue
+            if exts and os.path.splitext(file)[-1].lower() not in exts:
+                continue
+            if filesize and os.path.getsize(cur_path) < filesize:
+                continue
+            if cur_path not in ret_list:
+                ret_list.append(cur_path)
+    return ret_list
+
+
+def build_tree():
+    root = tempfile.mkdtemp()
+    for show in ["A", "B", ".hidden", "@eaDir"]:
+        for season in ["Season 1", "Season 2"]:
+            path = os.path.join(root, show, season)
+            os.makedirs(path)
+            for episode in range(1, 4):
+                for ext, size in [(".mkv", episode * 100), (".srt", 10), (".MP4", 50)]:
+                    with open(os.path.join(path, "E%02d%s" % (episode, ext)), "wb") as f:
+                        f.write(b"0" * size)
+    with open(os.path.join(root, "root.mkv"), "wb") as f:
+        f.write(b"0" * 500)
+    return root
+
+
+def set_old_mtime(root):
+    for path, _, _ in os.walk(root):
+        os.utime(path, (1600000000, 1600000000))
+
+
+class PathUtilsTest(TestCase):
+
+    def test_get_dir_files(self):
+        root = build_tree()
+        for exts, filesize in [("", 0), ([".mkv", ".mp4"], 0), ([".mkv"], 150)]:
+            self.assertEqual(PathUtils.get_dir_files(root, exts=exts, filesize=filesize),
+                             legacy_get_dir_files(root, exts=exts, filesize=filesize))
+            self.assertEqual(PathUtils.get_dir_files(root, exts=exts, filesize=filesize, cache=True),
+                             legacy_get_dir_files(root, exts=exts, filesize=filesize))
+        # 單個檔案
+        self.assertEqual(PathUtils.get_dir_files(os.path.join(root, "root.mkv"), exts=[".mkv"]),
+                         [os.path.join(root, "root.mkv")])
+
+    def test_listing_cache(self):
+        root = build_tree()
+        set_old_mtime(root)
+        files = PathUtils.get_dir_files(root, exts=[".mkv"], cache=True)
+        # 目錄未變化時不再列出目錄
+        with mock.patch("os.scandir", side_effect=AssertionError("scandir called")):
+            self.assertEqual(PathUtils.get_dir_files(root, exts=[".mkv"], cache=True), files)
+        # 新增檔案後目錄修改時間變化，重新列出
+        season_path = os.path.join(root, "A", "Season 1")
+        with open(os.path.join(season_path, "E04.mkv"), "wb") as f:
+            f.write(b"0")
+        self.assertIn(os.path.join(season_path, "E04.mkv"), PathUtils.get_dir_files(root, exts=[".mkv"], cache=True))
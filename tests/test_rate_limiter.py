@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase
+
+from app.utils import RateLimiter
+
+
+class RateLimiterTest(TestCase):
+
+    def test_acquire(self):
+        limiter = RateLimiter(rate=20, burst=2)
+        start_time = time.monotonic()
+        # 突發的令牌不需要等待
+        self.assertEqual(limiter.acquire("a.com"), 0)
+        self.assertEqual(limiter.acquire("a.com"), 0)
+        # 之後按每秒20個的速率放行
+        for _ in range(4):
+            limiter.acquire("a.com")
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.18)
+        # 不同站點分別計數
+        self.assertEqual(limiter.acquire("b.com"), 0)
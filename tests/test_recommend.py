@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase, mock
+
+from sqlalchemy import event
+
+from app.db import MainDb, MediaDb
+from app.db import main_db, media_db
+from app.db.models import RSSMOVIES, MEDIASYNCITEMS
+from app.helper import DbHelper
+from app.media import MetaInfo
+from app.mediaserver import MediaServer
+from app.utils import RecommendCache
+from app.utils.types import MediaServerType
+from web.action import WebAction
+
+
+def hot_movies(page):
+    return [{"id": 9000000 + i + page * 10, "title": "推薦測試電影%s" % i, "release_date": "2022-01-01",
+             "poster_path": "/poster.jpg", "vote_average": 7.0, "overview": ""} for i in range(5)]
+
+
+class RecommendTest(TestCase):
+
+    def setUp(self):
+        MainDb.init_db()
+        MediaDb.init_db()
+        RecommendCache.clear()
+        self.mediaserver = MediaServer()
+        self.server_type = self.mediaserver._server_type
+        self.mediaserver._server_type = MediaServerType.EMBY
+        self.clear()
+        db = MainDb()
+        db.insert([RSSMOVIES(NAME=MetaInfo("推薦測試電影0").get_name(), YEAR="2022", STATE="R"),
+                   RSSMOVIES(NAME="RecommendTest", TMDBID="9000014", YEAR="2022", STATE="R")])
+        db.commit()
+        MediaDb().upsert_items(MediaServerType.EMBY.value, [
+            {"id": "RecommendTest1", "type": "Movie", "title": MetaInfo("推薦測試電影1").get_name(), "year": "2022"},
+            {"id": "RecommendTest3", "type": "Movie", "title": "RecommendTest", "tmdbid": "9000013"}])
+
+    def tearDown(self):
+        self.clear()
+        RecommendCache.clear()
+        self.mediaserver._server_type = self.server_type
+
+    @staticmethod
+    def clear():
+        MainDb().query(RSSMOVIES).filter(RSSMOVIES.YEAR == "2022", RSSMOVIES.STATE == "R",
+                                         RSSMOVIES.NAME.in_([MetaInfo("推薦測試電影0").get_name(),
+                                                             "RecommendTest"])).delete(synchronize_session=False)
+        MainDb().commit()
+        MediaDb().delete_items(MediaServerType.EMBY.value, ["RecommendTest1", "RecommendTest3"])
+
+    def test_recommend(self):
+        media = mock.Mock()
+        media.get_tmdb_hot_movies.side_effect = hot_movies
+        statements = []
+
+        def on_execute(*_):
+            statements.append(1)
+
+        with mock.patch("web.action.Media", return_value=media):
+            items = WebAction().get_recommend({"type": "hm", "page": 1}).get("Items")
+            # 與逐個查詢的結果一致
+            self.assertEqual([item.get("fav") for item in items], [1, 2, 0, 2, 1])
+            for item in items:
+                name = MetaInfo(item.get("title")).get_name()
+                rssid = DbHelper().get_rss_movie_id(title=name, tmdbid=item.get("id"))
+                self.assertEqual(item.get("rssid"), rssid)
+                if not rssid:
+                    self.assertEqual(item.get("fav") == 2, MediaServer().check_item_exists(
+                        title=name, year=item.get("year"), tmdbid=item.get("id")))
+            # 翻頁回來時使用快取的列表，整頁狀態只查詢兩次資料庫
+            event.listen(main_db._Engine, "before_cursor_execute", on_execute)
+            event.listen(media_db._Engine, "before_cursor_execute", on_execute)
+            try:
+                self.assertEqual(WebAction().get_recommend({"type": "hm", "page": 1}).get("Items"), items)
+            finally:
+                event.remove(main_db._Engine, "before_cursor_execute", on_execute)
+                event.remove(media_db._Engine, "before_cursor_execute", on_execute)
+            self.assertEqual(media.get_tmdb_hot_movies.call_count, 1)
+            self.assertLessEqual(len(statements), 2)
+            # 訂閱狀態不快取
+            self.clear()
+            self.assertEqual([item.get("fav") for item in
+                              WebAction().get_recommend({"type": "hm", "page": 1}).get("Items")], [0, 0, 0, 0, 0])
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+from unittest import TestCase
+
+from app.rss import RssSubscribeIndex
+from app.utils.types import MediaType
+
+
+class FakeMedia:
+    def __init__(self, mtype, tmdb_id, title, year, org_string, site, season):
+        self.type = mtype
+        self.tmdb_id = tmdb_id
+        self.title = title
+        self.year = year
+        self.org_string = org_string
+        self.site = site
+        self.season = season
+
+    def get_season_string(self):
+        return self.season
+
+
+def loop_match(media_info, rss_movies, rss_tvs):
+    """
+    原Rss.check_torrent_rss中逐條遍歷訂閱的匹配邏輯
+    """
+    if media_info.type == MediaType.MOVIE and rss_movies:
+        for rid, rss_info in rss_movies.items():
+            rss_sites = rss_info.get('rss_sites')
+            if rss_sites and media_info.site not in rss_sites:
+                continue
+            name = rss_info.get('name')
+            year = rss_info.get('year')
+            tmdbid = rss_info.get('tmdbid')
+            fuzzy_match = rss_info.get('fuzzy_match')
+            if not fuzzy_match:
+                if tmdbid and not tmdbid.startswith("DB:"):
+                    if str(media_info.tmdb_id) != str(tmdbid):
+                        continue
+                else:
+                    if year and str(media_info.year) not in [str(year),
+                                                             str(int(year) + 1),
+                                                             str(int(year) - 1)]:
+                        continue
+                    if name != media_info.title:
+                        continue
+            else:
+                if year and str(year) != str(media_info.year):
+                    continue
+                search_title = f"{media_info.org_string} {media_info.title} {media_info.year}"
+                if not re.search(name, search_title, re.I) and name not in search_title:
+                    continue
+            return rss_info
+    elif rss_tvs:
+        for rid, rss_info in rss_tvs.items():
+            rss_sites = rss_info.get('rss_sites')
+            if rss_sites and media_info.site not in rss_sites:
+                continue
+            name = rss_info.get('name')
+            year = rss_info.get('year')
+            season = rss_info.get('season')
+            tmdbid = rss_info.get('tmdbid')
+            fuzzy_match = rss_info.get('fuzzy_match')
+            if not fuzzy_match:
+                if tmdbid and not tmdbid.startswith("DB:"):
+                    if str(media_info.tmdb_id) != str(tmdbid):
+                        continue
+                else:
+                    if year and str(year) != str(media_info.year):
+                        continue
+                    if name != media_info.title:
+                        continue
+                if season and season != media_info.get_season_string():
+                    continue
+            else:
+                if season and season != "S00" and season != media_info.get_season_string():
+                    continue
+                if year and str(year) != str(media_info.year):
+                    continue
+                search_title = f"{media_info.org_string} {media_info.title} {media_info.year}"
+                if not re.search(name, search_title, re.I) and name not in search_title:
+                    continue
+            return rss_info
+    return None
+
+
+class RssSubscribeIndexTest(TestCase):
+    SITES = ["SiteA", "SiteB", "SiteC", "SiteD"]
+    TITLES = ["流浪地球", "三體", "Andor", "The Boys", "孤注一擲", "狂飆", "Fate/stay night [UBW]",
+              "C++ Primer", "间谍过家家", "葬送的芙莉蓮", "Oppenheimer", "Loki"]
+    FUZZY = [r"Andor", r"the\.?boys", r"^\[.*?\]", r"S0[1-3]E\d+", "Fate/stay night [UBW]", "C++",
+             r"(a)\1", r"(?i)loki", r"三體|狂飆", r"2160p.*HDR", "芙莉蓮", r"[", r"(?P<x>a)(?P=x)", ""]
+
+    def setUp(self) -> None:
+        random.seed(2022)
+
+    def __random_subscribes(self, count, tv=False):
+        rss_infos = {}
+        for rid in range(count):
+            kind = random.random()
+            rss_info = {
+                "id": rid,
+                "rss_sites": random.sample(self.SITES, random.randint(0, 2)),
+                "year": random.choice(["", "2019", "2020", "2021", "2022", "2023"]),
+                "tmdbid": "",
+                "fuzzy_match": False
+            }
+            if tv:
+                rss_info["season"] = random.choice(["", "S00", "S01", "S02", "S03"])
+            if kind < 0.4:
+                rss_info["name"] = random.choice(self.TITLES)
+                rss_info["tmdbid"] = str(random.randint(1, 200))
+            elif kind < 0.5:
+                rss_info["name"] = random.choice(self.TITLES)
+                rss_info["tmdbid"] = f"DB:{random.randint(1, 200)}"
+            elif kind < 0.8:
+                rss_info["name"] = random.choice(self.TITLES)
+            else:
+                rss_info["name"] = random.choice(self.FUZZY)
+                rss_info["fuzzy_match"] = True
+            rss_infos[str(rid)] = rss_info
+        return rss_infos
+
+    def __random_media(self):
+        title = random.choice(self.TITLES + ["Unknown"])
+        year = random.choice(["2019", "2020", "2021", "2022", "2023", None])
+        season = random.choice(["", "S01", "S02", "S03"])
+        org_string = "%s %s %sE%02d 2160p WEB-DL HDR %s" % (random.choice(["[Sub]", ""]),
+                                                           title.replace(" ", "."),
+                                                           season,
+                                                           random.randint(1, 12),
+                                                           random.choice(["aa", "Loki", ""]))
+        return FakeMedia(mtype=random.choice([MediaType.MOVIE, MediaType.TV, MediaType.ANIME]),
+                         tmdb_id=random.choice([random.randint(1, 200), None]),
+                         title=title,
+                         year=year,
+                         org_string=org_string,
+                         site=random.choice(self.SITES),
+                         season=season)
+
+    def test_index_match(self):
+        rss_movies = self.__random_subscribes(400)
+        rss_tvs = self.__random_subscribes(400, tv=True)
+        for movies, tvs in [(rss_movies, rss_tvs), ({}, rss_tvs), (rss_movies, {})]:
+            rss_index = RssSubscribeIndex(rss_movies=movies, rss_tvs=tvs)
+            for _ in range(5000):
+                media_info = self.__random_media()
+                try:
+                    expect = loop_match(media_info, movies, tvs)
+                except re.error as e:
+                    self.assertRaises(type(e), self.__index_match, rss_index, media_info, movies, tvs)
+                    continue
+                self.assertIs(expect, self.__index_match(rss_index, media_info, movies, tvs))
+
+    @staticmethod
+    def __index_match(rss_index, media_info, rss_movies, rss_tvs):
+        if media_info.type == MediaType.MOVIE and rss_movies:
+            return rss_index.match_movie(media_info)
+        elif rss_tvs:
+            return rss_index.match_tv(media_info)
+        return None
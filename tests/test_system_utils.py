@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from unittest import TestCase
+
+from app.utils import SystemUtils
+
+
+class SystemUtilsTest(TestCase):
+
+    def test_copy_move(self):
+        tmp_dir = tempfile.mkdtemp()
+        src = os.path.join(tmp_dir, "src.mkv")
+        data = os.urandom(3 * 1024 * 1024 + 7)
+        with open(src, "wb") as f:
+            f.write(data)
+        os.utime(src, (1600000000, 1600000000))
+        # 複製內容及修改時間
+        copy_dest = os.path.join(tmp_dir, "copy.mkv")
+        self.assertEqual(SystemUtils.copy(src, copy_dest), (0, ""))
+        with open(copy_dest, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(int(os.path.getmtime(copy_dest)), 1600000000)
+        # 移動
+        move_dest = os.path.join(tmp_dir, "sub", "move.mkv")
+        os.makedirs(os.path.dirname(move_dest))
+        self.assertEqual(SystemUtils.move(copy_dest, move_dest), (0, ""))
+        self.assertFalse(os.path.exists(copy_dest))
+        self.assertEqual(os.path.getsize(move_dest), len(data))
+        # 源檔案不存在時返回錯誤
+        self.assertEqual(SystemUtils.copy(copy_dest, os.path.join(tmp_dir, "none.mkv"))[0], -1)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.downloader import TorrentMirror
+from app.utils.types import DownloaderType
+
+
+class FakeQbc(object):
+    """
+    按rid返回增量資料的qBittorrent
+    """
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.rids = []
+
+    def sync_maindata(self, rid=0):
+        self.rids.append(rid)
+        return self.responses[len(self.rids) - 1]
+
+
+class FakeTorrent(object):
+
+    def __init__(self, tid, status):
+        self.id = tid
+        self.status = status
+
+
+class FakeTrc(object):
+
+    def __init__(self, torrents):
+        self.torrents = torrents
+        self.active = []
+        self.removed = []
+        self.calls = []
+
+    def get_torrents(self, ids=None, arguments=None):
+        self.calls.append(("get", ids))
+        return [torrent for tid, torrent in self.torrents.items() if ids is None or tid in ids]
+
+    def get_recently_active_torrents(self, arguments=None):
+        self.calls.append(("recently-active", None))
+        return self.active, self.removed
+
+
+class FakeClient(object):
+
+    def __init__(self, client_type, host, api):
+        self.client_type = client_type
+        self.host = host
+        self.port = 8080
+        self.username = "admin"
+        self.qbc = api
+        self.trc = api
+
+
+class TorrentMirrorTest(TestCase):
+
+    def test_qbittorrent_sync(self):
+        qbc = FakeQbc([
+            {"rid": 1, "full_update": True, "torrents": {
+                "a": {"name": "A", "state": "downloading"},
+                "b": {"name": "B", "state": "uploading"}}},
+            {"rid": 2, "torrents": {"a": {"state": "uploading"}}, "torrents_removed": ["b"]}
+        ])
+        client = FakeClient(DownloaderType.QB, "qb.mirror.test", qbc)
+        torrents, has_err = TorrentMirror().get_torrents(client)
+        self.assertFalse(has_err)
+        self.assertEqual(sorted([t.get("hash") for t in torrents]), ["a", "b"])
+        # 未超過同步間隔且沒有修改時直接讀取映象
+        TorrentMirror().get_torrents(client)
+        self.assertEqual(qbc.rids, [0])
+        # 修改後按rid增量同步，合併變化的欄位並移除已刪除的種子
+        TorrentMirror().invalidate(client)
+        torrents, _ = TorrentMirror().get_torrents(client)
+        self.assertEqual(qbc.rids, [0, 1])
+        self.assertEqual(len(torrents), 1)
+        self.assertEqual(torrents[0].get("name"), "A")
+        self.assertEqual(torrents[0].get("state"), "uploading")
+
+    def test_transmission_sync(self):
+        trc = FakeTrc({1: FakeTorrent(1, "downloading"), 2: FakeTorrent(2, "seeding"),
+                       3: FakeTorrent(3, "seeding")})
+        client = FakeClient(DownloaderType.TR, "tr.mirror.test", trc)
+        torrents, _ = TorrentMirror().get_torrents(client)
+        self.assertEqual(len(torrents), 3)
+        # 增量同步：最近活動的種子、已刪除的種子和本程序修改過的種子
+        trc.active = [FakeTorrent(1, "seeding")]
+        trc.removed = [2]
+        trc.torrents[3] = FakeTorrent(3, "stopped")
+        TorrentMirror().invalidate(client, ids=[3])
+        torrents, _ = TorrentMirror().get_torrents(client)
+        self.assertEqual(trc.calls, [("get", None), ("recently-active", None), ("get", [3])])
+        self.assertEqual({t.id: t.status for t in torrents}, {1: "seeding", 3: "stopped"})
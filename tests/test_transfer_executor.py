@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import time
+from threading import Lock
+from unittest import TestCase
+
+from app.helper import TransferExecutor
+
+
+class TransferExecutorTest(TestCase):
+
+    def test_run(self):
+        tmp_dir = tempfile.mkdtemp()
+        running = {}
+        max_running = {}
+        lock = Lock()
+
+        def transfer(src, dest):
+            with lock:
+                running[dest] = running.get(dest, 0) + 1
+                max_running[dest] = max(max_running.get(dest, 0), running[dest])
+                max_running["all"] = max(max_running.get("all", 0), sum(running.values()))
+            time.sleep(0.05)
+            with lock:
+                running[dest] -= 1
+            return 0, ""
+
+        executor = TransferExecutor()
+        dests = [os.path.join(tmp_dir, "a.mkv")] * 3 + [os.path.join(tmp_dir, "%s.mkv" % i) for i in range(3)]
+        futures = [executor.submit(executor.run, transfer, os.path.join(tmp_dir, "src.mkv"), dest) for dest in dests]
+        for future in futures:
+            self.assertEqual(future.result(), (0, ""))
+        # 相同目的路徑序列執行
+        self.assertEqual(max_running.get(dests[0]), 1)
+        # 同一檔案系統上並行，但不超過限制
+        self.assertGreater(max_running.get("all"), 1)
+        self.assertLessEqual(max_running.get("all"), 2)
+
+    def test_submit_after(self):
+        order = []
+        executor = TransferExecutor()
+        first = executor.submit(lambda: time.sleep(0.05) or order.append(1))
+        second = executor.submit(lambda: order.append(2), after=first)
+        second.result()
+        self.assertEqual(order, [1, 2])
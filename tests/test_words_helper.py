@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+import regex as re
+
+from app.helper import WordsHelper
+
+
+class FakeWord:
+    def __init__(self, replaced=None, replace=None, front=None, back=None, offset=None):
+        self.REPLACED = replaced
+        self.REPLACE = replace
+        self.FRONT = front
+        self.BACK = back
+        self.OFFSET = offset
+
+
+def loop_process(words, title):
+    """
+    原WordsHelper.process中每次重新拼接編譯正則的處理邏輯
+    """
+    used_ignored_words = []
+    used_replaced_words = []
+    used_offset_words = []
+    if words.ignored_words_info:
+        ignored_words = re.compile(r'%s' % "|".join([info.REPLACED for info in words.ignored_words_info]))
+        used_ignored_words = list(set(re.findall(ignored_words, title)))
+        if used_ignored_words:
+            title = re.sub(ignored_words, '', title)
+    for info in words.ignored_words_noregex_info:
+        if title.find(info.REPLACED) != -1:
+            title = title.replace(info.REPLACED, '')
+            used_ignored_words.append(info.REPLACED)
+    for info in words.replaced_words_info:
+        if re.findall(r'%s' % info.REPLACED, title):
+            used_replaced_words.append("%s@%s" % (info.REPLACED, info.REPLACE))
+            title = re.sub(r'%s' % info.REPLACED, r'%s' % info.REPLACE, title)
+    for info in words.replaced_words_noregex_info:
+        if title.find(info.REPLACED) != -1:
+            used_replaced_words.append("%s@%s" % (info.REPLACED, info.REPLACE))
+            title = title.replace(info.REPLACED, info.REPLACE)
+    for info in words.replaced_offset_words_info:
+        if re.findall(r'%s' % info.REPLACED, title):
+            used_replaced_words.append("%s@%s" % (info.REPLACED, info.REPLACE))
+            title = re.sub(r'%s' % info.REPLACED, r'%s' % info.REPLACE, title)
+            title, _ = loop_episode_offset(info.FRONT, info.BACK, info.OFFSET, used_offset_words, title)
+    for info in words.offset_words_info:
+        title, _ = loop_episode_offset(info.FRONT, info.BACK, info.OFFSET, used_offset_words, title)
+    return title, {"ignored": used_ignored_words,
+                   "replaced": used_replaced_words,
+                   "offset": used_offset_words}
+
+
+def loop_episode_offset(front, back, offset, used_offset_words, title):
+    if back and not re.findall(r'%s' % back, title):
+        return title, ""
+    if front and not re.findall(r'%s' % front, title):
+        return title, ""
+    episode_nums_str = re.findall(re.compile(r'(?<=%s.*?)[0-9]+(?=.*?%s)' % (front, back)), title)
+    if not episode_nums_str:
+        return title, ""
+    episode_nums_offset_int = []
+    offset_flag = False
+    for episode_num_str in episode_nums_str:
+        EP = int(episode_num_str)
+        episode_num_offset_int = eval(offset)
+        offset_flag = EP > episode_num_offset_int
+        episode_nums_offset_int.append(episode_num_offset_int)
+    used_offset_words.append("%s@%s@%s" % (front, back, offset))
+    episode_nums_list = sorted(dict(zip(episode_nums_str, episode_nums_offset_int)).items(),
+                               key=lambda x: x[1], reverse=not offset_flag)
+    for episode_num in episode_nums_list:
+        title = re.sub(re.compile(r'(?<=%s.*?)%s(?=.*?%s)' % (front, episode_num[0], back)),
+                       r'%s' % str(episode_num[1]).zfill(2), title)
+    return title, ""
+
+
+class WordsHelperTest(TestCase):
+    titles = [
+        "[SweetSub][Kimetsu no Yaiba][13][WebRip][1080P][CHS]",
+        "[Lilith-Raws] 間諜家家酒 / Spy x Family - 25 [Baha][WEB-DL][1080p][AVC AAC][CHT][MP4]",
+        "The.Mandalorian.S02E08.Chapter.16.2160p.DSNP.WEB-DL.DDP5.1.Atmos.HDR.H.265-MZABI",
+        "【喵萌奶茶屋】★04月新番★[夏日重現/Summer Time Rendering][11][1080p][繁日雙語][招募翻譯]",
+        "[NC-Raws] 間諜過家家 - 13 (B-Global 1920x1080 HEVC AAC MKV)",
+        "Spy.x.Family.S01E13.1080p.WEB-DL.H264.AAC-NCRaws",
+        "國王排名 第二季 第05集 1080p",
+    ]
+
+    def setUp(self):
+        self.words = WordsHelper()
+        self.words.ignored_words_info = [FakeWord(r"\[招募翻譯\]"), FakeWord(r"\[Baha\]")]
+        self.words.ignored_words_noregex_info = [FakeWord("[CHS]"), FakeWord("[MP4]")]
+        self.words.replaced_words_info = [FakeWord(r"間諜(過)?家家(酒)?", "Spy x Family"),
+                                          FakeWord(r"Kimetsu no Yaiba", "鬼滅之刃")]
+        self.words.replaced_words_noregex_info = [FakeWord("NC-Raws", "NCRaws"), FakeWord("2160p", "4K")]
+        self.words.replaced_offset_words_info = [FakeWord(r"國王排名 第二季", "Ousama Ranking S02",
+                                                          "第", "集", "EP-0")]
+        self.words.offset_words_info = [FakeWord(front=r"Spy x Family - ", back=r" \[", offset="EP-12"),
+                                        FakeWord(front=r"\[SweetSub\].*\[", back=r"\]\[WebRip", offset="EP+1")]
+        self.words._compiled_words = self.words._WordsHelper__compile_words()
+
+    def tearDown(self):
+        self.words.init_config()
+
+    def test_process(self):
+        for title in self.titles:
+            expected_title, expected_used = loop_process(self.words, title)
+            result_title, msg, result_used = self.words.process(title)
+            self.assertEqual(expected_title, result_title, title)
+            self.assertEqual(sorted(expected_used.pop("ignored")), sorted(result_used.pop("ignored")), title)
+            self.assertEqual(expected_used, result_used, title)
+            self.assertEqual(msg, "", title)
+
+    def test_invalid_word(self):
+        self.words.replaced_words_info = [FakeWord(r"(Kimetsu", "鬼滅之刃")]
+        # 集數偏移會覆蓋錯誤資訊
+        self.words.replaced_offset_words_info = []
+        self.words.offset_words_info = []
+        self.words._compiled_words = self.words._WordsHelper__compile_words()
+        title, msg, used = self.words.process(self.titles[0])
+        self.assertIn("Kimetsu", title)
+        self.assertEqual(used.get("replaced"), [])
+        self.assertTrue(msg.startswith("【Meta】自定義替換詞"))
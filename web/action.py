@@ -7,6 +7,7 @@ import os.path
 import re
 import shutil
 import signal
+import tempfile
 from math import floor
 from urllib.parse import unquote
 
@@ -16,13 +17,14 @@ from werkzeug.security import generate_password_hash
 
 import log
 from app.brushtask import BrushTask
+from app.db import MainDb
 from app.doubansync import DoubanSync
 from app.downloader import Downloader
 from app.downloader.client import Qbittorrent, Transmission
 from app.filetransfer import FileTransfer
 from app.filter import Filter
 from app.helper import DbHelper, DictHelper, ChromeHelper, ProgressHelper, ThreadHelper, \
-    MetaHelper, DisplayHelper, WordsHelper
+    MetaHelper, DisplayHelper, WordsHelper, LibraryIndex
 from app.indexer import Indexer
 from app.media import Category, Media, MetaInfo, MetaBase
 from app.media.bangumi import Bangumi
@@ -39,11 +41,13 @@ from app.subtitle import Subtitle
 from app.sync import Sync
 from app.sync import stop_monitor
 from app.torrentremover import TorrentRemover
-from app.utils import StringUtils, EpisodeFormat, RequestUtils, PathUtils, SystemUtils
+from app.utils import StringUtils, EpisodeFormat, RequestUtils, PathUtils, SystemUtils, RecommendCache
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import RMT_MODES, RmtMode, OsType
 from app.utils.types import SearchType, DownloaderType, SyncType, MediaType, SystemDictType
-from config import RMT_MEDIAEXT, TMDB_IMAGE_W500_URL, TMDB_IMAGE_ORIGINAL_URL, RMT_SUBEXT, Config
+from config import RMT_MEDIAEXT, TMDB_IMAGE_W500_URL, TMDB_IMAGE_ORIGINAL_URL, RMT_SUBEXT, RECOMMEND_CACHE_TTL, \
+    Config
+from web.backend.dashboard import Dashboard
 from web.backend.search_torrents import search_medias_for_web, search_media_by_message
 
 
@@ -114,6 +118,7 @@ class WebAction:
             "filterrule_detail": self.__filterrule_detail,
             "get_site_activity": self.__get_site_activity,
             "get_site_history": self.__get_site_history,
+            "get_site_refresh_state": self.__get_site_refresh_state,
             "get_recommend": self.get_recommend,
             "get_downloaded": self.get_downloaded,
             "get_site_seeding_info": self.__get_site_seeding_info,
@@ -790,8 +795,11 @@ class WebAction:
                             shutil.rmtree(media_path)
                     except Exception as e:
                         ExceptionUtils.exception_traceback(e)
+                    # 季目錄和媒體目錄可能已刪除，媒體庫索引中的相關目錄失效
+                    LibraryIndex().invalidate(os.path.dirname(dest_path))
                     # 刪除記錄
                     self.dbhelper.delete_transfer_log_by_id(logid)
+                    Dashboard().invalidate_transfer()
                 else:
                     meta_info = MetaInfo(title=paths[0].SOURCE_FILENAME)
                     meta_info.title = paths[0].TITLE
@@ -805,9 +813,12 @@ class WebAction:
                         meta_info.type = MediaType.TV
                     # 刪除記錄
                     self.dbhelper.delete_transfer_log_by_id(logid)
+                    Dashboard().invalidate_transfer()
                     # 刪除檔案
                     dest_path = FileTransfer().get_dest_path_by_info(dest=dest, meta_info=meta_info)
                     if dest_path and dest_path.find(meta_info.title) != -1:
+                        # 季目錄和媒體目錄可能已刪除，媒體庫索引中的相關目錄失效
+                        LibraryIndex().invalidate(os.path.dirname(dest_path))
                         rm_parent_dir = False
                         if not meta_info.get_season_list():
                             # 電影，刪除整個目錄
@@ -1567,8 +1578,7 @@ class WebAction:
         """
         刪除tmdb快取
         """
-        if MetaHelper().delete_meta_data(data.get("cache_key")):
-            MetaHelper().save_meta_data()
+        MetaHelper().delete_meta_data(data.get("cache_key"))
         return {"code": 0}
 
     @staticmethod
@@ -1716,8 +1726,7 @@ class WebAction:
         """
         修改TMDB快取的標題
         """
-        if MetaHelper().modify_meta_data(data.get("key"), data.get("title")):
-            MetaHelper().save_meta_data(force=True)
+        MetaHelper().modify_meta_data(data.get("key"), data.get("title"))
         return {"code": 0}
 
     def __truncate_blacklist(self, data):
@@ -2012,6 +2021,13 @@ class WebAction:
         resp.update({"dataset": Sites().get_pt_site_activity_history(data["name"])})
         return resp
 
+    @staticmethod
+    def __get_site_refresh_state(data=None):
+        """
+        查詢站點資料是否正在後臺重新整理
+        """
+        return {"code": 0, "refreshing": Sites().is_refreshing()}
+
     @staticmethod
     def __get_site_history(data):
         """
@@ -2133,91 +2149,111 @@ class WebAction:
             CurrentPage = 1
         else:
             CurrentPage = int(CurrentPage)
-        if RecommendType == "hm":
-            # TMDB熱門電影
-            res_list = Media().get_tmdb_hot_movies(CurrentPage)
-        elif RecommendType == "ht":
-            # TMDB熱門電視劇
-            res_list = Media().get_tmdb_hot_tvs(CurrentPage)
-        elif RecommendType == "nm":
-            # TMDB最新電影
-            res_list = Media().get_tmdb_new_movies(CurrentPage)
-        elif RecommendType == "nt":
-            # TMDB最新電視劇
-            res_list = Media().get_tmdb_new_tvs(CurrentPage)
-        elif RecommendType == "dbom":
-            # 豆瓣正在上映
-            res_list = DouBan().get_douban_online_movie(CurrentPage)
-        elif RecommendType == "dbhm":
-            # 豆瓣熱門電影
-            res_list = DouBan().get_douban_hot_movie(CurrentPage)
-        elif RecommendType == "dbht":
-            # 豆瓣熱門電視劇
-            res_list = DouBan().get_douban_hot_tv(CurrentPage)
-        elif RecommendType == "dbdh":
-            # 豆瓣熱門動畫
-            res_list = DouBan().get_douban_hot_anime(CurrentPage)
-        elif RecommendType == "dbnm":
-            # 豆瓣最新電影
-            res_list = DouBan().get_douban_new_movie(CurrentPage)
-        elif RecommendType == "dbtop":
-            # 豆瓣TOP250電影
-            res_list = DouBan().get_douban_top250_movie(CurrentPage)
-        elif RecommendType == "dbzy":
-            # 豆瓣最新電視劇
-            res_list = DouBan().get_douban_hot_show(CurrentPage)
-        elif RecommendType == "bangumi":
-            # Bangumi每日放送
-            res_list = Bangumi().get_bangumi_calendar(CurrentPage)
+        # 列表及識別後的名稱按來源和頁碼快取，訂閱和下載狀態每次重新查詢
+        cache_key = "%s-%s" % (RecommendType, CurrentPage)
+        RecommendItems = RecommendCache.get(cache_key)
+        if RecommendItems is None:
+            if RecommendType == "hm":
+                # TMDB熱門電影
+                res_list = Media().get_tmdb_hot_movies(CurrentPage)
+            elif RecommendType == "ht":
+                # TMDB熱門電視劇
+                res_list = Media().get_tmdb_hot_tvs(CurrentPage)
+            elif RecommendType == "nm":
+                # TMDB最新電影
+                res_list = Media().get_tmdb_new_movies(CurrentPage)
+            elif RecommendType == "nt":
+                # TMDB最新電視劇
+                res_list = Media().get_tmdb_new_tvs(CurrentPage)
+            elif RecommendType == "dbom":
+                # 豆瓣正在上映
+                res_list = DouBan().get_douban_online_movie(CurrentPage)
+            elif RecommendType == "dbhm":
+                # 豆瓣熱門電影
+                res_list = DouBan().get_douban_hot_movie(CurrentPage)
+            elif RecommendType == "dbht":
+                # 豆瓣熱門電視劇
+                res_list = DouBan().get_douban_hot_tv(CurrentPage)
+            elif RecommendType == "dbdh":
+                # 豆瓣熱門動畫
+                res_list = DouBan().get_douban_hot_anime(CurrentPage)
+            elif RecommendType == "dbnm":
+                # 豆瓣最新電影
+                res_list = DouBan().get_douban_new_movie(CurrentPage)
+            elif RecommendType == "dbtop":
+                # 豆瓣TOP250電影
+                res_list = DouBan().get_douban_top250_movie(CurrentPage)
+            elif RecommendType == "dbzy":
+                # 豆瓣最新電視劇
+                res_list = DouBan().get_douban_hot_show(CurrentPage)
+            elif RecommendType == "bangumi":
+                # Bangumi每日放送
+                res_list = Bangumi().get_bangumi_calendar(CurrentPage)
+            else:
+                res_list = []
+
+            RecommendItems = self.__get_recommend_items(RecommendType, res_list)
+            if RecommendItems:
+                if RecommendType == "bangumi":
+                    source = "bangumi"
+                elif RecommendType in ['hm', 'ht', 'nm', 'nt']:
+                    source = "tmdb"
+                else:
+                    source = "douban"
+                RecommendCache.set(cache_key, RecommendItems, ttl=RECOMMEND_CACHE_TTL.get(source))
+        # 一次查詢整頁的訂閱和下載狀態
+        names = [name for name, _ in RecommendItems]
+        rids = [item.get("id") for _, item in RecommendItems]
+        if RecommendType in ['hm', 'nm', 'dbom', 'dbhm', 'dbnm', 'dbtop']:
+            rss_names, rss_rids = self.dbhelper.get_rss_movie_ids(titles=names, tmdbids=rids)
+            exists = MediaServer().check_items_exists([(name, item.get("year"), item.get("id"))
+                                                       for name, item in RecommendItems])
         else:
-            res_list = []
-
+            rss_names, rss_rids = self.dbhelper.get_rss_tv_ids(titles=names, tmdbids=rids)
+            exists = MediaServer().check_items_exists([(name, None, item.get("id"))
+                                                       for name, item in RecommendItems])
         Items = []
+        for (name, item), exist in zip(RecommendItems, exists):
+            rssid = (rss_names.get(name) or rss_rids.get(str(item.get("id"))) or "") if name else ""
+            if rssid:
+                # 已訂閱
+                fav = 1
+            elif exist:
+                # 已下載
+                fav = 2
+            else:
+                # 未訂閱、未下載
+                fav = 0
+            Items.append(dict(item, fav=fav, rssid=rssid))
+        return {"code": 0, "Items": Items}
+
+    @staticmethod
+    def __get_recommend_items(RecommendType, res_list):
+        """
+        整理推薦列表並識別名稱
+        :return: (名稱, 媒體資訊)列表
+        """
+        RecommendItems = []
         for res in res_list:
             rid = res.get('id')
             orgid = rid
             if RecommendType in ['hm', 'nm', 'dbom', 'dbhm', 'dbnm', 'dbtop']:
                 title = res.get('title')
                 date = res.get('release_date')
-                if date:
-                    year = date[0:4]
-                else:
-                    year = ''
-                name = MetaInfo(title).get_name()
                 if RecommendType not in ['hm', 'nm']:
                     rid = "DB:%s" % rid
-                rssid = self.dbhelper.get_rss_movie_id(title=name, tmdbid=rid)
-                if rssid:
-                    # 已訂閱
-                    fav = 1
-                elif MediaServer().check_item_exists(title=name, year=year, tmdbid=rid):
-                    # 已下載
-                    fav = 2
-                else:
-                    # 未訂閱、未下載
-                    fav = 0
             else:
                 title = res.get('name')
                 date = res.get('first_air_date')
-                if date:
-                    year = date[0:4]
-                else:
-                    year = ''
-                name = MetaInfo(title).get_name()
                 if RecommendType in ['bangumi']:
                     rid = "BG:%s" % rid
                 elif RecommendType not in ['ht', 'nt']:
                     rid = "DB:%s" % rid
-                rssid = self.dbhelper.get_rss_tv_id(title=name, tmdbid=rid)
-                if rssid:
-                    # 已訂閱
-                    fav = 1
-                elif MediaServer().check_item_exists(title=name, tmdbid=rid):
-                    # 已下載
-                    fav = 2
-                else:
-                    # 未訂閱、未下載
-                    fav = 0
+            if date:
+                year = date[0:4]
+            else:
+                year = ''
+            name = MetaInfo(title).get_name()
             image = res.get('poster_path')
             if RecommendType in ['hm', 'nm', 'ht', 'nt']:
                 image = TMDB_IMAGE_ORIGINAL_URL % image if image else ""
@@ -2229,17 +2265,15 @@ class WebAction:
             item = {'id': rid,
                     'orgid': orgid,
                     'title': title,
-                    'fav': fav,
                     'date': date,
                     'vote': vote,
                     'image': image,
                     'overview': overview,
                     'year': year,
-                    'rssid': rssid,
                     'weekday': res.get("weekday"),
                     'url': res.get("url")}
-            Items.append(item)
-        return {"code": 0, "Items": Items}
+            RecommendItems.append((name, item))
+        return RecommendItems
 
     def get_downloaded(self, data):
         page = data.get("page")
@@ -2353,7 +2387,6 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
-            os.remove(MetaHelper().get_meta_data_path())
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             return {"code": 0, "msg": str(e)}
@@ -2395,7 +2428,14 @@ class WebAction:
             config_path = Config().get_config_path()
             file_path = os.path.join(config_path, filename)
             try:
-                shutil.unpack_archive(file_path, config_path, format='zip')
+                with tempfile.TemporaryDirectory() as temp_path:
+                    shutil.unpack_archive(file_path, temp_path, format='zip')
+                    # 資料庫透過SQLite備份API恢復，不直接覆蓋正在使用的資料庫檔案
+                    db_file = os.path.join(temp_path, "user.db")
+                    if os.path.exists(db_file):
+                        MainDb.restore(db_file)
+                        os.remove(db_file)
+                    shutil.copytree(temp_path, config_path, dirs_exist_ok=True)
                 return {"code": 0, "msg": ""}
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
@@ -3040,145 +3080,28 @@ class WebAction:
         """
         查詢媒體庫儲存空間
         """
-        # 磁碟空間
-        UsedPercent = 0
-        TotalSpaceList = []
-        media = Config().get_config('media')
-        if media:
-            # 電影目錄
-            movie_paths = media.get('movie_path')
-            if not isinstance(movie_paths, list):
-                movie_paths = [movie_paths]
-            movie_used, movie_total = 0, 0
-            for movie_path in movie_paths:
-                if not movie_path:
-                    continue
-                used, total = SystemUtils.get_used_of_partition(movie_path)
-                if "%s-%s" % (used, total) not in TotalSpaceList:
-                    TotalSpaceList.append("%s-%s" % (used, total))
-                    movie_used += used
-                    movie_total += total
-            # 電視目錄
-            tv_paths = media.get('tv_path')
-            if not isinstance(tv_paths, list):
-                tv_paths = [tv_paths]
-            tv_used, tv_total = 0, 0
-            for tv_path in tv_paths:
-                if not tv_path:
-                    continue
-                used, total = SystemUtils.get_used_of_partition(tv_path)
-                if "%s-%s" % (used, total) not in TotalSpaceList:
-                    TotalSpaceList.append("%s-%s" % (used, total))
-                    tv_used += used
-                    tv_total += total
-            # 動漫目錄
-            anime_paths = media.get('anime_path')
-            if not isinstance(anime_paths, list):
-                anime_paths = [anime_paths]
-            anime_used, anime_total = 0, 0
-            for anime_path in anime_paths:
-                if not anime_path:
-                    continue
-                used, total = SystemUtils.get_used_of_partition(anime_path)
-                if "%s-%s" % (used, total) not in TotalSpaceList:
-                    TotalSpaceList.append("%s-%s" % (used, total))
-                    anime_used += used
-                    anime_total += total
-            # 總空間
-            TotalSpaceAry = []
-            if movie_total not in TotalSpaceAry:
-                TotalSpaceAry.append(movie_total)
-            if tv_total not in TotalSpaceAry:
-                TotalSpaceAry.append(tv_total)
-            if anime_total not in TotalSpaceAry:
-                TotalSpaceAry.append(anime_total)
-            TotalSpace = sum(TotalSpaceAry)
-            # 已使用空間
-            UsedSapceAry = []
-            if movie_used not in UsedSapceAry:
-                UsedSapceAry.append(movie_used)
-            if tv_used not in UsedSapceAry:
-                UsedSapceAry.append(tv_used)
-            if anime_used not in UsedSapceAry:
-                UsedSapceAry.append(anime_used)
-            UsedSapce = sum(UsedSapceAry)
-            # 電影電視使用百分比格式化
-            if TotalSpace:
-                UsedPercent = "%0.1f" % ((UsedSapce / TotalSpace) * 100)
-            # 總剩餘空間 格式化
-            FreeSpace = "{:,} TB".format(round((TotalSpace - UsedSapce) / 1024 / 1024 / 1024 / 1024, 2))
-            # 總使用空間 格式化
-            UsedSapce = "{:,} TB".format(round(UsedSapce / 1024 / 1024 / 1024 / 1024, 2))
-            # 總空間 格式化
-            TotalSpace = "{:,} TB".format(round(TotalSpace / 1024 / 1024 / 1024 / 1024, 2))
-
-            return {"code": 0,
-                    "UsedPercent": UsedPercent,
-                    "FreeSpace": FreeSpace,
-                    "UsedSapce": UsedSapce,
-                    "TotalSpace": TotalSpace}
-
-    def get_transfer_statistics(self, data=None):
+        return Dashboard().get_library_spacesize()
+
+    @staticmethod
+    def get_transfer_statistics(data=None):
         """
         查詢轉移歷史統計資料
         """
-        MovieChartLabels = []
-        MovieNums = []
-        TvChartData = {}
-        TvNums = []
-        AnimeNums = []
-        for statistic in self.dbhelper.get_transfer_statistics():
-            if statistic[0] == "電影":
-                MovieChartLabels.append(statistic[1])
-                MovieNums.append(statistic[2])
-            else:
-                if not TvChartData.get(statistic[1]):
-                    TvChartData[statistic[1]] = {"tv": 0, "anime": 0}
-                if statistic[0] == "電視劇":
-                    TvChartData[statistic[1]]["tv"] += statistic[2]
-                elif statistic[0] == "動漫":
-                    TvChartData[statistic[1]]["anime"] += statistic[2]
-        TvChartLabels = list(TvChartData)
-        for tv_data in TvChartData.values():
-            TvNums.append(tv_data.get("tv"))
-            AnimeNums.append(tv_data.get("anime"))
-
-        return {
-            "code": 0,
-            "MovieChartLabels": MovieChartLabels,
-            "MovieNums": MovieNums,
-            "TvChartLabels": TvChartLabels,
-            "TvNums": TvNums,
-            "AnimeNums": AnimeNums
-        }
+        return Dashboard().get_transfer_statistics()
 
     @staticmethod
     def get_library_mediacount(data=None):
         """
         查詢媒體庫統計資料
         """
-        MediaServerClient = MediaServer()
-        media_counts = MediaServerClient.get_medias_count()
-        UserCount = MediaServerClient.get_user_count()
-        if media_counts:
-            return {
-                "code": 0,
-                "Movie": "{:,}".format(media_counts.get('MovieCount')),
-                "Series": "{:,}".format(media_counts.get('SeriesCount')),
-                "Episodes": "{:,}".format(media_counts.get('EpisodeCount')) if media_counts.get(
-                    'EpisodeCount') else "",
-                "Music": "{:,}".format(media_counts.get('SongCount')),
-                "User": UserCount
-            }
-        else:
-            return {"code": -1, "msg": "媒體庫伺服器連線失敗"}
+        return Dashboard().get_library_mediacount()
 
     @staticmethod
     def get_library_playhistory(data=None):
         """
         查詢媒體庫播放記錄
         """
-        return {"code": 0, "result": MediaServer().get_activity_log(30)}
+        return Dashboard().get_library_playhistory()
 
     def get_search_result(self, data=None):
         """
@@ -3522,7 +3445,12 @@ class WebAction:
             CurrentPage = 1
         else:
             CurrentPage = int(CurrentPage)
-        totalCount, historys = self.dbhelper.get_transfer_history(SearchStr, CurrentPage, PageNum)
+        # 翻頁遊標：DATE|ID
+        After = str(data.get("after") or "").rsplit("|", 1)
+        Before = str(data.get("before") or "").rsplit("|", 1)
+        totalCount, historys = self.dbhelper.get_transfer_history(SearchStr, CurrentPage, PageNum,
+                                                                  after=After if len(After) == 2 else None,
+                                                                  before=Before if len(Before) == 2 else None)
 
         TotalPage = floor(totalCount / PageNum) + 1
 
@@ -3532,7 +3460,9 @@ class WebAction:
             "result": [his.as_dict() for his in historys],
             "totalPage": TotalPage,
             "pageNum": PageNum,
-            "currentPage": CurrentPage
+            "currentPage": CurrentPage,
+            "prevCursor": f"{historys[0].DATE}|{historys[0].ID}" if historys else "",
+            "nextCursor": f"{historys[-1].DATE}|{historys[-1].ID}" if historys else ""
         }
 
     def get_unknown_list(self, data=None):
@@ -3770,6 +3700,7 @@ class WebAction:
         if path and name:
             try:
                 os.rename(path, os.path.join(os.path.dirname(path), name))
+                LibraryIndex().invalidate(path)
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
                 return {"code": -1, "msg": str(e)}
@@ -3785,6 +3716,8 @@ class WebAction:
             try:
                 # 刪除檔案
                 for file in files:
+                    # 季目錄和媒體目錄可能被刪除，媒體庫索引中的相關目錄失效
+                    LibraryIndex().invalidate(os.path.dirname(os.path.dirname(file)))
                     os.remove(file)
                 # 取公共上級目錄
                 file_dir = os.path.commonpath(files)
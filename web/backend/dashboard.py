@@ -0,0 +1,225 @@
+import datetime
+from threading import Lock
+
+from app.helper import DbHelper, ThreadHelper
+from app.mediaserver import MediaServer
+from app.utils import SystemUtils
+from app.utils.commons import singleton
+from app.utils.exception_utils import ExceptionUtils
+from config import DASHBOARD_TRANSFER_DAYS, Config
+
+lock = Lock()
+
+
+@singleton
+class Dashboard:
+    """
+    首頁統計資料：媒體伺服器的媒體數量、使用者數、播放記錄，媒體庫儲存空間，近期轉移歷史統計。
+    由定時服務在後臺計算並快取在記憶體中，頁面直接讀取快取及其更新時間，不再等待媒體伺服器請求和全表統計。
+    轉移歷史只統計上次之後新增的記錄，刪除記錄後下次重新整理時重新統計
+    """
+    # 統計項 -> (資料, 更新時間)
+    _data = {}
+    # (型別, 日期) -> 轉移數量
+    _transfer_counts = {}
+    _transfer_max_id = 0
+    _transfer_rebuild = True
+
+    def __init__(self):
+        self._data = {}
+        self._transfer_counts = {}
+        self._transfer_max_id = 0
+        self._transfer_rebuild = True
+        self._refresh_lock = Lock()
+
+    def refresh(self):
+        """
+        重新整理全部統計資料
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            for name, func in [("mediacount", self.__get_library_mediacount),
+                               ("playhistory", self.__get_library_playhistory),
+                               ("spacesize", self.__get_library_spacesize),
+                               ("transfer", self.__get_transfer_statistics)]:
+                try:
+                    data = func()
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    continue
+                with lock:
+                    self._data[name] = (data, datetime.datetime.now())
+        finally:
+            self._refresh_lock.release()
+
+    def __get(self, name, default):
+        """
+        讀取快取的統計資料，尚未統計時在後臺開始重新整理
+        """
+        with lock:
+            data = self._data.get(name)
+        if not data:
+            ThreadHelper().start_thread(self.refresh, ())
+            return default
+        return data[0]
+
+    def get_update_time(self):
+        """
+        統計資料的更新時間
+        """
+        with lock:
+            times = [item[1] for item in self._data.values()]
+        if not times:
+            return None
+        return min(times).strftime('%Y-%m-%d %H:%M:%S')
+
+    def get_library_mediacount(self):
+        return self.__get("mediacount", {"code": -1, "msg": "媒體庫統計資料載入中"})
+
+    def get_library_playhistory(self):
+        return self.__get("playhistory", {"code": 0, "result": []})
+
+    def get_library_spacesize(self):
+        return self.__get("spacesize", {"code": 0})
+
+    def get_transfer_statistics(self):
+        return self.__get("transfer", {"code": 0,
+                                       "MovieChartLabels": [],
+                                       "MovieNums": [],
+                                       "TvChartLabels": [],
+                                       "TvNums": [],
+                                       "AnimeNums": []})
+
+    def invalidate_transfer(self):
+        """
+        轉移歷史有刪除，下次重新整理時重新統計
+        """
+        with lock:
+            self._transfer_rebuild = True
+
+    @staticmethod
+    def __get_library_mediacount():
+        """
+        查詢媒體庫統計資料
+        """
+        MediaServerClient = MediaServer()
+        media_counts = MediaServerClient.get_medias_count()
+        UserCount = MediaServerClient.get_user_count()
+        if media_counts:
+            return {
+                "code": 0,
+                "Movie": "{:,}".format(media_counts.get('MovieCount')),
+                "Series": "{:,}".format(media_counts.get('SeriesCount')),
+                "Episodes": "{:,}".format(media_counts.get('EpisodeCount')) if media_counts.get(
+                    'EpisodeCount') else "",
+                "Music": "{:,}".format(media_counts.get('SongCount')),
+                "User": UserCount
+            }
+        else:
+            return {"code": -1, "msg": "媒體庫伺服器連線失敗"}
+
+    @staticmethod
+    def __get_library_playhistory():
+        """
+        查詢媒體庫播放記錄
+        """
+        return {"code": 0, "result": MediaServer().get_activity_log(30)}
+
+    @staticmethod
+    def __get_library_spacesize():
+        """
+        查詢媒體庫儲存空間
+        """
+        # 磁碟空間
+        UsedPercent = 0
+        TotalSpaceList = []
+        media = Config().get_config('media')
+        if not media:
+            return {"code": 0}
+        # 電影、電視、動漫目錄
+        used_list, total_list = [], []
+        for key in ['movie_path', 'tv_path', 'anime_path']:
+            paths = media.get(key)
+            if not isinstance(paths, list):
+                paths = [paths]
+            type_used, type_total = 0, 0
+            for path in paths:
+                if not path:
+                    continue
+                used, total = SystemUtils.get_used_of_partition(path)
+                if "%s-%s" % (used, total) not in TotalSpaceList:
+                    TotalSpaceList.append("%s-%s" % (used, total))
+                    type_used += used
+                    type_total += total
+            used_list.append(type_used)
+            total_list.append(type_total)
+        # 總空間
+        TotalSpace = sum(set(total_list))
+        # 已使用空間
+        UsedSapce = sum(set(used_list))
+        # 電影電視使用百分比格式化
+        if TotalSpace:
+            UsedPercent = "%0.1f" % ((UsedSapce / TotalSpace) * 100)
+        # 總剩餘空間 格式化
+        FreeSpace = "{:,} TB".format(round((TotalSpace - UsedSapce) / 1024 / 1024 / 1024 / 1024, 2))
+        # 總使用空間 格式化
+        UsedSapce = "{:,} TB".format(round(UsedSapce / 1024 / 1024 / 1024 / 1024, 2))
+        # 總空間 格式化
+        TotalSpace = "{:,} TB".format(round(TotalSpace / 1024 / 1024 / 1024 / 1024, 2))
+
+        return {"code": 0,
+                "UsedPercent": UsedPercent,
+                "FreeSpace": FreeSpace,
+                "UsedSapce": UsedSapce,
+                "TotalSpace": TotalSpace}
+
+    def __get_transfer_statistics(self):
+        """
+        查詢轉移歷史統計資料，只統計上次之後新增的記錄
+        """
+        begin_date = (datetime.datetime.now() - datetime.timedelta(days=DASHBOARD_TRANSFER_DAYS)).strftime("%Y-%m-%d")
+        with lock:
+            rebuild = self._transfer_rebuild
+            self._transfer_rebuild = False
+        if rebuild:
+            counts, max_id = {}, 0
+        else:
+            counts, max_id = dict(self._transfer_counts), self._transfer_max_id
+        for mtype, date, count, last_id in DbHelper().get_transfer_statistics(days=DASHBOARD_TRANSFER_DAYS,
+                                                                               min_id=max_id):
+            counts[(mtype, date)] = counts.get((mtype, date), 0) + count
+            max_id = max(max_id, last_id)
+        # 移出統計時間範圍的日期
+        counts = {key: value for key, value in counts.items() if key[1] >= begin_date}
+        self._transfer_counts, self._transfer_max_id = counts, max_id
+
+        MovieChartLabels = []
+        MovieNums = []
+        TvChartData = {}
+        TvNums = []
+        AnimeNums = []
+        for (mtype, date), count in sorted(counts.items(), key=lambda x: x[0][1]):
+            if mtype == "電影":
+                MovieChartLabels.append(date)
+                MovieNums.append(count)
+            else:
+                if not TvChartData.get(date):
+                    TvChartData[date] = {"tv": 0, "anime": 0}
+                if mtype == "電視劇":
+                    TvChartData[date]["tv"] += count
+                elif mtype == "動漫":
+                    TvChartData[date]["anime"] += count
+        TvChartLabels = list(TvChartData)
+        for tv_data in TvChartData.values():
+            TvNums.append(tv_data.get("tv"))
+            AnimeNums.append(tv_data.get("anime"))
+
+        return {
+            "code": 0,
+            "MovieChartLabels": MovieChartLabels,
+            "MovieNums": MovieNums,
+            "TvChartLabels": TvChartLabels,
+            "TvNums": TvNums,
+            "AnimeNums": AnimeNums
+        }
@@ -14,17 +14,19 @@ from pathlib import Path
 from threading import Lock
 from urllib import parse
 
-from flask import Flask, request, json, render_template, make_response, session, send_from_directory, send_file
+from flask import Flask, request, json, render_template, make_response, session, send_from_directory, send_file, \
+    Response
 from flask_compress import Compress
 from flask_login import LoginManager, login_user, login_required, current_user
 
 import log
 from app.brushtask import BrushTask
-from app.downloader import Downloader
+from app.db import MainDb
+from app.downloader import Downloader, TorrentMirror
 from app.filter import Filter
 from app.helper import SecurityHelper, MetaHelper
 from app.indexer import Indexer
-from app.media import MetaInfo
+from app.media import MetaInfo, MetaInfoCache
 from app.mediaserver import WebhookEvent
 from app.message import Message
 from app.rsschecker import RssChecker
@@ -32,13 +34,15 @@ from app.sites import Sites
 from app.subscribe import Subscribe
 from app.sync import Sync
 from app.torrentremover import TorrentRemover
-from app.utils import DomUtils, SystemUtils, WebUtils
+from app.utils import DomUtils, SystemUtils, WebUtils, SessionPool, EventBus
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import *
-from config import WECHAT_MENU, PT_TRANSFER_INTERVAL, TORRENT_SEARCH_PARAMS, NETTEST_TARGETS, Config
+from config import WECHAT_MENU, PT_TRANSFER_INTERVAL, TORRENT_SEARCH_PARAMS, NETTEST_TARGETS, \
+    EVENT_STREAM_HEARTBEAT, Config
 from web.action import WebAction
 from web.apiv1 import apiv1_bp
 from web.backend.WXBizMsgCrypt3 import WXBizMsgCrypt
+from web.backend.dashboard import Dashboard
 from web.backend.user import User
 from web.backend.wallpaper import get_login_wallpaper
 from web.security import require_auth
@@ -205,6 +209,9 @@ def index():
     # 轉移歷史統計
     TransferStatistics = WebAction().get_transfer_statistics()
 
+    # 統計資料更新時間
+    StatisticsTime = Dashboard().get_update_time()
+
     return render_template("index.html",
                            ServerSucess=ServerSucess,
                            MediaCount={'MovieCount': MediaCounts.get("Movie"),
@@ -222,7 +229,8 @@ def index():
                            MovieNums=TransferStatistics.get("MovieNums"),
                            TvNums=TransferStatistics.get("TvNums"),
                            AnimeNums=TransferStatistics.get("AnimeNums"),
-                           MediaServerType=MSType
+                           MediaServerType=MSType,
+                           StatisticsTime=StatisticsTime
                            )
 
 
@@ -447,8 +455,8 @@ def statistics():
     SiteDownloads = []
     SiteRatios = []
     SiteErrs = {}
-    # 重新整理指定站點
-    Sites().refresh_pt(specify_sites=refresh_site)
+    # 後臺重新整理指定站點，重新整理完成後頁面重新載入
+    Sites().refresh_pt_background(specify_sites=refresh_site)
     # 站點上傳下載
     SiteData = Sites().get_pt_date()
     if isinstance(SiteData, dict):
@@ -497,7 +505,10 @@ def statistics():
                            SiteRatios=SiteRatios,
                            SiteNames=SiteNames,
                            SiteErr=SiteErrs,
-                           SiteUserStatistics=SiteUserStatistics)
+                           SiteUserStatistics=SiteUserStatistics,
+                           SiteRefreshing=Sites().is_refreshing(),
+                           SiteRequestStats=SessionPool().get_stats(),
+                           DownloaderSyncStats=TorrentMirror().get_stats())
 
 
 # 刷流任務頁面
@@ -760,7 +771,11 @@ def history():
     pagenum = request.args.get("pagenum")
     keyword = request.args.get("s") or ""
     current_page = request.args.get("page")
-    Result = WebAction().get_transfer_history({"keyword": keyword, "page": current_page, "pagenum": pagenum})
+    Result = WebAction().get_transfer_history({"keyword": keyword,
+                                               "page": current_page,
+                                               "pagenum": pagenum,
+                                               "after": request.args.get("after"),
+                                               "before": request.args.get("before")})
     if Result.get("totalPage") <= 5:
         StartPage = 1
         EndPage = Result.get("totalPage")
@@ -787,7 +802,9 @@ def history():
                            CurrentPage=Result.get("currentPage"),
                            TotalPage=Result.get("totalPage"),
                            PageRange=PageRange,
-                           PageNum=Result.get("currentPage"))
+                           PageNum=Result.get("currentPage"),
+                           PrevCursor=Result.get("prevCursor"),
+                           NextCursor=Result.get("nextCursor"))
 
 
 # TMDB快取頁面
@@ -805,7 +822,9 @@ def tmdbcache():
         current_page = 1
     else:
         current_page = int(current_page)
-    total_count, tmdb_caches = MetaHelper().dump_meta_data(search_str, current_page, page_num)
+    total_count, tmdb_caches = MetaHelper().dump_meta_data(search_str, current_page, page_num,
+                                                           after=request.args.get("after"),
+                                                           before=request.args.get("before"))
 
     total_page = floor(total_count / page_num) + 1
 
@@ -829,11 +848,14 @@ def tmdbcache():
                            TotalCount=total_count,
                            Count=len(tmdb_caches),
                            TmdbCaches=tmdb_caches,
+                           MetaCacheStats=MetaInfoCache().get_stats(),
                            Search=search_str,
                            CurrentPage=current_page,
                            TotalPage=total_page,
                            PageRange=page_range,
-                           PageNum=page_num)
+                           PageNum=page_num,
+                           PrevCursor=tmdb_caches[0][0] if tmdb_caches else "",
+                           NextCursor=tmdb_caches[-1][0] if tmdb_caches else "")
 
 
 # 手工識別頁面
@@ -1037,6 +1059,49 @@ def do():
     return WebAction().action(cmd, data)
 
 
+# 事件推送：進度、日誌、系統訊息發生時透過SSE推送，topic引數指定訂閱的主題
+@App.route('/stream', methods=['GET'])
+@login_required
+def stream():
+    topics = request.args.getlist("topic")
+    # 日誌按序號補發斷線期間及訂閱前已有的記錄
+    log_after = request.headers.get("Last-Event-ID") or request.args.get("after")
+    log_after = int(log_after) if str(log_after).isdigit() else None
+
+    def __format_event(topic, data):
+        event_id = f"id: {data.get('id')}\n" if topic == "log" else ""
+        return f"{event_id}event: {topic}\ndata: {json.dumps(data)}\n\n"
+
+    def __generate():
+        # 先訂閱再補發已有日誌，期間新增的日誌按序號去重
+        subscriber = EventBus().subscribe(topics)
+        try:
+            yield "retry: 3000\n\n"
+            last_log = log_after
+            if last_log is not None and (not topics or "log" in topics):
+                for item in list(log.LOG_QUEUE):
+                    if item.get("id") > last_log:
+                        last_log = item.get("id")
+                        yield __format_event("log", item)
+            while True:
+                event = subscriber.get(timeout=EVENT_STREAM_HEARTBEAT)
+                if not event:
+                    # 心跳，同時用於發現已斷開的連線
+                    yield ": ping\n\n"
+                    continue
+                topic, data = event
+                if topic == "log" and last_log is not None:
+                    if data.get("id") <= last_log:
+                        continue
+                    last_log = data.get("id")
+                yield __format_event(topic, data)
+        finally:
+            EventBus().unsubscribe(subscriber)
+
+    return Response(__generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # 目錄事件響應
 @App.route('/dirlist', methods=['POST'])
 @login_required
@@ -1500,7 +1565,7 @@ def backup():
         # 把現有的相關檔案進行copy備份
         shutil.copy(f'{config_path}/config.yaml', backup_path)
         shutil.copy(f'{config_path}/default-category.yaml', backup_path)
-        shutil.copy(f'{config_path}/user.db', backup_path)
+        MainDb.backup(f'{backup_path}/user.db')
         conn = sqlite3.connect(f'{backup_path}/user.db')
         cursor = conn.cursor()
         # 執行操作刪除不需要備份的表